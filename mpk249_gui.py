@@ -3,12 +3,15 @@ import customtkinter as ctk
 from PIL import Image
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import rtmidi
-import threading
-import time
 import re # Import regex module
+import time
 # Make sure the mpk2_preset.py file is in the same folder
-from mpk2_preset import MPK2Preset, note_map, color_map, channel_map, key1_map_rev, key2_map_rev, daw_names, note_map_rev
+from mpk2_preset import MPK2Preset, PRESET_COUNT, note_map, color_map, channel_map, key1_map_rev, key2_map_rev, daw_names, note_map_rev
+from mpk2_midi import SysexReceiver, MidiPorts, PresetDumpWriter, PresetFetcher, SysexSender, ControlMonitor, dump_request
+from mpk2_conflicts import live_index
+
+# The editor writes only through the setters, so decoded controls can be cached
+MPK2Preset.CACHE_DECODED = True
 
 # --- Bank Cloner Window ---
 class BankClonerWindow(ctk.CTkToplevel):
@@ -226,7 +229,7 @@ class ControlEditor(ctk.CTkToplevel):
         data = self.parent.get_control_data(self.control_type, self.absolute_index, self.name)
         for field, widget in self.widgets.items():
             value = data.get(field)
-            if field == 'note_name' and 'note' in data and data['note']:
+            if field == 'note_name' and isinstance(data.get('note'), str):
                 note_str = data['note']
                 match = re.match(r'([A-G]#?)(-?\d+)$', note_str)
                 if match:
@@ -268,6 +271,8 @@ class App(ctk.CTk):
         self.current_control_bank = 0
         self.current_pad_bank = 0
         self.is_listening = False
+        self.receiver = None; self.listen_timeout_id = None; self.bulk_writer = None
+        self.LISTEN_TIMEOUT_MS = 120000 # time left to pick the preset on the keyboard
         
         # --- WIDGET STORAGE ---
         self.knob_buttons = []
@@ -275,6 +280,10 @@ class App(ctk.CTk):
         self.switch_buttons = []
         self.pad_buttons = {} 
         self.daw_buttons = {} 
+        self.label_cache = {} # hotspot -> ((kind, index, generation), texts shown)
+        self.monitor = None; self.monitor_lit = {}; self.monitor_revert_id = None # widget -> time its highlight ends
+        self.monitor_generation = None # preset generation the monitor's index was built from
+        self.MONITOR_FRAME_MS = 16; self.MONITOR_HOLD_MS = 150; self.MONITOR_COLOR = "#E8A33D"
         
         # --- FIXED LAYOUT SETTINGS ---
         self.WINDOW_WIDTH = 1265; self.WINDOW_HEIGHT = 847
@@ -305,14 +314,20 @@ class App(ctk.CTk):
         ctk.CTkButton(top_frame, text="Set Pads", command=self.open_pad_mapper).pack(side="left", padx=5, pady=5)
         ctk.CTkButton(top_frame, text="Set MIDI Chn", command=self.open_channel_mapper).pack(side="left", padx=5, pady=5) 
         ctk.CTkButton(top_frame, text="Clone Bank", command=self.open_bank_cloner).pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(top_frame, text="Redo", width=60, command=self.redo).pack(side="right", padx=5, pady=5)
+        ctk.CTkButton(top_frame, text="Undo", width=60, command=self.undo).pack(side="right", padx=5, pady=5)
+        self.bind("<Control-z>", lambda e: self.undo()); self.bind("<Control-y>", lambda e: self.redo())
         midi_frame = ctk.CTkFrame(self, height=50); midi_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
         try:
-            midi_out_temp = rtmidi.MidiOut(); midi_in_temp = rtmidi.MidiIn()
-            self.out_ports = midi_out_temp.get_ports(); self.in_ports = midi_in_temp.get_ports()
+            self.midi = MidiPorts() # ports stay open between sends/requests
             self.MIDI_IN_GET_NAME = "MIDIIN4 (MPK249)"; self.MIDI_OUT_GET_NAME = "" 
             self.MIDI_OUT_SEND_NAME = "MIDIOUT4 (MPK249)"; self.MIDI_IN_SEND_NAME = ""
             self.get_button = ctk.CTkButton(midi_frame, text="Get from Keyboard", command=self.get_preset_from_keyboard); self.get_button.pack(side="left", padx=5)
             self.send_button = ctk.CTkButton(midi_frame, text="Send to Keyboard", command=self.send_preset_to_keyboard); self.send_button.pack(side="left", padx=5)
+            self.receive_all_button = ctk.CTkButton(midi_frame, text="Receive All...", command=self.receive_all_from_keyboard); self.receive_all_button.pack(side="left", padx=5)
+            self.fetch_all_button = ctk.CTkButton(midi_frame, text="Fetch All...", command=self.fetch_all_from_keyboard); self.fetch_all_button.pack(side="left", padx=5)
+            self.monitor_button = ctk.CTkButton(midi_frame, text="Monitor", width=100, command=self.toggle_monitor); self.monitor_button.pack(side="left", padx=5)
+            self.midi_status_label = ctk.CTkLabel(midi_frame, text="", text_color="gray"); self.midi_status_label.pack(side="left", padx=10)
             self.cancel_button = ctk.CTkButton(midi_frame, text="Cancel Listen", command=self.stop_midi_listener, fg_color="gray")
         except Exception as e:
             ctk.CTkLabel(midi_frame, text=f"Could not initialize MIDI: {e}", text_color="orange").pack(side="left", padx=5)
@@ -381,41 +396,53 @@ class App(ctk.CTk):
         
         self.set_control_bank("A"); self.set_pad_bank("A"); self.update_hotspot_labels()
 
+    LEGEND = {"ProgramBank": "PGB", "AFTERTOUCH": "AFT", "INC_DEC1": "ID1", "Keystroke": "KEY"}
+
+    def knob_texts(self, data):
+        k_type = data.get("type", "")
+        return [str(data.get("cc", "")) if k_type in ["MIDI_CC", "INC_DEC2"] else self.LEGEND.get(k_type, "")]
+
+    def fader_texts(self, data):
+        f_type = data.get("type")
+        return ["", str(data.get("cc", "")) if f_type == "MIDI_CC" else str(data.get("max", "")), "" if f_type == "MIDI_CC" else str(data.get("min", ""))]
+
+    def control_texts(self, data):
+        # Switches, DAW buttons and pads (pads say "ProgramChange" where switches say "ProgChange")
+        c_type = data.get("type", "")
+        if c_type in ("CC", "Note"): return [str(data.get(c_type.lower(), ""))]
+        if c_type in ("ProgChange", "ProgramChange"): return [f"P{data.get('program', '')}"]
+        return [self.LEGEND.get(c_type, c_type)]
+
+    def refresh_hotspot(self, slot, widgets, kind, index, getter, texts):
+        # Decodes only controls written since the last refresh, configures only labels whose text changed
+        key = (kind, index, self.preset.control_generation(kind, index))
+        cached = self.label_cache.get(slot)
+        if cached and cached[0] == key: return
+        new = texts(getter(index))
+        for n, widget in enumerate(widgets):
+            if not cached or cached[1][n] != new[n]: widget.configure(text=new[n])
+        self.label_cache[slot] = (key, new)
+
     def update_hotspot_labels(self):
         if not self.preset or not self.preset.sysex_data: return
-        LEGEND = {"ProgramBank": "PGB", "AFTERTOUCH": "AFT", "INC_DEC1": "ID1", "Keystroke": "KEY"}
+        p = self.preset
+        if self.monitor and self.monitor_generation != p.generation: # a control may now send something else
+            self.monitor.index = live_index(p.sysex_data); self.monitor_generation = p.generation
         try:
             control_offset = self.current_control_bank * 8
             for i in range(8):
                 abs_idx = control_offset + i + 1
-                knob_data = self.preset.get_knob(abs_idx); k_type = knob_data.get("type", "")
-                self.knob_buttons[i].configure(text=str(knob_data.get("cc", "")) if k_type in ["MIDI_CC", "INC_DEC2"] else LEGEND.get(k_type, ""))
-                fader_data = self.preset.get_fader(abs_idx); f_type = fader_data.get("type")
-                self.fader_widgets[i]['button'].configure(text="")
-                self.fader_widgets[i]['top_label'].configure(text=str(fader_data.get("cc", "")) if f_type == "MIDI_CC" else str(fader_data.get("max", "")))
-                self.fader_widgets[i]['bottom_label'].configure(text="" if f_type == "MIDI_CC" else str(fader_data.get("min", "")))
-                switch_data = self.preset.get_switch(abs_idx); s_type = switch_data.get("type", ""); text = ""
-                if s_type == "CC": text = str(switch_data.get("cc", ""))
-                elif s_type == "Note": text = str(switch_data.get("note", ""))
-                elif s_type == "ProgChange": text = f"P{switch_data.get('program', '')}"
-                else: text = LEGEND.get(s_type, s_type)
-                self.switch_buttons[i].configure(text=text)
+                self.refresh_hotspot(("knob", i), [self.knob_buttons[i]], "knob", abs_idx, p.get_knob, self.knob_texts)
+                fader = self.fader_widgets[i]
+                self.refresh_hotspot(("fader", i), [fader['button'], fader['top_label'], fader['bottom_label']], "fader", abs_idx, p.get_fader, self.fader_texts)
+                self.refresh_hotspot(("switch", i), [self.switch_buttons[i]], "switch", abs_idx, p.get_switch, self.control_texts)
 
             pad_offset = self.current_pad_bank * 16
             for i in range(16):
-                pad_data = self.preset.get_pad(pad_offset + i + 1); p_type = pad_data.get("type", ""); text = ""
-                if p_type == "Note": text = str(pad_data.get("note", ""))
-                elif p_type == "ProgramChange": text = f"P{pad_data.get('program', '')}"
-                else: text = LEGEND.get(p_type, p_type)
-                self.pad_buttons[i].configure(text=text)
+                self.refresh_hotspot(("pad", i), [self.pad_buttons[i]], "pad", pad_offset + i + 1, p.get_pad, self.control_texts)
 
             for name, button in self.daw_buttons.items():
-                daw_data = self.preset.get_daw(name); d_type = daw_data.get("type", ""); text = ""
-                if d_type == "CC": text = str(daw_data.get("cc", ""))
-                elif d_type == "Note": text = str(daw_data.get("note", ""))
-                elif d_type == "ProgChange": text = f"P{daw_data.get('program', '')}"
-                else: text = LEGEND.get(d_type, d_type)
-                button.configure(text=text)
+                self.refresh_hotspot(("daw", name), [button], "daw", daw_names.index(name) + 1, lambda idx: p.get_daw(daw_names[idx - 1]), self.control_texts)
         except Exception as e: print(f"Error updating labels: {e}")
 
     def set_control_bank(self, value):
@@ -450,23 +477,24 @@ class App(ctk.CTk):
             start_pad_index = bank_index * 16 + 1
             current_midi_note = start_midi_note
 
-            if map_type == "Chromatic":
-                for i in range(16):
-                    target_midi_note = current_midi_note + i
-                    if 0 <= target_midi_note <= 127:
-                        note_name = note_map_rev.get(target_midi_note)
-                        self.preset.set_pad(start_pad_index + i, type="Note", note=note_name)
-            elif map_type == "Diatonic":
-                white_key_remainders = {0, 2, 4, 5, 7, 9, 11}
-                for i in range(16):
-                    if i == 0:
-                        while (current_midi_note % 12) not in white_key_remainders: current_midi_note += 1
-                    else:
-                        current_midi_note += 1
-                        while (current_midi_note % 12) not in white_key_remainders: current_midi_note += 1
-                    if 0 <= current_midi_note <= 127:
-                        note_name = note_map_rev.get(current_midi_note)
-                        self.preset.set_pad(start_pad_index + i, type="Note", note=note_name)
+            with self.preset.edit(f"Map pad bank {bank}"):
+                if map_type == "Chromatic":
+                    for i in range(16):
+                        target_midi_note = current_midi_note + i
+                        if 0 <= target_midi_note <= 127:
+                            note_name = note_map_rev.get(target_midi_note)
+                            self.preset.set_pad(start_pad_index + i, type="Note", note=note_name)
+                elif map_type == "Diatonic":
+                    white_key_remainders = {0, 2, 4, 5, 7, 9, 11}
+                    for i in range(16):
+                        if i == 0:
+                            while (current_midi_note % 12) not in white_key_remainders: current_midi_note += 1
+                        else:
+                            current_midi_note += 1
+                            while (current_midi_note % 12) not in white_key_remainders: current_midi_note += 1
+                        if 0 <= current_midi_note <= 127:
+                            note_name = note_map_rev.get(current_midi_note)
+                            self.preset.set_pad(start_pad_index + i, type="Note", note=note_name)
 
             self.update_hotspot_labels()
             messagebox.showinfo("Success", f"Pad Bank {bank} has been mapped.")
@@ -502,8 +530,9 @@ class App(ctk.CTk):
                 end_idx = start_idx + items_per_bank
 
             # Apply changes
-            for i in range(start_idx, end_idx):
-                set_func(i, channel=new_channel)
+            with self.preset.edit(f"Set {c_type} channel"):
+                for i in range(start_idx, end_idx):
+                    set_func(i, channel=new_channel)
 
             # Update GUI and notify
             self.update_hotspot_labels() # In case channel affects display
@@ -520,39 +549,9 @@ class App(ctk.CTk):
 
     def apply_bank_clone(self, control_type, source_bank, dest_bank):
         try:
-            # Determine parameters based on control type
-            if control_type == "Pads":
-                items_per_bank = 16
-                banks = ["A", "B", "C", "D"]
-                get_func = self.preset.get_pad
-                set_func = self.preset.set_pad
-            else: # Knobs, Faders, Switches
-                items_per_bank = 8
-                banks = ["A", "B", "C"]
-                if control_type == "Knobs":
-                    get_func = self.preset.get_knob
-                    set_func = self.preset.set_knob
-                elif control_type == "Faders":
-                    get_func = self.preset.get_fader
-                    set_func = self.preset.set_fader
-                elif control_type == "Switches":
-                    get_func = self.preset.get_switch
-                    set_func = self.preset.set_switch
-            
-            # Calculate start indices for source and destination banks
-            source_bank_idx = banks.index(source_bank)
-            dest_bank_idx = banks.index(dest_bank)
-            
-            source_start_idx = (source_bank_idx * items_per_bank) + 1
-            dest_start_idx = (dest_bank_idx * items_per_bank) + 1
-
-            # Perform the clone operation
-            for i in range(items_per_bank):
-                # Get all parameters from the source control
-                source_data = get_func(source_start_idx + i)
-                
-                # Apply all those parameters to the destination control
-                set_func(dest_start_idx + i, **source_data)
+            # Byte-for-byte copy: keeps unknown types and bytes no getter exposes
+            kind = {"Pads": "pad", "Knobs": "knob", "Faders": "fader", "Switches": "switch"}[control_type]
+            with self.preset.edit(f"Clone {control_type} bank {source_bank} to {dest_bank}"): self.preset.copy_bank(kind, source_bank, dest_bank)
             
             # Update GUI and notify the user
             self.update_hotspot_labels()
@@ -568,11 +567,20 @@ class App(ctk.CTk):
         if control_type == "daw": return self.preset.get_daw(name)
         
     def set_control_data(self, control_type, index, data, name=""):
-        if control_type == "knob": self.preset.set_knob(index, **data)
-        if control_type == "fader": self.preset.set_fader(index, **data)
-        if control_type == "pad": self.preset.set_pad(index, **data)
-        if control_type == "switch": self.preset.set_switch(index, **data)
-        if control_type == "daw": self.preset.set_daw(name, **data)
+        with self.preset.edit(f"Edit {control_type} {name or index}"):
+            if control_type == "knob": self.preset.set_knob(index, **data)
+            if control_type == "fader": self.preset.set_fader(index, **data)
+            if control_type == "pad": self.preset.set_pad(index, **data)
+            if control_type == "switch": self.preset.set_switch(index, **data)
+            if control_type == "daw": self.preset.set_daw(name, **data)
+
+    def undo(self):
+        if self.preset.undo() is None: self.bell(); return
+        self.update_preset_label(); self.update_hotspot_labels()
+
+    def redo(self):
+        if self.preset.redo() is None: self.bell(); return
+        self.update_preset_label(); self.update_hotspot_labels()
         
     def load_preset_from_file(self):
         filepath = filedialog.askopenfilename(filetypes=[("SysEx files", "*.syx")]);
@@ -592,28 +600,92 @@ class App(ctk.CTk):
     def edit_preset_info(self):
         if not self.preset or not self.preset.sysex_data: messagebox.showerror("Error", "Load a preset first."); return
         new_name = ctk.CTkInputDialog(text="New name:", title="Edit Preset Name").get_input()
-        if new_name is not None: self.preset.set_preset_name(new_name)
+        if new_name is not None:
+            with self.preset.edit("Rename preset"): self.preset.set_preset_name(new_name)
         new_num_str = ctk.CTkInputDialog(text="New number (1-30):", title="Edit Preset Number").get_input()
         try:
             if new_num_str:
                 new_num = int(new_num_str)
-                if 1 <= new_num <= 30: self.preset.set_preset_number(new_num - 1)
+                if 1 <= new_num <= 30:
+                    with self.preset.edit("Renumber preset"): self.preset.set_preset_number(new_num - 1)
                 else: messagebox.showerror("Error", "The number must be between 1 and 30.")
         except ValueError: pass
         self.update_preset_label()
 
-    def midi_listener_thread(self, midi_in):
-        sysex_buffer = bytearray(); is_assembling = False
-        while self.is_listening:
-            msg = midi_in.get_message()
-            if msg:
-                chunk, _ = msg
-                if chunk and chunk[0] == 0xF0: sysex_buffer = bytearray(chunk); is_assembling = True
-                elif is_assembling: sysex_buffer.extend(chunk)
-                if is_assembling and sysex_buffer and sysex_buffer[-1] == 0xF7:
-                    self.is_listening = False; self.after(0, self.load_preset_from_data, bytes(sysex_buffer))
-            time.sleep(0.001)
-        midi_in.close_port(); self.after(0, self.reset_get_button)
+    def on_sysex_received(self, sysex_bytes):
+        # Runs on the Tk thread, scheduled once per complete dump by the receiver callback
+        if not self.is_listening: return
+        self.stop_midi_listener(); self.load_preset_from_data(sysex_bytes)
+
+    def on_listen_timeout(self):
+        self.listen_timeout_id = None
+        if not self.is_listening: return
+        writer = self.bulk_writer; self.stop_midi_listener()
+        if writer and writer.presets: messagebox.showwarning("MIDI", f"Transfer stopped: {len(writer.presets)}/{PRESET_COUNT} presets saved to {writer.directory}.")
+        else: messagebox.showwarning("MIDI", "No preset dump received from the keyboard.")
+
+    def receive_all_from_keyboard(self):
+        # Keyboard side: Global -> Sysex -> Send program -> All. Every dump is written to disk as it arrives.
+        if self.is_listening: return
+        directory = filedialog.askdirectory(title=f"Folder for the {PRESET_COUNT} presets")
+        if not directory: return
+        try:
+            in_name = self.midi.find("in", self.MIDI_IN_GET_NAME)
+            if in_name is None: messagebox.showerror("MIDI Error", "'Get' ports not found."); return
+            writer = self.bulk_writer = PresetDumpWriter(directory)
+            self.receiver = SysexReceiver(self.midi.input(in_name), on_frame=lambda frame: self.on_bulk_frame(writer, frame), max_frames=None).start()
+            self.is_listening = True
+            self.listen_timeout_id = self.after(self.LISTEN_TIMEOUT_MS, self.on_listen_timeout)
+            self.get_button.configure(state="disabled"); self.send_button.configure(state="disabled")
+            self.cancel_button.pack(side="left", padx=5)
+            self.midi_status_label.configure(text="Waiting for 'Send program -> All'...")
+        except Exception as e:
+            messagebox.showerror("MIDI Error", f"Error: {e}"); self.stop_midi_listener()
+
+    def on_bulk_frame(self, writer, frame):
+        # rtmidi thread: save first, then one after() call to report progress
+        if writer.add(frame) is not None: self.after(0, self.on_bulk_progress, writer)
+
+    def on_bulk_progress(self, writer):
+        if not self.is_listening or writer is not self.bulk_writer: return
+        self.midi_status_label.configure(text=f"Received {len(writer.presets)}/{writer.expected} presets")
+        if writer.complete:
+            self.stop_midi_listener()
+            messagebox.showinfo("Success", f"{len(writer.presets)} presets saved to {writer.directory}.")
+
+    def fetch_all_from_keyboard(self):
+        # Asks for each preset by number, several requests in flight; no action needed on the keyboard.
+        if self.is_listening: return
+        directory = filedialog.askdirectory(title=f"Folder for the {PRESET_COUNT} presets")
+        if not directory: return
+        try:
+            out_name = self.midi.find("out", self.MIDI_OUT_GET_NAME); in_name = self.midi.find("in", self.MIDI_IN_GET_NAME)
+            if out_name is None or in_name is None: messagebox.showerror("MIDI Error", "'Get' ports not found."); return
+            writer = PresetDumpWriter(directory)
+            self.receiver = PresetFetcher(self.midi, in_name, out_name,
+                                          on_result=lambda number, preset, error: self.after(0, self.on_fetch_result, writer, preset),
+                                          on_done=lambda presets: self.after(0, self.on_fetch_done, writer)).start()
+            # Listening only once the fetcher runs, so a failed start leaves nothing to stop
+            self.bulk_writer = writer; self.is_listening = True
+            self.get_button.configure(state="disabled"); self.send_button.configure(state="disabled")
+            self.cancel_button.pack(side="left", padx=5)
+            self.midi_status_label.configure(text=f"Fetching 0/{writer.expected} presets...")
+        except Exception as e:
+            messagebox.showerror("MIDI Error", f"Error: {e}"); self.stop_midi_listener()
+
+    def on_fetch_result(self, writer, preset):
+        # Tk thread: the fetcher calls on_result with its lock held, so files are written here, not there
+        if writer is not self.bulk_writer or self.receiver is None: return
+        if preset is not None: writer.add(preset.sysex_data)
+        self.midi_status_label.configure(text=f"Fetching {self.receiver.done}/{writer.expected} presets...")
+
+    def on_fetch_done(self, writer):
+        if writer is not self.bulk_writer: return
+        self.stop_midi_listener()
+        missing = writer.expected - len(writer.presets)
+        self.midi_status_label.configure(text=f"Fetched {len(writer.presets)}/{writer.expected} presets")
+        if missing: messagebox.showwarning("Fetch All", f"{len(writer.presets)} presets saved to {writer.directory}, {missing} did not answer.")
+        else: messagebox.showinfo("Success", f"{len(writer.presets)} presets saved to {writer.directory}.")
 
     def load_preset_from_data(self, sysex_bytes):
         self.preset = MPK2Preset(data=sysex_bytes)
@@ -622,25 +694,26 @@ class App(ctk.CTk):
     def get_preset_from_keyboard(self):
         if self.is_listening: return
         try:
-            out_idx = next((i for i, p in enumerate(self.out_ports) if self.MIDI_OUT_GET_NAME in p), None)
-            in_idx = next((i for i, p in enumerate(self.in_ports) if self.MIDI_IN_GET_NAME in p), None)
-            if out_idx is None or in_idx is None: messagebox.showerror("MIDI Error", "'Get' ports not found."); return
+            out_name = self.midi.find("out", self.MIDI_OUT_GET_NAME); in_name = self.midi.find("in", self.MIDI_IN_GET_NAME)
+            if out_name is None or in_name is None: messagebox.showerror("MIDI Error", "'Get' ports not found."); return
             
-            midi_in = rtmidi.MidiIn(); midi_in.open_port(in_idx); midi_in.ignore_types(sysex=False)
+            self.receiver = SysexReceiver(self.midi.input(in_name), on_frame=lambda frame: self.after(0, self.on_sysex_received, frame)).start()
             self.is_listening = True
-            threading.Thread(target=self.midi_listener_thread, args=(midi_in,), daemon=True).start()
-            
-            midi_out = rtmidi.MidiOut(); midi_out.open_port(out_idx)
-            midi_out.send_message([0xF0, 0x47, 0x00, 0x24, 0x31, 0x00, 0x01, 0x00, 0xF7])
-            midi_out.close_port(); del midi_out
+            self.listen_timeout_id = self.after(self.LISTEN_TIMEOUT_MS, self.on_listen_timeout)
+            self.midi.send(out_name, dump_request(0))
             
             self.get_button.configure(state="disabled"); self.send_button.configure(state="disabled")
             self.cancel_button.pack(side="left", padx=5)
         except Exception as e:
-            messagebox.showerror("MIDI Error", f"Error: {e}"); self.reset_get_button()
+            messagebox.showerror("MIDI Error", f"Error: {e}"); self.stop_midi_listener(); self.reset_get_button()
 
     def stop_midi_listener(self):
-        if self.is_listening: self.is_listening = False
+        if not self.is_listening: return
+        self.is_listening = False
+        if self.listen_timeout_id: self.after_cancel(self.listen_timeout_id); self.listen_timeout_id = None
+        if self.receiver: self.receiver.stop()
+        self.receiver = None; self.bulk_writer = None
+        self.reset_get_button()
 
     def reset_get_button(self):
         self.get_button.configure(state="normal"); self.send_button.configure(state="normal")
@@ -649,16 +722,62 @@ class App(ctk.CTk):
     def send_preset_to_keyboard(self):
         if not self.preset or not self.preset.sysex_data: messagebox.showerror("Error", "No preset to send."); return
         try:
-            out_idx = next((i for i, p in enumerate(self.out_ports) if self.MIDI_OUT_SEND_NAME in p), None)
-            if out_idx is None: messagebox.showerror("MIDI Error", f"Port '{self.MIDI_OUT_SEND_NAME}' not found."); return
-            midi_out = rtmidi.MidiOut(); midi_out.open_port(out_idx)
-            midi_out.send_message(list(self.preset.sysex_data))
-            midi_out.close_port(); del midi_out
-            messagebox.showinfo("Success", f"Preset sent to {self.out_ports[out_idx]}")
+            out_name = self.midi.find("out", self.MIDI_OUT_SEND_NAME)
+            if out_name is None: messagebox.showerror("MIDI Error", f"Port '{self.MIDI_OUT_SEND_NAME}' not found."); return
+            sender = SysexSender(self.midi, out_name); latency = sender.send(self.preset.sysex_data)
+            self.midi_status_label.configure(text=f"Sent {sender.bytes} bytes in {latency * 1000:.1f} ms ({sender.rate / 1024:.1f} KB/s)")
+            messagebox.showinfo("Success", f"Preset sent to {out_name}")
         except Exception as e: messagebox.showerror("MIDI Error", f"Send error: {e}")
 
+    # --- LIVE MONITOR ---
+    def toggle_monitor(self):
+        # Lights up the hotspot of whatever is played on the keyboard (visible banks only)
+        if self.monitor:
+            self.monitor.stop(); self.monitor = None
+            for widget in self.monitor_lit: widget.configure(fg_color="gray30")
+            self.monitor_lit.clear(); self.monitor_button.configure(text="Monitor")
+            self.midi_status_label.configure(text=""); return
+        try:
+            port = self.midi.find_mpk_play()
+            if port is None: messagebox.showerror("MIDI Error", "Keyboard port not found."); return
+            self.monitor_generation = self.preset.generation
+            self.monitor = ControlMonitor(self.midi.input(port), live_index(self.preset.sysex_data or b""),
+                                          on_activity=lambda: self.after(self.MONITOR_FRAME_MS, self.flush_monitor)).start()
+            self.monitor_button.configure(text="Stop Monitor")
+            self.midi_status_label.configure(text=f"Monitoring {port}")
+        except Exception as e: messagebox.showerror("MIDI Error", f"Error: {e}"); self.monitor = None
+
+    def monitor_widget(self, kind, index):
+        if kind == "daw": return self.daw_buttons.get(daw_names[index - 1])
+        if kind == "pad": return self.pad_buttons[(index - 1) % 16] if (index - 1) // 16 == self.current_pad_bank else None
+        if (index - 1) // 8 != self.current_control_bank: return None
+        if kind == "fader": return self.fader_widgets[(index - 1) % 8]['button']
+        return (self.knob_buttons if kind == "knob" else self.switch_buttons)[(index - 1) % 8]
+
+    def flush_monitor(self):
+        # At most once per frame, however many messages arrived since the last one
+        if not self.monitor: return
+        until = time.monotonic() + self.MONITOR_HOLD_MS / 1000
+        for kind, index in self.monitor.drain():
+            widget = self.monitor_widget(kind, index)
+            if widget is None: continue
+            if widget not in self.monitor_lit: widget.configure(fg_color=self.MONITOR_COLOR)
+            self.monitor_lit[widget] = until
+        if self.monitor_lit and not self.monitor_revert_id: self.monitor_revert_id = self.after(self.MONITOR_HOLD_MS, self.revert_monitor)
+
+    def revert_monitor(self):
+        self.monitor_revert_id = None; now = time.monotonic()
+        for widget in [w for w, until in self.monitor_lit.items() if until <= now]:
+            widget.configure(fg_color="gray30"); del self.monitor_lit[widget]
+        if self.monitor_lit:
+            wait = min(self.monitor_lit.values()) - now
+            self.monitor_revert_id = self.after(max(self.MONITOR_FRAME_MS, int(wait * 1000)), self.revert_monitor)
+
     def on_closing(self):
-        self.is_listening = False; time.sleep(0.05); self.destroy()
+        self.stop_midi_listener()
+        if self.monitor: self.monitor.stop()
+        if hasattr(self, "midi"): self.midi.close()
+        self.destroy()
 
 if __name__ == "__main__":
     app = App()
@@ -3,11 +3,10 @@ import customtkinter as ctk
 from PIL import Image
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import rtmidi
 import threading
-import time
 import re # Import regex module
 import sys
+import time
 import os
 os.environ["TK_SILENCE_DEPRECATION"] = "1"
 os.environ["CTK_FORCE_WIDGETS"] = "1"
@@ -28,7 +27,12 @@ def resource_path(relative_path):
 
 
 # Make sure the mpk2_preset.py file is in the same folder
-from mpk2_preset import MPK2Preset, note_map, color_map, channel_map, key1_map_rev, key2_map_rev, daw_names, note_map_rev
+from mpk2_preset import MPK2Preset, PRESET_COUNT, note_map, color_map, channel_map, key1_map_rev, key2_map_rev, daw_names, note_map_rev
+from mpk2_midi import SysexReceiver, MidiPorts, PresetDumpWriter, PresetFetcher, SysexSender, ControlMonitor, dump_request
+from mpk2_conflicts import live_index
+
+# L'editor scrive solo tramite i setter: i controlli decodificati possono restare in cache
+MPK2Preset.CACHE_DECODED = True
 
 # --- Bank Cloner Window ---
 class BankClonerWindow(ctk.CTkToplevel):
@@ -246,7 +250,7 @@ class ControlEditor(ctk.CTkToplevel):
         data = self.parent.get_control_data(self.control_type, self.absolute_index, self.name)
         for field, widget in self.widgets.items():
             value = data.get(field)
-            if field == 'note_name' and 'note' in data and data['note']:
+            if field == 'note_name' and isinstance(data.get('note'), str):
                 note_str = data['note']
                 match = re.match(r'([A-G]#?)(-?\d+)$', note_str)
                 if match:
@@ -289,8 +293,17 @@ class App(ctk.CTk):
         self.current_control_bank = 0
         self.current_pad_bank = 0
         self.is_listening = False
+        self.receiver, self.listen_timeout_id = None, None
+        self.bulk_writer = None
+        self.LISTEN_TIMEOUT_MS = 120000 # tempo per scegliere il preset sulla tastiera
+        self.midi_in_name, self.midi_out_name = None, None
+        self.midi = None # MidiPorts, creato da _find_midi_ports
         self.knob_buttons, self.fader_widgets, self.switch_buttons, self.pad_buttons, self.daw_buttons = [], [], [], {}, {}
         self.control_bank_buttons, self.pad_bank_buttons = {}, {}
+        self.label_cache = {} # hotspot -> ((kind, index, generation), testi mostrati)
+        self.monitor, self.monitor_lit, self.monitor_revert_id = None, {}, None # widget -> fine dell'evidenziazione
+        self.monitor_generation = None # generazione del preset da cui è costruito l'indice del monitor
+        self.MONITOR_FRAME_MS, self.MONITOR_HOLD_MS, self.MONITOR_COLOR = 16, 150, "#E8A33D"
         self.ACTIVE_COLOR, self.INACTIVE_COLOR = "#337AB7", "gray40"
 
         self.GROUP_COORDINATES = {
@@ -316,6 +329,13 @@ class App(ctk.CTk):
         ctk.CTkButton(top_frame, text="Set Pads", command=self.open_pad_mapper).pack(side="left", padx=5, pady=5)
         ctk.CTkButton(top_frame, text="Set MIDI Chn", command=self.open_channel_mapper).pack(side="left", padx=5, pady=5) 
         #ctk.CTkButton(top_frame, text="Clone Bank", command=self.open_bank_cloner).pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(top_frame, text="Redo", width=60, command=self.redo).pack(side="right", padx=5, pady=5)
+        ctk.CTkButton(top_frame, text="Undo", width=60, command=self.undo).pack(side="right", padx=5, pady=5)
+        # Cmd+Z / Cmd+Shift+Z come nelle app Mac, Ctrl+Z / Ctrl+Y per chi arriva da Windows
+        self.bind("<Command-z>", lambda e: self.undo())
+        self.bind("<Command-Shift-Z>", lambda e: self.redo())
+        self.bind("<Control-z>", lambda e: self.undo())
+        self.bind("<Control-y>", lambda e: self.redo())
 
         midi_frame = ctk.CTkFrame(self, height=50)
         midi_frame.grid(row=1, column=0, sticky="ew", padx=10, pady=5) 
@@ -334,8 +354,14 @@ class App(ctk.CTk):
         self.get_button.pack(side="left", pady=5, padx=(0, 5))
         self.send_button = ctk.CTkButton(midi_frame, text="Send to Keyboard", command=self.send_preset_to_keyboard)
         self.send_button.pack(side="left", pady=5)
+        self.receive_all_button = ctk.CTkButton(midi_frame, text="Receive All...", command=self.receive_all_from_keyboard)
+        self.receive_all_button.pack(side="left", pady=5, padx=(5, 0))
+        self.fetch_all_button = ctk.CTkButton(midi_frame, text="Fetch All...", command=self.fetch_all_from_keyboard)
+        self.fetch_all_button.pack(side="left", pady=5, padx=(5, 0))
 
         # Etichetta di stato e pulsante di annullamento a sinistra
+        self.monitor_button = ctk.CTkButton(midi_frame, text="Monitor", width=100, command=self.toggle_monitor)
+        self.monitor_button.pack(side="left", pady=5, padx=(5, 0))
         self.midi_status_label = ctk.CTkLabel(midi_frame, text="Initializing MIDI...", text_color="gray")
         self.midi_status_label.pack(side="left", padx=10, pady=5)
         self.cancel_button = ctk.CTkButton(midi_frame, text="Cancel Listen", command=self.stop_midi_listener, fg_color="gray")
@@ -355,28 +381,10 @@ class App(ctk.CTk):
     def _find_midi_ports(self):
         """Scans the system for valid MPK2xx MIDI ports and updates the GUI."""
         try:
-            midi_in = rtmidi.MidiIn()
-            midi_out = rtmidi.MidiOut()
-            self.in_ports = midi_in.get_ports()
-            self.out_ports = midi_out.get_ports()
-            del midi_in, midi_out
-            
-            # Pattern di ricerca: deve contenere "MPK2" e una delle parole chiave
-            models = ["MPK225", "MPK249", "MPK261"]
-            keywords_in = ["Remote", "MIDIIN4"]
-            keywords_out = ["Remote", "MIDIOUT4"]
-
-            found_in_port = None
-            for port in self.in_ports:
-                if any(model in port for model in models) and any(kw in port for kw in keywords_in):
-                    found_in_port = port
-                    break # Trovata la prima porta valida, esci dal ciclo
-
-            found_out_port = None
-            for port in self.out_ports:
-                if any(model in port for model in models) and any(kw in port for kw in keywords_out):
-                    found_out_port = port
-                    break
+            # Le porte restano aperte tra un invio e l'altro; la ricerca cerca un nome "MPK2xx" con
+            # "Remote"/"MIDIIN4" (ingresso) o "Remote"/"MIDIOUT4" (uscita)
+            self.midi = MidiPorts()
+            found_in_port, found_out_port = self.midi.find_mpk()
             
             if found_in_port and found_out_port:
                 self.midi_in_name = found_in_port
@@ -385,9 +393,8 @@ class App(ctk.CTk):
                 # Aggiorna la GUI dal thread principale
                 self.after(0, lambda: self.midi_status_label.configure(text=f"Ready: {found_in_port}", text_color="green"))
             else:
+                # I pulsanti restano attivi: Get/Send rifanno la ricerca se la tastiera viene collegata dopo
                 self.after(0, lambda: self.midi_status_label.configure(text="MPK Keyboard Not Found", text_color="orange"))
-                self.after(0, lambda: self.get_button.configure(state="disabled"))
-                self.after(0, lambda: self.send_button.configure(state="disabled"))
         
         except Exception as e:
             self.after(0, lambda: self.midi_status_label.configure(text=f"MIDI Error: {e}", text_color="red"))
@@ -494,41 +501,53 @@ class App(ctk.CTk):
         self.set_pad_bank("A")
         self.update_hotspot_labels()
 
+    LEGEND = {"ProgramBank": "PGB", "AFTERTOUCH": "AFT", "INC_DEC1": "ID1", "Keystroke": "KEY"}
+
+    def knob_texts(self, data):
+        k_type = data.get("type", "")
+        return [str(data.get("cc", "")) if k_type in ["MIDI_CC", "INC_DEC2"] else self.LEGEND.get(k_type, "")]
+
+    def fader_texts(self, data):
+        f_type = data.get("type")
+        return ["", str(data.get("cc", "")) if f_type == "MIDI_CC" else str(data.get("max", "")), "" if f_type == "MIDI_CC" else str(data.get("min", ""))]
+
+    def control_texts(self, data):
+        # Switches, DAW buttons and pads (pads say "ProgramChange" where switches say "ProgChange")
+        c_type = data.get("type", "")
+        if c_type in ("CC", "Note"): return [str(data.get(c_type.lower(), ""))]
+        if c_type in ("ProgChange", "ProgramChange"): return [f"P{data.get('program', '')}"]
+        return [self.LEGEND.get(c_type, c_type)]
+
+    def refresh_hotspot(self, slot, widgets, kind, index, getter, texts):
+        # Decodes only controls written since the last refresh, configures only labels whose text changed
+        key = (kind, index, self.preset.control_generation(kind, index))
+        cached = self.label_cache.get(slot)
+        if cached and cached[0] == key: return
+        new = texts(getter(index))
+        for n, widget in enumerate(widgets):
+            if not cached or cached[1][n] != new[n]: widget.configure(text=new[n])
+        self.label_cache[slot] = (key, new)
+
     def update_hotspot_labels(self):
         if not self.preset or not self.preset.sysex_data: return
-        LEGEND = {"ProgramBank": "PGB", "AFTERTOUCH": "AFT", "INC_DEC1": "ID1", "Keystroke": "KEY"}
+        p = self.preset
+        if self.monitor and self.monitor_generation != p.generation: # solo dopo una modifica o un nuovo preset
+            self.monitor.index = live_index(p.sysex_data); self.monitor_generation = p.generation
         try:
             control_offset = self.current_control_bank * 8
             for i in range(8):
                 abs_idx = control_offset + i + 1
-                knob_data = self.preset.get_knob(abs_idx); k_type = knob_data.get("type", "")
-                self.knob_buttons[i].configure(text=str(knob_data.get("cc", "")) if k_type in ["MIDI_CC", "INC_DEC2"] else LEGEND.get(k_type, ""))
-                fader_data = self.preset.get_fader(abs_idx); f_type = fader_data.get("type")
-                self.fader_widgets[i]['button'].configure(text="")
-                self.fader_widgets[i]['top_label'].configure(text=str(fader_data.get("cc", "")) if f_type == "MIDI_CC" else str(fader_data.get("max", "")))
-                self.fader_widgets[i]['bottom_label'].configure(text="" if f_type == "MIDI_CC" else str(fader_data.get("min", "")))
-                switch_data = self.preset.get_switch(abs_idx); s_type = switch_data.get("type", ""); text = ""
-                if s_type == "CC": text = str(switch_data.get("cc", ""))
-                elif s_type == "Note": text = str(switch_data.get("note", ""))
-                elif s_type == "ProgChange": text = f"P{switch_data.get('program', '')}"
-                else: text = LEGEND.get(s_type, s_type)
-                self.switch_buttons[i].configure(text=text)
+                self.refresh_hotspot(("knob", i), [self.knob_buttons[i]], "knob", abs_idx, p.get_knob, self.knob_texts)
+                fader = self.fader_widgets[i]
+                self.refresh_hotspot(("fader", i), [fader['button'], fader['top_label'], fader['bottom_label']], "fader", abs_idx, p.get_fader, self.fader_texts)
+                self.refresh_hotspot(("switch", i), [self.switch_buttons[i]], "switch", abs_idx, p.get_switch, self.control_texts)
 
             pad_offset = self.current_pad_bank * 16
             for i in range(16):
-                pad_data = self.preset.get_pad(pad_offset + i + 1); p_type = pad_data.get("type", ""); text = ""
-                if p_type == "Note": text = str(pad_data.get("note", ""))
-                elif p_type == "ProgramChange": text = f"P{pad_data.get('program', '')}"
-                else: text = LEGEND.get(p_type, p_type)
-                self.pad_buttons[i].configure(text=text)
+                self.refresh_hotspot(("pad", i), [self.pad_buttons[i]], "pad", pad_offset + i + 1, p.get_pad, self.control_texts)
 
             for name, button in self.daw_buttons.items():
-                daw_data = self.preset.get_daw(name); d_type = daw_data.get("type", ""); text = ""
-                if d_type == "CC": text = str(daw_data.get("cc", ""))
-                elif d_type == "Note": text = str(daw_data.get("note", ""))
-                elif d_type == "ProgChange": text = f"P{daw_data.get('program', '')}"
-                else: text = LEGEND.get(d_type, d_type)
-                button.configure(text=text)
+                self.refresh_hotspot(("daw", name), [button], "daw", daw_names.index(name) + 1, lambda idx: p.get_daw(daw_names[idx - 1]), self.control_texts)
         except Exception as e: print(f"Error updating labels: {e}")
 
     def set_control_bank(self, value):
@@ -563,23 +582,24 @@ class App(ctk.CTk):
             start_pad_index = bank_index * 16 + 1
             current_midi_note = start_midi_note
 
-            if map_type == "Chromatic":
-                for i in range(16):
-                    target_midi_note = current_midi_note + i
-                    if 0 <= target_midi_note <= 127:
-                        note_name = note_map_rev.get(target_midi_note)
-                        self.preset.set_pad(start_pad_index + i, type="Note", note=note_name)
-            elif map_type == "Diatonic":
-                white_key_remainders = {0, 2, 4, 5, 7, 9, 11}
-                for i in range(16):
-                    if i == 0:
-                        while (current_midi_note % 12) not in white_key_remainders: current_midi_note += 1
-                    else:
-                        current_midi_note += 1
-                        while (current_midi_note % 12) not in white_key_remainders: current_midi_note += 1
-                    if 0 <= current_midi_note <= 127:
-                        note_name = note_map_rev.get(current_midi_note)
-                        self.preset.set_pad(start_pad_index + i, type="Note", note=note_name)
+            with self.preset.edit(f"Map pad bank {bank}"):
+                if map_type == "Chromatic":
+                    for i in range(16):
+                        target_midi_note = current_midi_note + i
+                        if 0 <= target_midi_note <= 127:
+                            note_name = note_map_rev.get(target_midi_note)
+                            self.preset.set_pad(start_pad_index + i, type="Note", note=note_name)
+                elif map_type == "Diatonic":
+                    white_key_remainders = {0, 2, 4, 5, 7, 9, 11}
+                    for i in range(16):
+                        if i == 0:
+                            while (current_midi_note % 12) not in white_key_remainders: current_midi_note += 1
+                        else:
+                            current_midi_note += 1
+                            while (current_midi_note % 12) not in white_key_remainders: current_midi_note += 1
+                        if 0 <= current_midi_note <= 127:
+                            note_name = note_map_rev.get(current_midi_note)
+                            self.preset.set_pad(start_pad_index + i, type="Note", note=note_name)
 
             self.update_hotspot_labels()
             messagebox.showinfo("Success", f"Pad Bank {bank} has been mapped.")
@@ -615,8 +635,9 @@ class App(ctk.CTk):
                 end_idx = start_idx + items_per_bank
 
             # Apply changes
-            for i in range(start_idx, end_idx):
-                set_func(i, channel=new_channel)
+            with self.preset.edit(f"Set {c_type} channel"):
+                for i in range(start_idx, end_idx):
+                    set_func(i, channel=new_channel)
 
             # Update GUI and notify
             self.update_hotspot_labels() # In case channel affects display
@@ -633,39 +654,9 @@ class App(ctk.CTk):
 
     def apply_bank_clone(self, control_type, source_bank, dest_bank):
         try:
-            # Determine parameters based on control type
-            if control_type == "Pads":
-                items_per_bank = 16
-                banks = ["A", "B", "C", "D"]
-                get_func = self.preset.get_pad
-                set_func = self.preset.set_pad
-            else: # Knobs, Faders, Switches
-                items_per_bank = 8
-                banks = ["A", "B", "C"]
-                if control_type == "Knobs":
-                    get_func = self.preset.get_knob
-                    set_func = self.preset.set_knob
-                elif control_type == "Faders":
-                    get_func = self.preset.get_fader
-                    set_func = self.preset.set_fader
-                elif control_type == "Switches":
-                    get_func = self.preset.get_switch
-                    set_func = self.preset.set_switch
-            
-            # Calculate start indices for source and destination banks
-            source_bank_idx = banks.index(source_bank)
-            dest_bank_idx = banks.index(dest_bank)
-            
-            source_start_idx = (source_bank_idx * items_per_bank) + 1
-            dest_start_idx = (dest_bank_idx * items_per_bank) + 1
-
-            # Perform the clone operation
-            for i in range(items_per_bank):
-                # Get all parameters from the source control
-                source_data = get_func(source_start_idx + i)
-                
-                # Apply all those parameters to the destination control
-                set_func(dest_start_idx + i, **source_data)
+            # Copia byte per byte: conserva anche tipi sconosciuti e byte non decodificati
+            kind = {"Pads": "pad", "Knobs": "knob", "Faders": "fader", "Switches": "switch"}[control_type]
+            with self.preset.edit(f"Clone {control_type} bank {source_bank} to {dest_bank}"): self.preset.copy_bank(kind, source_bank, dest_bank)
             
             # Update GUI and notify the user
             self.update_hotspot_labels()
@@ -681,11 +672,20 @@ class App(ctk.CTk):
         if control_type == "daw": return self.preset.get_daw(name)
         
     def set_control_data(self, control_type, index, data, name=""):
-        if control_type == "knob": self.preset.set_knob(index, **data)
-        if control_type == "fader": self.preset.set_fader(index, **data)
-        if control_type == "pad": self.preset.set_pad(index, **data)
-        if control_type == "switch": self.preset.set_switch(index, **data)
-        if control_type == "daw": self.preset.set_daw(name, **data)
+        with self.preset.edit(f"Edit {control_type} {name or index}"):
+            if control_type == "knob": self.preset.set_knob(index, **data)
+            if control_type == "fader": self.preset.set_fader(index, **data)
+            if control_type == "pad": self.preset.set_pad(index, **data)
+            if control_type == "switch": self.preset.set_switch(index, **data)
+            if control_type == "daw": self.preset.set_daw(name, **data)
+
+    def undo(self):
+        if self.preset.undo() is None: self.bell(); return
+        self.update_preset_label(); self.update_hotspot_labels()
+
+    def redo(self):
+        if self.preset.redo() is None: self.bell(); return
+        self.update_preset_label(); self.update_hotspot_labels()
         
     def load_preset_from_file(self):
         filepath = filedialog.askopenfilename(filetypes=[("SysEx files", "*.syx")]);
@@ -705,59 +705,115 @@ class App(ctk.CTk):
     def edit_preset_info(self):
         if not self.preset or not self.preset.sysex_data: messagebox.showerror("Error", "Load a preset first."); return
         new_name = ctk.CTkInputDialog(text="New name:", title="Edit Preset Name").get_input()
-        if new_name is not None: self.preset.set_preset_name(new_name)
+        if new_name is not None:
+            with self.preset.edit("Rename preset"): self.preset.set_preset_name(new_name)
         new_num_str = ctk.CTkInputDialog(text="New number (1-30):", title="Edit Preset Number").get_input()
         try:
             if new_num_str:
                 new_num = int(new_num_str)
-                if 1 <= new_num <= 30: self.preset.set_preset_number(new_num - 1)
+                if 1 <= new_num <= 30:
+                    with self.preset.edit("Renumber preset"): self.preset.set_preset_number(new_num - 1)
                 else: messagebox.showerror("Error", "The number must be between 1 and 30.")
         except ValueError: pass
         self.update_preset_label()
 
     # DENTRO LA CLASSE App
 
-    def midi_listener_thread(self, midi_in):
-        sysex_buffer = bytearray()
-        is_assembling = False
+    def on_sysex_received(self, sysex_bytes):
+        # Eseguito nel thread di Tk: il receiver lo programma una sola volta per dump completo
+        if not self.is_listening: return
+        print(f"Messaggio SysEx completo ricevuto ({len(sysex_bytes)} bytes).")
+        self.stop_midi_listener()
+        self.load_preset_from_data(sysex_bytes)
+
+    def on_listen_timeout(self):
+        self.listen_timeout_id = None
+        if not self.is_listening: return
+        writer = self.bulk_writer
+        self.stop_midi_listener()
+        if writer and writer.presets:
+            messagebox.showwarning("MIDI", f"Transfer stopped: {len(writer.presets)}/{PRESET_COUNT} presets saved to {writer.directory}.")
+        else:
+            messagebox.showwarning("MIDI", "No preset dump received from the keyboard.")
+
+    def receive_all_from_keyboard(self):
+        # Sulla tastiera: Global -> Sysex -> Send program -> All. Ogni dump viene salvato appena arriva.
+        if self.is_listening: return
+        if not self.find_keyboard_ports():
+            messagebox.showerror("MIDI Error", "MPK keyboard not found. Please connect it and try again.")
+            return
+        directory = filedialog.askdirectory(title=f"Folder for the {PRESET_COUNT} presets")
+        if not directory: return
 
         try:
-            while self.is_listening:
-                msg = midi_in.get_message()
-                if msg:
-                    chunk, _ = msg
-                    
-                    if not is_assembling and 0xF0 in chunk:
-                        start_index = chunk.index(0xF0)
-                        sysex_buffer.extend(chunk[start_index:])
-                        is_assembling = True
-                    elif is_assembling:
-                        sysex_buffer.extend(chunk)
-
-                    if is_assembling and 0xF7 in sysex_buffer:
-                        end_index = sysex_buffer.index(0xF7)
-                        complete_sysex = bytes(sysex_buffer[:end_index + 1])
-                        
-                        # Controlla che sia un preset valido Akai (lungo almeno 500 byte)
-                        if len(complete_sysex) > 500:
-                            print(f"Messaggio SysEx completo ricevuto ({len(complete_sysex)} bytes).")
-                            self.is_listening = False  # Abbiamo finito, smetti di ascoltare
-                            self.after(0, self.load_preset_from_data, complete_sysex)
-                        else:
-                            print(f"Ricevuto messaggio SysEx corto ({len(complete_sysex)} bytes), lo ignoro.")
-                            sysex_buffer = bytearray()
-                            is_assembling = False
-                
-                time.sleep(0.001)
-        finally:
-            # QUESTO BLOCCO VIENE ESEGUITO SEMPRE, sia che il thread finisca
-            # normalmente, sia che venga interrotto da stop_midi_listener.
-            # È il posto giusto per chiudere la porta.
-            print("Listener thread terminato, chiusura porta MIDI IN.")
-            midi_in.close_port()
-            self.after(0, self.reset_get_button)
+            writer = self.bulk_writer = PresetDumpWriter(directory)
+            self.receiver = SysexReceiver(self.midi.input(self.midi_in_name), on_frame=lambda frame: self.on_bulk_frame(writer, frame), max_frames=None)
+            self.receiver.start()
+            self.is_listening = True
+            self.listen_timeout_id = self.after(self.LISTEN_TIMEOUT_MS, self.on_listen_timeout)
 
-    
+            self.get_button.configure(state="disabled")
+            self.send_button.configure(state="disabled")
+            self.cancel_button.pack(side="left", padx=5)
+            self.midi_status_label.configure(text="Waiting for 'Send program -> All'...", text_color="gray")
+        except Exception as e:
+            messagebox.showerror("MIDI Error", f"Errore durante l'inizializzazione MIDI: {e}")
+            self.stop_midi_listener()
+
+    def on_bulk_frame(self, writer, frame):
+        # Thread di rtmidi: prima salva su disco, poi una sola after() per aggiornare la GUI
+        if writer.add(frame) is not None:
+            self.after(0, self.on_bulk_progress, writer)
+
+    def on_bulk_progress(self, writer):
+        if not self.is_listening or writer is not self.bulk_writer: return
+        self.midi_status_label.configure(text=f"Received {len(writer.presets)}/{writer.expected} presets", text_color="green")
+        if writer.complete:
+            self.stop_midi_listener()
+            messagebox.showinfo("Success", f"{len(writer.presets)} presets saved to {writer.directory}.")
+
+    def fetch_all_from_keyboard(self):
+        # Chiede ogni preset per numero, con più richieste in volo; nessuna azione sulla tastiera.
+        if self.is_listening: return
+        if not self.find_keyboard_ports():
+            messagebox.showerror("MIDI Error", "MPK keyboard not found. Please connect it and try again.")
+            return
+        directory = filedialog.askdirectory(title=f"Folder for the {PRESET_COUNT} presets")
+        if not directory: return
+
+        try:
+            writer = PresetDumpWriter(directory)
+            self.receiver = PresetFetcher(self.midi, self.midi_in_name, self.midi_out_name,
+                                          on_result=lambda number, preset, error: self.after(0, self.on_fetch_result, writer, preset),
+                                          on_done=lambda presets: self.after(0, self.on_fetch_done, writer))
+            self.receiver.start()
+            # In ascolto solo quando il fetcher è partito: se start() fallisce non c'è niente da fermare
+            self.bulk_writer = writer
+            self.is_listening = True
+            self.get_button.configure(state="disabled")
+            self.send_button.configure(state="disabled")
+            self.cancel_button.pack(side="left", padx=5)
+            self.midi_status_label.configure(text=f"Fetching 0/{writer.expected} presets...", text_color="gray")
+        except Exception as e:
+            messagebox.showerror("MIDI Error", f"Errore durante l'inizializzazione MIDI: {e}")
+            self.stop_midi_listener()
+
+    def on_fetch_result(self, writer, preset):
+        # Thread Tk: il fetcher chiama on_result col suo lock preso, quindi i file si scrivono qui
+        if writer is not self.bulk_writer or self.receiver is None: return
+        if preset is not None:
+            writer.add(preset.sysex_data)
+        self.midi_status_label.configure(text=f"Fetching {self.receiver.done}/{writer.expected} presets...", text_color="gray")
+
+    def on_fetch_done(self, writer):
+        if writer is not self.bulk_writer: return
+        self.stop_midi_listener()
+        missing = writer.expected - len(writer.presets)
+        self.midi_status_label.configure(text=f"Fetched {len(writer.presets)}/{writer.expected} presets", text_color="orange" if missing else "green")
+        if missing:
+            messagebox.showwarning("Fetch All", f"{len(writer.presets)} presets saved to {writer.directory}, {missing} did not answer.")
+        else:
+            messagebox.showinfo("Success", f"{len(writer.presets)} presets saved to {writer.directory}.")
 
     def load_preset_from_data(self, sysex_bytes):
         self.preset = MPK2Preset(data=sysex_bytes)
@@ -766,7 +822,17 @@ class App(ctk.CTk):
     
 
     def stop_midi_listener(self):
-        if self.is_listening: self.is_listening = False
+        if not self.is_listening: return
+        self.is_listening = False
+        if self.listen_timeout_id:
+            self.after_cancel(self.listen_timeout_id)
+            self.listen_timeout_id = None
+        print("Ascolto terminato.")
+        if self.receiver:
+            self.receiver.stop()
+        self.receiver = None
+        self.bulk_writer = None
+        self.reset_get_button()
 
     def reset_get_button(self):
         self.get_button.configure(state="normal"); self.send_button.configure(state="normal")
@@ -779,40 +845,30 @@ class App(ctk.CTk):
             print("Ascolto MIDI già attivo.")
             return
         
-        if not self.midi_in_name or not self.midi_out_name:
-            messagebox.showerror("MIDI Error", "MPK keyboard not found. Please connect it and restart the app.")
+        if not self.find_keyboard_ports():
+            messagebox.showerror("MIDI Error", "MPK keyboard not found. Please connect it and try again.")
             return
 
         try:
-            # Usa i nomi trovati dinamicamente
-            in_idx = self.in_ports.index(self.midi_in_name)
-            out_idx = self.out_ports.index(self.midi_out_name)
-            
-            print(f"Apertura porta di ingresso: '{self.in_ports[in_idx]}'")
-            midi_in = rtmidi.MidiIn()
-            midi_in.open_port(in_idx)
-            midi_in.ignore_types(sysex=False, timing=True, active_sense=True)
-
+            print(f"Ascolto sulla porta di ingresso: '{self.midi_in_name}'")
+            # Scarta i SysEx corti: un preset Akai valido è lungo almeno 500 byte
+            self.receiver = SysexReceiver(self.midi.input(self.midi_in_name), on_frame=lambda frame: self.after(0, self.on_sysex_received, frame), min_length=501)
+            self.receiver.start()
             self.is_listening = True
-            threading.Thread(target=self.midi_listener_thread, args=(midi_in,), daemon=True).start()
-            
-            print(f"Apertura porta di uscita per richiesta: '{self.out_ports[out_idx]}'")
-            midi_out = rtmidi.MidiOut()
-            midi_out.open_port(out_idx)
-            dump_request_message = [0xF0, 0x47, 0x00, 0x24, 0x31, 0x00, 0x01, 0x00, 0xF7]
-            midi_out.send_message(dump_request_message)
-            midi_out.close_port()
+            self.listen_timeout_id = self.after(self.LISTEN_TIMEOUT_MS, self.on_listen_timeout)
+
+            print(f"Richiesta di dump sulla porta di uscita: '{self.midi_out_name}'")
+            dump_request_message = dump_request(0)
+            self.midi.send(self.midi_out_name, dump_request_message)
             print("Richiesta di dump del preset inviata. In attesa di risposta...")
-            del midi_out
 
             self.get_button.configure(state="disabled")
             self.send_button.configure(state="disabled")
             self.cancel_button.pack(side="left", padx=5)
 
-        except (ValueError, IndexError):
-             messagebox.showerror("MIDI Error", "The MIDI ports seem to have changed. Please restart the app.")
         except Exception as e:
             messagebox.showerror("MIDI Error", f"Errore durante l'inizializzazione MIDI: {e}")
+            self.stop_midi_listener()
             self.reset_get_button()
 
     def send_preset_to_keyboard(self):
@@ -820,27 +876,91 @@ class App(ctk.CTk):
             messagebox.showerror("Error", "No preset to send.")
             return
             
-        if not self.midi_out_name:
-            messagebox.showerror("MIDI Error", "MPK keyboard not found. Please connect it and restart the app.")
+        if not self.find_keyboard_ports():
+            messagebox.showerror("MIDI Error", "MPK keyboard not found. Please connect it and try again.")
             return
 
         try:
-            # Usa il nome trovato dinamicamente
-            out_idx = self.out_ports.index(self.midi_out_name)
-            
-            midi_out = rtmidi.MidiOut()
-            midi_out.open_port(out_idx)
-            midi_out.send_message(list(self.preset.sysex_data))
-            midi_out.close_port()
-            del midi_out
-            messagebox.showinfo("Success", f"Preset sent to {self.out_ports[out_idx]}")
-        except (ValueError, IndexError):
-             messagebox.showerror("MIDI Error", "The MIDI ports seem to have changed. Please restart the app.")
+            # Niente conversione in lista: i byte vanno direttamente a rtmidi
+            sender = SysexSender(self.midi, self.midi_out_name)
+            latency = sender.send(self.preset.sysex_data)
+            self.midi_status_label.configure(text=f"Sent {sender.bytes} bytes in {latency * 1000:.1f} ms ({sender.rate / 1024:.1f} KB/s)", text_color="green")
+            messagebox.showinfo("Success", f"Preset sent to {self.midi_out_name}")
         except Exception as e:
             messagebox.showerror("MIDI Error", f"Send error: {e}")
 
+    def find_keyboard_ports(self):
+        """True if the MPK ports are known; re-scans (hot-plug) when they are not."""
+        if self.midi is None: return False
+        if self.midi_in_name and self.midi_out_name: return True
+        self.midi_in_name, self.midi_out_name = self.midi.find_mpk()
+        if self.midi_in_name and self.midi_out_name:
+            self.midi_status_label.configure(text=f"Ready: {self.midi_in_name}", text_color="green")
+            return True
+        return False
+
+    # --- MONITOR DAL VIVO ---
+    def toggle_monitor(self):
+        # Illumina l'hotspot di ciò che si suona sulla tastiera (solo i banchi visibili)
+        if self.monitor:
+            self.monitor.stop(); self.monitor = None
+            for widget in self.monitor_lit: widget.configure(fg_color="gray30")
+            self.monitor_lit.clear()
+            self.monitor_button.configure(text="Monitor")
+            self.midi_status_label.configure(text="")
+            return
+        if self.midi is None:
+            messagebox.showerror("MIDI Error", "MIDI not ready yet.")
+            return
+        try:
+            port = self.midi.find_mpk_play()
+            if port is None:
+                messagebox.showerror("MIDI Error", "Keyboard port not found.")
+                return
+            # Il callback rtmidi non tocca Tk: al primo messaggio di ogni frame pianifica un solo after()
+            self.monitor_generation = self.preset.generation
+            self.monitor = ControlMonitor(self.midi.input(port), live_index(self.preset.sysex_data or b""),
+                                          on_activity=lambda: self.after(self.MONITOR_FRAME_MS, self.flush_monitor)).start()
+            self.monitor_button.configure(text="Stop Monitor")
+            self.midi_status_label.configure(text=f"Monitoring {port}", text_color="green")
+        except Exception as e:
+            messagebox.showerror("MIDI Error", f"Error: {e}")
+            self.monitor = None
+
+    def monitor_widget(self, kind, index):
+        if kind == "daw": return self.daw_buttons.get(daw_names[index - 1])
+        if kind == "pad": return self.pad_buttons[(index - 1) % 16] if (index - 1) // 16 == self.current_pad_bank else None
+        if (index - 1) // 8 != self.current_control_bank: return None
+        if kind == "fader": return self.fader_widgets[(index - 1) % 8]['button']
+        return (self.knob_buttons if kind == "knob" else self.switch_buttons)[(index - 1) % 8]
+
+    def flush_monitor(self):
+        # Al massimo una volta per frame, qualunque sia il numero di messaggi arrivati
+        if not self.monitor: return
+        until = time.monotonic() + self.MONITOR_HOLD_MS / 1000
+        for kind, index in self.monitor.drain():
+            widget = self.monitor_widget(kind, index)
+            if widget is None: continue
+            if widget not in self.monitor_lit: widget.configure(fg_color=self.MONITOR_COLOR)
+            self.monitor_lit[widget] = until
+        if self.monitor_lit and not self.monitor_revert_id:
+            self.monitor_revert_id = self.after(self.MONITOR_HOLD_MS, self.revert_monitor)
+
+    def revert_monitor(self):
+        self.monitor_revert_id = None
+        now = time.monotonic()
+        for widget in [w for w, until in self.monitor_lit.items() if until <= now]:
+            widget.configure(fg_color="gray30")
+            del self.monitor_lit[widget]
+        if self.monitor_lit:
+            wait = min(self.monitor_lit.values()) - now
+            self.monitor_revert_id = self.after(max(self.MONITOR_FRAME_MS, int(wait * 1000)), self.revert_monitor)
+
     def on_closing(self):
-        self.is_listening = False; time.sleep(0.05); self.destroy()
+        self.stop_midi_listener()
+        if self.monitor: self.monitor.stop()
+        if self.midi: self.midi.close()
+        self.destroy()
 
 if __name__ == "__main__":
     app = App()
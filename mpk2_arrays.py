@@ -0,0 +1,66 @@
+# File: mpk2_arrays.py
+# NumPy structured-array views over the pad, knob, fader and switch tables of an MPK2Preset.
+# The arrays share memory with preset.sysex_data: assigning to a field edits the preset in place.
+#
+#   pads = mpk2_arrays.pads(preset)
+#   mpk2_arrays.bank(pads, "B")["channel"] = channel_map["USBA10"]     # channel of pad bank B
+#   mpk2_arrays.transpose_notes(pads, 12)                                # all note pads up an octave
+#   mpk2_arrays.touch(preset, "pads")                                    # array writes bypass the setters
+#
+# numpy is only needed by this module; the GUI and scripts do not import it.
+import numpy as np
+
+from mpk2_preset import PAD_LAYOUT, KNOB_LAYOUT, FADER_LAYOUT, SWITCH_LAYOUT
+
+# One name per byte of each block (bytes with several meanings get a neutral name)
+PAD_DTYPE = np.dtype([(n, "u1") for n in ("type", "channel", "number", "midi_to_din", "mode", "aftertouch",
+                                           "program", "msb", "lsb", "off_color", "on_color")])
+KNOB_DTYPE = np.dtype([(n, "u1") for n in ("type", "channel", "cc", "min", "max", "midi_to_din", "msb", "lsb", "value")])
+FADER_DTYPE = np.dtype([(n, "u1") for n in ("type", "channel", "cc", "min", "max", "midi_to_din")])
+# 13-byte switch block: byte 2 is the CC or program number, 4/5/6 program/msb/lsb for ProgBank (5 is also invert for CC)
+SWITCH_DTYPE = np.dtype([(n, "u1") for n in ("type", "channel", "number", "mode", "program", "msb", "lsb",
+                                              "midi_to_din", "note", "velocity", "reserved", "key1", "key2")])
+
+REGIONS = {"pads": (PAD_LAYOUT, PAD_DTYPE), "knobs": (KNOB_LAYOUT, KNOB_DTYPE),
+           "faders": (FADER_LAYOUT, FADER_DTYPE), "switches": (SWITCH_LAYOUT, SWITCH_DTYPE)}
+
+def touch(preset, kind):
+    """Marks a region edited through its array as changed, so the GUI refreshes it (see MPK2Preset.touch_range)."""
+    layout = REGIONS[kind][0]
+    preset.touch_range(layout.offset, layout.end)
+
+def region(preset, kind):
+    """Structured array of shape (count,) sharing memory with preset.sysex_data."""
+    layout, dtype = REGIONS[kind]
+    return np.frombuffer(preset.sysex_data, dtype=dtype, count=layout.count, offset=layout.offset)
+
+def pads(preset): return region(preset, "pads")
+def knobs(preset): return region(preset, "knobs")
+def faders(preset): return region(preset, "faders")
+def switches(preset): return region(preset, "switches")
+
+def bank(array, name):
+    """View of one bank ("A".."D") of a region array; works on stacked 2-D arrays too (last axis)."""
+    per_bank = 16 if array.dtype == PAD_DTYPE else 8
+    start = "ABCD".index(name) * per_bank
+    return array[..., start:start + per_bank]
+
+def transpose_notes(pad_array, semitones):
+    """Shifts every Note pad by semitones, clamped to 0-127. Returns the number of pads touched.
+    Like MPK2Preset, any type byte other than ProgramChange (1) or ProgramBank (2) counts as Note."""
+    is_note = ~np.isin(pad_array["type"], (1, 2))
+    notes = pad_array["number"][is_note].astype(np.int16) + semitones
+    pad_array["number"][is_note] = np.clip(notes, 0, 127)
+    return int(is_note.sum())
+
+# --- LIBRARY STACKING ---
+def stack(presets, kind):
+    """Copies one region of many presets into a 2-D array of shape (len(presets), count)."""
+    layout, dtype = REGIONS[kind]
+    out = np.empty((len(presets), layout.count), dtype=dtype)
+    for row, preset in zip(out, presets): row[...] = region(preset, kind)
+    return out
+
+def unstack(array, presets, kind):
+    """Writes the rows of a stacked array back into the presets it came from (and touches them)."""
+    for row, preset in zip(array, presets): region(preset, kind)[...] = row; touch(preset, kind)
@@ -0,0 +1,157 @@
+# File: mpk2_conflicts.py
+# Reverse index of what the controls send: (channel, message, number) -> the controls sending it, for one preset
+# or a whole library, built straight from the raw tables (one extended slice per column, nothing decoded).
+#
+#   index = ControlIndex(); index.add_preset(preset)
+#   index.lookup("USBA3", "cc", 74)      -> [(None, "knob", 5), (None, "switch", 12)]
+#   index.collisions()                    -> every (channel, message, number) sent by 2+ controls of a preset
+#   fix_cc_collisions(preset, pinned={("knob", 1)}, reserved=parse_cc_ranges("0-7"))
+#   cc_collisions(preset.sysex_data)      -> what is left: collisions between controls that may not move
+import bisect
+import os
+from collections import defaultdict
+
+from mpk2_preset import MPK2Preset, LAYOUTS, channel_map, channel_map_rev, note_map, note_map_rev, is_preset_dump
+
+# Per kind, type byte -> (message, byte index of its number in the block). Types not listed send nothing
+# numbered (aftertouch, keystrokes); pads with an unknown type byte behave as Note pads, like the getters.
+MESSAGES = {
+    "knob": {0: ("cc", 2), 2: ("cc", 2), 3: ("cc", 2)}, # MIDI_CC, INC_DEC1, INC_DEC2
+    "fader": {0: ("cc", 2)},
+    "pad": {0: ("note", 2), 1: ("program", 2), 2: ("program", 6)},
+    "switch": {0: ("cc", 2), 1: ("note", 8), 2: ("program", 2), 3: ("program", 4)}}
+MESSAGES["daw"] = MESSAGES["switch"]
+FALLBACK_TYPES = {"pad": 0}
+
+def _channel(channel):
+    return channel_map[channel] if isinstance(channel, str) else int(channel)
+
+def _number(message, number):
+    return note_map[number] if message == "note" and isinstance(number, str) else int(number)
+
+def describe(key):
+    """(channel byte, message, number) -> "CC 74 on USBA3", "note C3 on USBA10", ..."""
+    channel, message, number = key
+    value = note_map_rev.get(number, number) if message == "note" else number
+    return f"{'CC' if message == 'cc' else message} {value} on {channel_map_rev.get(channel, channel)}"
+
+def iter_messages(data):
+    """(channel byte, message, number, kind, index) for every control of a raw dump that sends a numbered message."""
+    for kind, layout in LAYOUTS.items():
+        start, end, size = layout.offset, layout.end, layout.size
+        if len(data) < end: continue
+        messages = MESSAGES[kind]; fallback = messages.get(FALLBACK_TYPES.get(kind))
+        # Whole columns at once: types, channels and every byte a number can live in
+        columns = {i: data[start + i:end:size] for i in {i for _, i in messages.values()}}
+        for n, (type_byte, channel) in enumerate(zip(data[start:end:size], data[start + 1:end:size])):
+            message = messages.get(type_byte, fallback)
+            if message: yield channel, message[0], columns[message[1]][n], kind, n + 1
+
+class ControlIndex:
+    """(channel byte, message, number) -> [(source, kind, index)], message being "cc", "note" or "program".
+    source tells presets apart when several are indexed (a path, or whatever add() was given)."""
+
+    def __init__(self):
+        self.controls = defaultdict(list)
+
+    def add(self, data, source=None):
+        for channel, message, number, kind, index in iter_messages(data):
+            self.controls[channel, message, number].append((source, kind, index))
+
+    def add_preset(self, preset, source=None):
+        if preset.sysex_data: self.add(preset.sysex_data, source)
+
+    def lookup(self, channel, message, number):
+        """Controls sending message number on channel (a name like "USBA3" or the byte; notes by name or number)."""
+        return self.controls.get((_channel(channel), message, _number(message, number)), [])
+
+    def collisions(self, messages=("cc", "note")):
+        """[(key, source, [(kind, index), ...])] for every key sent by two or more controls of the same preset."""
+        found = []
+        for key, entries in self.controls.items():
+            if key[1] not in messages or len(entries) < 2: continue
+            by_source = defaultdict(list)
+            for source, kind, index in entries: by_source[source].append((kind, index))
+            found.extend((key, source, controls) for source, controls in by_source.items() if len(controls) > 1)
+        return sorted(found, key=lambda c: (str(c[1]), c[0]))
+
+def index_files(paths):
+    """ControlIndex over .syx files (first preset of each), with the path as source."""
+    index = ControlIndex()
+    for path in paths:
+        with open(path, "rb") as f: data = f.read()
+        if is_preset_dump(data): index.add(data, path)
+        else: index.add_preset(MPK2Preset(path), path) # multi-preset or padded files
+    return index
+
+def index_library(library, **filters):
+    """ControlIndex over the presets of a PresetLibrary (same filters as PresetLibrary.presets)."""
+    return index_files(path for path, model, _, _ in library.presets(**filters) if model and os.path.exists(path))
+
+# Status nibble of each message kind, for matching incoming MIDI (note offs are not looked up)
+STATUS = {"cc": 0xB0, "note": 0x90, "program": 0xC0}
+
+def live_index(data, port="A", common_channel=0):
+    """(status, MIDI channel 0-15, number) -> [(kind, index)] for the controls that play on one USB port
+    ("A" for USBA1-16, "B" for USBB1-16). Controls on the Common channel are placed on common_channel."""
+    index = defaultdict(list); base = 0 if port == "A" else 0x10
+    for channel, message, number, kind, i in iter_messages(data):
+        if channel == 0: channel = common_channel
+        elif base < channel <= base + 16: channel -= base + 1
+        else: continue
+        index[STATUS[message], channel, number].append((kind, i))
+    return dict(index)
+
+# --- CC COLLISION SOLVER ---
+MOVABLE_KINDS = ("knob", "fader", "switch")
+
+def parse_cc_ranges(text):
+    """"0-7,120-127" -> {0, ..., 7, 120, ..., 127}."""
+    ccs = set()
+    for part in filter(None, text.split(",")):
+        first, _, last = part.partition("-")
+        ccs.update(range(int(first), int(last or first) + 1))
+    if not ccs <= set(range(128)): raise ValueError(f"CC numbers must be 0-127: {text}")
+    return ccs
+
+def solve_cc(data, pinned=(), reserved=(), kinds=MOVABLE_KINDS):
+    """New CCs that leave no channel with two controls on the same CC, changing as few controls as possible.
+
+    Each CC keeps one of its controls (a pinned one, or a control of another kind such as a DAW button, if any;
+    otherwise the first in knob, fader, switch order) and the others move to the nearest CC free on their channel,
+    so the number of changed controls is the minimum (one fewer than the controls per CC). Controls in pinned
+    ((kind, index) pairs) or of kinds not in kinds never move; movable controls on a reserved CC always move.
+    Returns [(kind, index, old cc, new cc)]; raises ValueError when a channel runs out of free CCs."""
+    pinned, reserved = set(pinned), set(reserved)
+    channels = defaultdict(lambda: defaultdict(list)) # channel -> cc -> [(kind, index)]
+    for channel, message, number, kind, index in iter_messages(data):
+        if message == "cc": channels[channel][number].append((kind, index))
+    moves = []
+    for channel, ccs in channels.items():
+        movers = []
+        for cc, controls in ccs.items():
+            movable = [c for c in controls if c[0] in kinds and c not in pinned]
+            if cc in reserved: movers.extend((c, cc) for c in movable); continue
+            movers.extend((c, cc) for c in movable[len(movable) == len(controls):]) # nothing fixed here: first one stays
+        if not movers: continue
+        free = sorted(set(range(128)) - set(ccs) - reserved)
+        for (kind, index), cc in sorted(movers):
+            if not free: raise ValueError(f"No free CC left on {channel_map_rev.get(channel, channel)}")
+            i = bisect.bisect_left(free, cc)
+            if i == len(free) or (i > 0 and cc - free[i - 1] <= free[i] - cc): i -= 1 # nearest, lower on a tie
+            moves.append((kind, index, cc, free.pop(i)))
+    return moves
+
+def cc_collisions(data):
+    """[(key, [(kind, index), ...])] for every CC sent by two or more controls of one dump on the same channel:
+    after solve_cc, the ones it could not move (pinned controls, or kinds it was not allowed to change)."""
+    index = ControlIndex(); index.add(data)
+    return [(key, controls) for key, _, controls in index.collisions(("cc",))]
+
+def fix_cc_collisions(preset, pinned=(), reserved=(), kinds=MOVABLE_KINDS):
+    """Applies solve_cc to a preset through its setters, as one undo step; returns the moves."""
+    if not preset.sysex_data: return []
+    moves = solve_cc(preset.sysex_data, pinned, reserved, kinds)
+    with preset.edit("Fix CC collisions"):
+        for kind, index, old, new in moves: getattr(preset, "set_" + kind)(index, cc=new)
+    return moves
@@ -0,0 +1,233 @@
+# File: mpk2_daemon.py
+# Resident service: keeps presets decoded and MIDI ports open, and answers newline-delimited JSON-RPC
+# on a Unix domain socket, so scripts pay neither interpreter/rtmidi startup nor port opening per call.
+#
+#   python mpk2_daemon.py [--socket PATH]
+#   request:  {"id": 1, "method": "get", "params": {"path": "a.syx", "kind": "knob", "index": 3}}\n
+#   reply:    {"id": 1, "result": {...}}\n   or   {"id": 1, "error": "message"}\n
+#
+# Methods: ping, ports, load, get, set, edit, save, close, send, fetch, shutdown (see the rpc_* docstrings).
+import argparse
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+
+from mpk2_preset import MPK2Preset, LAYOUTS, daw_names, write_atomic
+from mpk2_edits import parse_edits, apply_edits, get_control
+
+# Per-user: $XDG_RUNTIME_DIR is private to the user; otherwise a 0700 folder of our own in the temp dir
+DEFAULT_SOCKET = os.environ.get("MPK2_SOCKET") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or os.path.join(tempfile.gettempdir(), f"mpk2d-{os.getuid()}"), "mpk2d.sock")
+
+def _private_dir(path):
+    """Creates path 0700 if missing; refuses a folder another user owns or others can write to."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.stat(path)
+    if st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise PermissionError(f"{path} must be owned by you and not writable by others")
+
+def _output_path(path):
+    """Absolute path the daemon may write a preset to: a .syx file, not a symlink (it runs with the user's rights)."""
+    path = os.path.abspath(path)
+    if os.path.splitext(path)[1].lower() != ".syx": raise ValueError(f"Output must be a .syx file: {path}")
+    if os.path.islink(path): raise ValueError(f"Output is a symlink: {path}")
+    return path
+
+class PresetDaemon:
+    def __init__(self, backend=None):
+        self.backend = backend # rtmidi-like module for MidiPorts (None: rtmidi, imported on first MIDI call)
+        self.presets = {} # abspath -> [MPK2Preset, mtime, size, dirty]
+        self._lock = threading.Lock()
+        self._midi_lock = threading.Lock() # one transfer at a time on the shared ports
+        self._midi = None
+        self._senders = {}
+        self.server = None
+
+    # --- PRESET CACHE ---
+    def _entry(self, path):
+        """Cached preset for path, re-read if the file changed on disk and the cached copy has no unsaved edits."""
+        path = os.path.abspath(path)
+        entry = self.presets.get(path)
+        try: st = os.stat(path)
+        except FileNotFoundError:
+            if entry: return entry
+            raise
+        if entry is None or (not entry[3] and (entry[1], entry[2]) != (st.st_mtime, st.st_size)):
+            preset = MPK2Preset(path)
+            if not preset.sysex_data: raise ValueError(f"Cannot read {path}")
+            entry = self.presets[path] = [preset, st.st_mtime, st.st_size, False]
+        return entry
+
+    @staticmethod
+    def _info(preset):
+        return {"model": preset.get_model(), "number": preset.get_preset_number(), "name": preset.get_preset_name()}
+
+    @staticmethod
+    def _index(kind, index):
+        index = daw_names.index(index) + 1 if kind == "daw" and index in daw_names else int(index)
+        if not 1 <= index <= LAYOUTS[kind].count: raise ValueError(f"{kind} index out of range 1-{LAYOUTS[kind].count}")
+        return index
+
+    def rpc_ping(self): return "pong"
+
+    def rpc_load(self, path):
+        """Loads (or re-uses) a preset; returns model, number, name and whether it has unsaved edits."""
+        with self._lock:
+            entry = self._entry(path)
+            return {**self._info(entry[0]), "dirty": entry[3]}
+
+    def rpc_get(self, path, kind, index=None):
+        """One control decoded (index 1-based, or a DAW button name), or every control of kind if index is omitted."""
+        with self._lock:
+            preset = self._entry(path)[0]
+            if index is not None: return dict(get_control(preset, kind, self._index(kind, index)))
+            return [dict(get_control(preset, kind, i)) for i in range(1, LAYOUTS[kind].count + 1)]
+
+    def rpc_set(self, path, kind, index, values):
+        """Writes one control in memory (save writes the file); returns it decoded."""
+        unknown = [key for key in values if key not in LAYOUTS[kind].names]
+        if unknown: raise ValueError(f"Unknown {kind} field(s) {', '.join(unknown)} (fields: {', '.join(LAYOUTS[kind].names)})")
+        with self._lock:
+            entry = self._entry(path); preset = entry[0]; index = self._index(kind, index)
+            apply_edits(preset, [(kind, [index], values)]); entry[3] = True
+            return dict(get_control(preset, kind, index))
+
+    def rpc_edit(self, path, specs):
+        """Applies edit specs (mpk2_edits syntax, list or ';'-separated) in memory."""
+        edits = parse_edits(specs)
+        with self._lock:
+            entry = self._entry(path)
+            apply_edits(entry[0], edits); entry[3] = True
+            return {"controls": sum(len(indexes) for _, indexes, _ in edits)}
+
+    def rpc_save(self, path, output=None):
+        """Writes the cached preset to output (default: its own file, atomically); output must be a .syx file."""
+        with self._lock:
+            entry = self._entry(path)
+            target = _output_path(output) if output else os.path.abspath(path)
+            write_atomic(target, entry[0].sysex_data)
+            if target == os.path.abspath(path):
+                st = os.stat(target); entry[1:] = [st.st_mtime, st.st_size, False]
+            return target
+
+    def rpc_close(self, path):
+        """Drops a preset from the cache (unsaved edits are lost)."""
+        with self._lock: return self.presets.pop(os.path.abspath(path), None) is not None
+
+    # --- MIDI ---
+    @property
+    def midi(self):
+        if self._midi is None:
+            from mpk2_midi import MidiPorts
+            self._midi = MidiPorts(backend=self.backend)
+        return self._midi
+
+    def _ports(self, port_in=None, port_out=None):
+        found_in, found_out = self.midi.find_mpk()
+        port_in = self.midi.find("in", port_in) if port_in else found_in
+        port_out = self.midi.find("out", port_out) if port_out else found_out
+        return port_in, port_out
+
+    def rpc_ports(self):
+        self.midi.refresh()
+        return {"in": self.midi.in_ports, "out": self.midi.out_ports, "mpk": self._ports()}
+
+    def rpc_send(self, path, port=None):
+        """Sends the cached preset to the keyboard; returns bytes sent and latency in seconds."""
+        from mpk2_midi import SysexSender
+        with self._lock: data = bytes(self._entry(path)[0].sysex_data)
+        with self._midi_lock:
+            port_out = self._ports(port_out=port)[1]
+            if port_out is None: raise IOError("MPK output port not found")
+            sender = self._senders.get(port_out) or self._senders.setdefault(port_out, SysexSender(self.midi, port_out))
+            latency = sender.send(data)
+        return {"port": port_out, "bytes": len(data), "latency": latency}
+
+    def rpc_fetch(self, number=0, path=None, port_in=None, port_out=None, timeout=2.0):
+        """Requests preset number (0-29) from the keyboard; caches it under path and saves it there if given."""
+        from mpk2_midi import PresetFetcher
+        with self._midi_lock:
+            port_in, port_out = self._ports(port_in, port_out)
+            if port_in is None or port_out is None: raise IOError("MPK ports not found")
+            presets = PresetFetcher(self.midi, port_in, port_out, window=1, timeout=timeout, retries=1).start([number]).wait()
+        if number not in presets: raise TimeoutError(f"No reply for preset {number + 1}")
+        preset = presets[number]
+        if path:
+            path = _output_path(path); write_atomic(path, preset.sysex_data); st = os.stat(path)
+            with self._lock: self.presets[path] = [preset, st.st_mtime, st.st_size, False]
+        return {**self._info(preset), "path": path}
+
+    def rpc_shutdown(self):
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return True
+
+    # --- SERVER ---
+    def call(self, method, params):
+        handler = getattr(self, "rpc_" + str(method), None)
+        if handler is None: raise ValueError(f"Unknown method '{method}'")
+        return handler(**(params or {}))
+
+    def serve(self, socket_path=DEFAULT_SOCKET):
+        if socket_path == DEFAULT_SOCKET and not os.environ.get("MPK2_SOCKET"): _private_dir(os.path.dirname(socket_path))
+        if os.path.exists(socket_path):
+            try:
+                with socket.socket(socket.AF_UNIX) as s: s.connect(socket_path)
+                raise RuntimeError(f"A daemon is already listening on {socket_path}")
+            except ConnectionRefusedError: os.unlink(socket_path) # left over from a crash
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                # One connection, many requests: the client keeps the socket open between calls
+                for line in self.rfile:
+                    if not line.strip(): continue
+                    request = {}
+                    try:
+                        request = json.loads(line)
+                        reply = {"id": request.get("id"), "result": daemon.call(request.get("method"), request.get("params"))}
+                    except Exception as e:
+                        reply = {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+                    self.wfile.write(json.dumps(reply).encode() + b"\n"); self.wfile.flush()
+
+        class Server(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+        umask = os.umask(0o177) # the socket is created 0600: only this user can connect
+        try: self.server = Server(socket_path, Handler)
+        finally: os.umask(umask)
+        with self.server:
+            try: self.server.serve_forever()
+            finally:
+                os.unlink(socket_path)
+                if self._midi: self._midi.close()
+
+class DaemonClient:
+    """Keeps one connection to the daemon; call("get", path=..., kind=..., index=...) returns the result or raises."""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX)
+        self.sock.connect(socket_path)
+        self.file = self.sock.makefile("rwb")
+        self._id = 0
+
+    def call(self, method, **params):
+        self._id += 1
+        self.file.write(json.dumps({"id": self._id, "method": method, "params": params}).encode() + b"\n"); self.file.flush()
+        line = self.file.readline()
+        if not line: raise ConnectionError("Daemon closed the connection")
+        reply = json.loads(line)
+        if "error" in reply: raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def close(self):
+        self.file.close(); self.sock.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MPK2 preset daemon (JSON-RPC over a Unix socket)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"Socket path (default: {DEFAULT_SOCKET})")
+    args = parser.parse_args()
+    print(f"Listening on {args.socket}")
+    PresetDaemon().serve(args.socket)
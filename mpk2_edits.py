@@ -0,0 +1,69 @@
+# File: mpk2_edits.py
+# Text edit specs applied through the MPK2Preset setters, used by the batch CLI and the daemon.
+#
+#   "pads bank A channel=USBA10"      every pad of bank A
+#   "knobs 1-8 min=0 max=100"         knobs 1 to 8
+#   "switches 1,3,5 type=CC cc=20"    a list of indexes
+#   "daw Left,Right channel=USBA2"    DAW buttons by name (or 1-5)
+#   "faders all midi_to_din=On"       every fader
+from mpk2_preset import LAYOUTS, BANK_SIZES, daw_names
+
+KINDS = {"pad": "pad", "pads": "pad", "knob": "knob", "knobs": "knob", "fader": "fader", "faders": "fader",
+         "switch": "switch", "switches": "switch", "daw": "daw"}
+SETTERS = {"pad": "set_pad", "knob": "set_knob", "fader": "set_fader", "switch": "set_switch"}
+
+def get_control(preset, kind, index):
+    """Decoded control by kind and 1-based index (DAW buttons too)."""
+    if kind == "daw": return preset.get_daw(daw_names[index - 1])
+    return getattr(preset, "get_" + kind)(index)
+
+def _indexes(kind, words):
+    """Selector words -> 1-based indexes; returns (indexes, number of words used)."""
+    count = LAYOUTS[kind].count
+    if words[0].lower() == "all": return list(range(1, count + 1)), 1
+    if words[0].lower() == "bank":
+        if kind not in BANK_SIZES: raise ValueError(f"{kind} has no banks")
+        size = BANK_SIZES[kind]; bank = ord(words[1].upper()) - ord("A")
+        if not 0 <= bank < count // size: raise ValueError(f"No {kind} bank {words[1]}")
+        return list(range(bank * size + 1, (bank + 1) * size + 1)), 2
+    indexes = []
+    for part in words[0].split(","):
+        if kind == "daw" and part in daw_names: indexes.append(daw_names.index(part) + 1); continue
+        first, _, last = part.partition("-")
+        indexes.extend(range(int(first), int(last or first) + 1))
+    if not all(1 <= i <= count for i in indexes): raise ValueError(f"{kind} index out of range 1-{count}: {words[0]}")
+    return indexes, 1
+
+def parse_selection(spec):
+    """"pads bank A" / "knobs 1-8" / "switches 1,3" -> ("pad", [1..16]), without values (e.g. controls to pin)."""
+    words = spec.split()
+    if len(words) < 2 or words[0].lower() not in KINDS: raise ValueError(f"Bad selection: '{spec}'")
+    kind = KINDS[words[0].lower()]
+    indexes, used = _indexes(kind, words[1:])
+    if used != len(words) - 1: raise ValueError(f"Bad selection: '{spec}'")
+    return kind, indexes
+
+def parse_edit(spec):
+    """"knobs 1-8 min=0 max=100" -> ("knob", [1..8], {"min": 0, "max": 100})."""
+    words = spec.split()
+    if len(words) < 3 or words[0].lower() not in KINDS: raise ValueError(f"Bad edit spec: '{spec}'")
+    kind = KINDS[words[0].lower()]
+    indexes, used = _indexes(kind, words[1:])
+    values = {}
+    for word in words[1 + used:]:
+        key, sep, value = word.partition("=")
+        if not sep: raise ValueError(f"Expected key=value, got '{word}' in '{spec}'")
+        if key not in LAYOUTS[kind].names: raise ValueError(f"Unknown {kind} field '{key}' in '{spec}' (fields: {', '.join(LAYOUTS[kind].names)})")
+        values[key] = int(value) if value.isdigit() else value
+    return kind, indexes, values
+
+def parse_edits(specs):
+    """Several specs, given as a list or as one string separated by ';'."""
+    if isinstance(specs, str): specs = specs.split(";")
+    return [parse_edit(spec) for spec in specs if spec.strip()]
+
+def apply_edits(preset, edits):
+    for kind, indexes, values in edits:
+        for index in indexes:
+            if kind == "daw": preset.set_daw(daw_names[index - 1], **values)
+            else: getattr(preset, SETTERS[kind])(index, **values)
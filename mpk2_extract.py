@@ -0,0 +1,78 @@
+# File: mpk2_extract.py
+# Pulls MPK2 preset dumps out of long MIDI recordings: raw wire captures (any file or pipe of MIDI bytes)
+# and Standard MIDI Files. Input is read in fixed-size chunks, so memory stays flat on multi-gigabyte logs.
+#
+#   for preset in extract_presets("rig_tuesday.bin"): print(preset.file_name())
+import os
+import struct
+
+from mpk2_preset import MPK2Preset, is_preset_dump
+from mpk2_sysex import SysexStream, SYSEX_START, SYSEX_END
+
+MAX_FRAME = 4096 # a preset dump is ~1.5 KB: anything longer is not one, stop assembling it
+
+def iter_raw_frames(f, chunk_size=1 << 20):
+    """SysEx frames of a raw MIDI byte stream (realtime bytes removed, interrupted frames dropped)."""
+    stream = SysexStream(raw=True, max_length=MAX_FRAME)
+    for chunk in iter(lambda: f.read(chunk_size), b""):
+        yield from stream.feed(chunk)
+
+def _read_varlen(f):
+    value = 0
+    while True:
+        byte = f.read(1)
+        if not byte: raise EOFError("Truncated MIDI file")
+        value = (value << 7) | (byte[0] & 0x7F)
+        if byte[0] < 0x80: return value
+
+def iter_smf_frames(f):
+    """SysEx frames of a Standard MIDI File, track by track. Split SysEx (F0 ... then F7 continuation
+    events) are joined; each yielded frame is F0 ... F7 like on the wire."""
+    magic, length = struct.unpack(">4sI", f.read(8))
+    if magic != b"MThd": raise ValueError("Not a Standard MIDI File")
+    f.read(length)
+    while True:
+        header = f.read(8)
+        if len(header) < 8: return
+        magic, length = struct.unpack(">4sI", header)
+        end = f.tell() + length
+        if magic != b"MTrk": f.seek(end); continue
+        status = 0; pending = None
+        while f.tell() < end:
+            _read_varlen(f) # delta time
+            byte = f.read(1)[0]
+            if byte == 0xFF: # meta event
+                f.read(1); f.seek(_read_varlen(f), os.SEEK_CUR)
+            elif byte in (SYSEX_START, SYSEX_END):
+                data = f.read(_read_varlen(f))
+                if byte == SYSEX_START: pending = bytearray([SYSEX_START])
+                if pending is None: continue # F7 escape outside a SysEx: arbitrary bytes, not ours
+                pending += data
+                if len(pending) > MAX_FRAME: pending = None
+                elif data.endswith(b"\xF7"): yield bytes(pending); pending = None
+            else: # channel message, possibly with running status
+                if byte >= 0x80: status = byte; byte = f.read(1)[0]
+                if status & 0xF0 not in (0xC0, 0xD0): f.read(1)
+        f.seek(end)
+
+def iter_frames_from_file(path, chunk_size=1 << 20):
+    with open(path, "rb") as f:
+        smf = f.read(4) == b"MThd"; f.seek(0)
+        yield from iter_smf_frames(f) if smf else iter_raw_frames(f, chunk_size)
+
+def extract_presets(path):
+    """Every MPK2 preset dump in a capture or .mid file (Akai header and a known model byte), as MPK2Preset."""
+    for frame in iter_frames_from_file(path):
+        if is_preset_dump(frame): yield MPK2Preset(data=frame)
+
+def extract_to_directory(path, directory, library=None):
+    """Saves every dump found in path into directory (numbered in capture order, since the same preset is
+    often dumped many times) and indexes each file into library (a PresetLibrary) if given. Returns the paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for n, preset in enumerate(extract_presets(path), 1):
+        out = os.path.join(directory, f"{n:05d}_{preset.file_name()}")
+        preset.save_to_file(out); paths.append(out)
+        if library is not None: library.index_file(out, commit=False)
+    if library is not None: library.db.commit()
+    return paths
@@ -0,0 +1,121 @@
+# File: mpk2_library.py
+# SQLite index of a folder tree of MPK2 .syx dumps: one row per file plus one row per control,
+# so searches like "pads sending C2 on USBA10" never open a .syx file.
+#
+#   lib = PresetLibrary("presets.db")
+#   lib.rescan("~/MPK")                                  # only new/changed files are parsed
+#   lib.find(kind="pad", note="C2", channel="USBA10")    # -> [(path, name, number, kind, idx), ...]
+import hashlib
+import os
+import sqlite3
+
+from mpk2_preset import MPK2Preset, is_preset_dump, daw_names, PAD_COUNT, KNOB_COUNT, FADER_COUNT, SWITCH_COUNT
+from mpk2_sysex import iter_frames
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime REAL, size INTEGER, hash TEXT,
+    model TEXT, number INTEGER, name TEXT);
+CREATE TABLE IF NOT EXISTS controls (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    kind TEXT, idx INTEGER, type TEXT, channel TEXT, cc INTEGER, note TEXT, program INTEGER);
+CREATE INDEX IF NOT EXISTS controls_file ON controls(file_id);
+CREATE INDEX IF NOT EXISTS controls_note ON controls(note, channel);
+CREATE INDEX IF NOT EXISTS controls_cc ON controls(cc, channel);
+CREATE INDEX IF NOT EXISTS files_hash ON files(hash);
+"""
+
+CONTROL_COLUMNS = ("kind", "idx", "type", "channel", "cc", "note", "program")
+FILE_COLUMNS = ("model", "number", "name", "hash")
+
+def control_rows(preset):
+    """(kind, idx, type, channel, cc, note, program) for every control, as decoded by the getters."""
+    controls = ([("pad", i, preset.get_pad(i)) for i in range(1, PAD_COUNT + 1)] +
+                [("knob", i, preset.get_knob(i)) for i in range(1, KNOB_COUNT + 1)] +
+                [("fader", i, preset.get_fader(i)) for i in range(1, FADER_COUNT + 1)] +
+                [("switch", i, preset.get_switch(i)) for i in range(1, SWITCH_COUNT + 1)] +
+                [("daw", i, preset.get_daw(name)) for i, name in enumerate(daw_names, 1)])
+    return [(kind, idx, c.get("type"), str(c.get("channel")), c.get("cc"), c.get("note"), c.get("program"))
+            for kind, idx, c in controls]
+
+def walk_syx(root):
+    for entry in os.scandir(root):
+        if entry.is_dir(follow_symlinks=False): yield from walk_syx(entry.path)
+        elif entry.name.lower().endswith(".syx"): yield entry
+
+class PresetLibrary:
+    def __init__(self, db_path="mpk2_library.db"):
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self): self.db.close()
+
+    def rescan(self, root):
+        """Indexes every .syx under root; files whose mtime and size are unchanged are not read.
+        Rows of files that disappeared from root are dropped. Returns {"added", "updated", "removed", "unchanged"}."""
+        root = os.path.abspath(os.path.expanduser(root)); prefix = os.path.join(root, "")
+        known = {path: (fid, mtime, size) for fid, path, mtime, size in self.db.execute(
+            "SELECT id, path, mtime, size FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))}
+        stats = dict.fromkeys(("added", "updated", "removed", "unchanged"), 0)
+        with self.db:
+            for entry in walk_syx(root):
+                st = entry.stat(); row = known.pop(entry.path, None)
+                if row and row[1] == st.st_mtime and row[2] == st.st_size: stats["unchanged"] += 1; continue
+                self._index_file(entry.path, st, row and row[0])
+                stats["updated" if row else "added"] += 1
+            for fid, _, _ in known.values(): self.db.execute("DELETE FROM files WHERE id = ?", (fid,))
+            stats["removed"] = len(known)
+        return stats
+
+    def index_file(self, path, commit=True):
+        """Adds or refreshes a single file (e.g. one just written by the extractor)."""
+        path = os.path.abspath(path)
+        row = self.db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        self._index_file(path, os.stat(path), row and row[0])
+        if commit: self.db.commit()
+
+    def _index_file(self, path, st, file_id=None):
+        with open(path, "rb") as f: data = f.read()
+        frame = next(iter_frames(data), b"")
+        # Files that are not preset dumps still get a row (model NULL), so they are not re-read next time
+        preset = MPK2Preset(data=frame) if is_preset_dump(frame) else None
+        values = (path, st.st_mtime, st.st_size, hashlib.sha1(data).hexdigest(),
+                  preset and preset.get_model(), preset and preset.get_preset_number(), preset and preset.get_preset_name())
+        if file_id is None:
+            file_id = self.db.execute("INSERT INTO files (path, mtime, size, hash, model, number, name) VALUES (?, ?, ?, ?, ?, ?, ?)", values).lastrowid
+        else:
+            self.db.execute("UPDATE files SET path = ?, mtime = ?, size = ?, hash = ?, model = ?, number = ?, name = ? WHERE id = ?", values + (file_id,))
+            self.db.execute("DELETE FROM controls WHERE file_id = ?", (file_id,))
+        if preset:
+            self.db.executemany("INSERT INTO controls (file_id, kind, idx, type, channel, cc, note, program) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                [(file_id,) + row for row in control_rows(preset)])
+
+    def find(self, **filters):
+        """Controls matching every filter, e.g. find(kind="pad", note="C2", channel="USBA10").
+        Keys: kind, idx, type, channel, cc, note, program (control) and model, number, name, hash (file).
+        Returns [(path, name, number, kind, idx), ...] ordered by path."""
+        where, args = self._where(filters)
+        return self.db.execute("SELECT f.path, f.name, f.number, c.kind, c.idx FROM controls c JOIN files f ON f.id = c.file_id"
+                               f"{where} ORDER BY f.path, c.kind, c.idx", args).fetchall()
+
+    def presets(self, **filters):
+        """Distinct (path, model, number, name) of the files with at least one control matching filters."""
+        where, args = self._where(filters)
+        if not set(filters) & set(CONTROL_COLUMNS):
+            return self.db.execute(f"SELECT f.path, f.model, f.number, f.name FROM files f{where} ORDER BY f.path", args).fetchall()
+        return self.db.execute("SELECT DISTINCT f.path, f.model, f.number, f.name FROM controls c JOIN files f ON f.id = c.file_id"
+                               f"{where} ORDER BY f.path", args).fetchall()
+
+    def duplicates(self):
+        """Groups of paths whose content hash is identical."""
+        rows = self.db.execute("SELECT hash, group_concat(path, char(10)) FROM files GROUP BY hash HAVING count(*) > 1").fetchall()
+        return [paths.split("\n") for _, paths in rows]
+
+    def _where(self, filters):
+        clauses = []
+        for key in filters:
+            if key in CONTROL_COLUMNS: clauses.append(f"c.{key} = ?")
+            elif key in FILE_COLUMNS: clauses.append(f"f.{key} = ?")
+            else: raise KeyError(f"Unknown filter '{key}'")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), list(filters.values())
@@ -0,0 +1,57 @@
+# File: mpk2_merge.py
+# Three-way merge of presets (base, ours, theirs), one control block at a time.
+# Blocks are compared as memoryviews, nothing is decoded: a block changed on one side only is taken from that side,
+# a block changed differently on both sides is a conflict. Bytes outside the known blocks are merged one by one.
+from mpk2_preset import MPK2Preset, LAYOUTS, write_atomic
+
+# (kind, index, start, end): name and number first, then every control block of the layouts
+UNITS = [("number", 0, 7, 8), ("name", 0, 8, 16)] + [
+    (kind, i + 1, layout.block_offset(i + 1), layout.block_offset(i + 2)) for kind, layout in LAYOUTS.items() for i in range(layout.count)]
+
+def _gaps(length):
+    """Byte ranges of a frame not covered by UNITS."""
+    gaps = []; pos = 0
+    for _, _, start, end in sorted(UNITS, key=lambda u: u[2]):
+        if start > pos: gaps.append((pos, start))
+        pos = max(pos, end)
+    if pos < length: gaps.append((pos, length))
+    return gaps
+
+def merge_data(base, ours, theirs, prefer="ours"):
+    """Merges three equal-length dumps; returns (merged bytearray, conflicts).
+    conflicts lists (kind, index) per conflicting unit, ("byte", offset) outside the blocks; they resolve to prefer's side."""
+    if not len(base) == len(ours) == len(theirs): raise ValueError("Presets of different length cannot be merged")
+    b, o, t = memoryview(base), memoryview(ours), memoryview(theirs)
+    merged = bytearray(ours); conflicts = []
+    for kind, index, start, end in UNITS:
+        if end > len(merged): continue
+        ours_block, theirs_block = o[start:end], t[start:end]
+        if ours_block == theirs_block: continue
+        base_block = b[start:end]
+        if theirs_block == base_block: continue # only we changed it (already in merged)
+        if ours_block != base_block:
+            conflicts.append((kind, index))
+            if prefer == "ours": continue
+        merged[start:end] = theirs_block
+    for start, end in _gaps(len(merged)):
+        if o[start:end] == t[start:end]: continue
+        for i in range(start, end):
+            if t[i] == b[i] or t[i] == o[i]: continue
+            if o[i] != b[i]:
+                conflicts.append(("byte", i))
+                if prefer == "ours": continue
+            merged[i] = t[i]
+    return merged, conflicts
+
+def merge(base, ours, theirs, prefer="ours"):
+    """merge_data over three MPK2Preset objects; returns (new MPK2Preset, conflicts)."""
+    merged, conflicts = merge_data(base.sysex_data, ours.sysex_data, theirs.sysex_data, prefer)
+    return MPK2Preset(data=merged), conflicts
+
+def merge_files(base_path, ours_path, theirs_path, out_path, prefer="ours"):
+    data = []
+    for path in (base_path, ours_path, theirs_path):
+        with open(path, "rb") as f: data.append(f.read())
+    merged, conflicts = merge_data(*data, prefer=prefer)
+    write_atomic(out_path, merged)
+    return conflicts
@@ -0,0 +1,407 @@
+# File: mpk2_midi.py
+# MIDI I/O engines shared by the GUIs (and anything else that talks to the keyboard).
+import collections
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from mpk2_preset import MPK2Preset, PRESET_COUNT, is_preset_dump
+from mpk2_sysex import SysexStream
+
+MPK_MODELS = ["MPK225", "MPK249", "MPK261"]
+
+def dump_request(number=0, model=0x24):
+    """SysEx asking the keyboard for the dump of preset number (0-29); the reply carries it at byte 7."""
+    return [0xF0, 0x47, 0x00, model, 0x31, 0x00, 0x01, number, 0xF7]
+
+class SysexReceiver:
+    """Assembles F0..F7 frames from an rtmidi input callback, so nothing polls while waiting.
+
+    Chunks go through a SysexStream (preallocated assembly buffer). Every complete
+    frame of at least min_length bytes is passed to on_frame(frame) on the rtmidi thread; GUI code
+    should forward it with a single Tk after() call. The receiver stops after max_frames frames
+    (None: until cancelled) and wait() returns the last one."""
+
+    def __init__(self, midi_in, on_frame=None, min_length=0, max_frames=1, capacity=4096):
+        self.midi_in = midi_in
+        self.on_frame = on_frame
+        self.min_length = min_length
+        self.max_frames = max_frames
+        self.frame = None
+        self.count = 0
+        self._stream = SysexStream(capacity)
+        self._done = threading.Event()
+
+    def start(self):
+        self.midi_in.ignore_types(sysex=False, timing=True, active_sense=True)
+        self.midi_in.set_callback(self._on_message)
+        return self
+
+    def wait(self, timeout=None):
+        """Blocks (without spinning) until a frame arrives, cancel() is called or timeout expires."""
+        self._done.wait(timeout)
+        return self.frame
+
+    def cancel(self):
+        self._done.set()
+
+    def stop(self):
+        """Detaches from the input port but leaves it open (for ports owned by MidiPorts)."""
+        self.cancel()
+        self.midi_in.cancel_callback()
+
+    def close(self):
+        self.stop()
+        self.midi_in.close_port()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def _on_message(self, event, data=None):
+        if self._done.is_set(): return
+        for frame in self._stream.feed(event[0]):
+            self._deliver(frame)
+            if self._done.is_set(): return
+
+    def _deliver(self, frame):
+        if len(frame) < self.min_length: return
+        self.frame = frame
+        self.count += 1
+        if self.on_frame: self.on_frame(frame)
+        if self.max_frames and self.count >= self.max_frames: self._done.set()
+
+
+class PresetDumpWriter:
+    """Collects preset dumps (e.g. the keyboard's "Send program -> All" bulk transfer) into MPK2Preset
+    objects keyed by preset number, writing each one to directory as soon as it arrives."""
+
+    def __init__(self, directory, expected=PRESET_COUNT):
+        self.directory = directory
+        self.expected = expected
+        self.presets = {}
+        self.paths = []
+
+    def add(self, frame):
+        """Stores and saves one frame; returns the MPK2Preset, or None if it is not a preset dump."""
+        if not is_preset_dump(frame): return None
+        preset = MPK2Preset(data=frame)
+        path = os.path.join(self.directory, preset.file_name())
+        preset.save_to_file(path)
+        self.presets[preset.get_preset_number()] = preset
+        self.paths.append(path)
+        return preset
+
+    @property
+    def complete(self):
+        return len(self.presets) >= self.expected
+
+def split_dump_file(filepath, directory, chunk_size=65536):
+    """Splits a multi-preset .syx file (such as a saved "All" dump) into one file per preset, streaming."""
+    writer, stream = PresetDumpWriter(directory), SysexStream()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            for frame in stream.feed(chunk): writer.add(frame)
+    return writer.presets
+
+
+class PresetFetcher:
+    """Fetches presets by number with up to window requests in flight.
+
+    Replies are matched to requests by their preset-number byte, so they may arrive in any order.
+    A request that gets no reply within timeout seconds is re-sent up to retries times, then its
+    future fails with TimeoutError. A scheduler thread sleeps on a Condition until the next deadline
+    or reply; nothing polls. on_result(number, preset, error) and on_done(presets) are called from
+    the MIDI/scheduler threads, GUI code should forward them with after(). on_result runs with the
+    fetcher locked (so on_done always comes after the last one): keep it short."""
+
+    def __init__(self, ports, in_name, out_name, model=0x24, window=4, timeout=2.0, retries=2, on_result=None, on_done=None):
+        self.ports, self.in_name, self.out_name, self.model = ports, in_name, out_name, model
+        self.window, self.timeout, self.retries = window, timeout, retries
+        self.on_result, self.on_done = on_result, on_done
+        self.futures = {}
+        self.presets = {}
+        self._cond = threading.Condition()
+        self._pending = collections.deque()
+        self._in_flight = {}  # number -> (deadline, attempts)
+        self._cancelled = False
+        self._receiver = None
+        self._thread = None
+
+    def start(self, numbers=range(PRESET_COUNT)):
+        for number in numbers:
+            self.futures[number] = Future()
+            self._pending.append(number)
+        self._receiver = SysexReceiver(self.ports.input(self.in_name), on_frame=self._on_frame, max_frames=None).start()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Blocks until every request has completed or failed; returns {number: MPK2Preset}."""
+        self._thread.join(timeout)
+        return self.presets
+
+    def stop(self):
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify()
+
+    @property
+    def done(self):
+        return sum(f.done() for f in self.futures.values())
+
+    def _on_frame(self, frame):
+        if not is_preset_dump(frame): return
+        number = frame[7]; preset = MPK2Preset(data=frame)
+        with self._cond:
+            if self._in_flight.pop(number, None) is None: return  # unrequested, or already given up
+            # Completed under the lock, so _run cannot finish (and call on_done) in between
+            self._finish(number, preset, None)
+            self._cond.notify()
+
+    def _finish(self, number, preset, error):
+        """Completes one future and reports it; always called with _cond held."""
+        if error is None:
+            self.presets[number] = preset
+            self.futures[number].set_result(preset)
+        else:
+            self.futures[number].set_exception(error)
+        if self.on_result: self.on_result(number, preset, error)
+
+    def _send(self, number, attempts):
+        self._in_flight[number] = (time.monotonic() + self.timeout, attempts)
+        self.ports.send(self.out_name, dump_request(number, self.model))
+
+    def _run(self):
+        try:
+            with self._cond:
+                while not self._cancelled and (self._pending or self._in_flight):
+                    while self._pending and len(self._in_flight) < self.window:
+                        self._send(self._pending.popleft(), 0)
+                    now = time.monotonic()
+                    for number, (deadline, attempts) in list(self._in_flight.items()):
+                        if deadline > now: continue
+                        if attempts < self.retries: self._send(number, attempts + 1)
+                        else:
+                            del self._in_flight[number]
+                            self._finish(number, None, TimeoutError(f"No reply for preset {number + 1}"))
+                    if self._in_flight:
+                        self._cond.wait(max(0, min(d for d, _ in self._in_flight.values()) - time.monotonic()))
+        except Exception as e:
+            with self._cond:
+                for number, future in self.futures.items():
+                    if not future.done(): self._finish(number, None, e)
+        finally:
+            self._receiver.stop()
+            with self._cond:
+                for future in self.futures.values():
+                    if not future.done(): future.cancel()
+            if self.on_done: self.on_done(self.presets)
+
+
+class SysexSender:
+    """Sends SysEx messages on a MidiPorts output, optionally paced, and measures throughput.
+
+    Each message goes out whole: rtmidi refuses a message longer than 3 bytes that does not start
+    with F0, and WinMM wants a SysEx in one piece, so pacing happens between messages. max_rate caps
+    the average bytes/sec (the send is followed by a sleep until size / max_rate seconds have passed)
+    and gap is the pause between messages in send_all. Counters accumulate until reset()."""
+
+    def __init__(self, ports, name, max_rate=None, gap=0.0):
+        self.ports, self.name = ports, name
+        self.max_rate, self.gap = max_rate, gap
+        self.reset()
+
+    def reset(self):
+        self.messages = 0; self.bytes = 0; self.seconds = 0.0; self.latencies = []
+
+    def send(self, message):
+        """Sends one message (bytes/bytearray/memoryview, no list conversion); returns its latency in seconds."""
+        data = bytes(message) if isinstance(message, memoryview) else message
+        size = len(data)
+        start = time.perf_counter()
+        self.ports.send(self.name, data)
+        if self.max_rate:
+            due = start + size / self.max_rate - time.perf_counter()
+            if due > 0: time.sleep(due)
+        latency = time.perf_counter() - start
+        self.messages += 1; self.bytes += size; self.seconds += latency; self.latencies.append(latency)
+        return latency
+
+    def send_all(self, messages):
+        """Sends messages back-to-back with gap seconds between them; returns the total seconds."""
+        start = time.perf_counter()
+        for n, message in enumerate(messages):
+            if n and self.gap: time.sleep(self.gap)
+            self.send(message)
+        return time.perf_counter() - start
+
+    @property
+    def rate(self):
+        """Average bytes/sec over everything sent since reset()."""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def stats(self):
+        lat = self.latencies
+        return {"messages": self.messages, "bytes": self.bytes, "bytes_per_sec": self.rate,
+                "latency_avg": sum(lat) / len(lat) if lat else 0.0, "latency_max": max(lat, default=0.0)}
+
+
+class ControlMonitor:
+    """Matches the keyboard's performance messages (notes, CCs, program changes) to the controls that send them.
+
+    index comes from mpk2_conflicts.live_index (replace it when the preset changes). The rtmidi callback does one
+    dict lookup per message and adds hits to a pending set; on_activity() is called once when the set goes from
+    empty to non-empty, so a GUI schedules one redraw however dense the stream is, then drain()s the set there."""
+
+    def __init__(self, midi_in, index, on_activity):
+        self.midi_in = midi_in
+        self.index = index
+        self.on_activity = on_activity
+        self.messages = 0
+        self._pending = set()
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.midi_in.ignore_types(sysex=True, timing=True, active_sense=True)
+        self.midi_in.set_callback(self._on_message)
+        return self
+
+    def stop(self):
+        self.midi_in.cancel_callback()
+
+    def _on_message(self, event, data=None):
+        message = event[0]; self.messages += 1
+        if len(message) < 2: return
+        status = message[0] & 0xF0
+        if status == 0x90 and (len(message) < 3 or message[2] == 0): return # note on with velocity 0 is a note off
+        controls = self.index.get((status, message[0] & 0x0F, message[1]))
+        if not controls: return
+        with self._lock:
+            self._pending.update(controls)
+            if self._scheduled: return
+            self._scheduled = True
+        self.on_activity()
+
+    def drain(self):
+        """(kind, index) of every control played since the last drain()."""
+        with self._lock:
+            pending, self._pending, self._scheduled = self._pending, set(), False
+        return pending
+
+class MidiPorts:
+    """Connection manager: keeps MIDI ports open across sends/requests instead of opening one per click.
+
+    Port names are resolved through a name -> index cache; the cache is rebuilt by refresh(), which is
+    called automatically when a name is not found or an open handle fails (hot-plug). Handles are
+    opened once per port and reused until the port disappears or close() is called.
+    backend is any module exposing rtmidi-style MidiIn/MidiOut classes (python-rtmidi by default)."""
+
+    def __init__(self, backend=None):
+        if backend is None: import rtmidi as backend
+        self.backend = backend
+        self._port_errors = (OSError, getattr(backend, "RtMidiError", OSError)) # what a vanished port raises
+        self._lock = threading.RLock()
+        self._probe = {"in": backend.MidiIn(), "out": backend.MidiOut()}
+        self.ports = {"in": [], "out": []}
+        self._index = {"in": {}, "out": {}}
+        self._open = {}  # (direction, name) -> (open MidiIn/MidiOut, port index it was opened on)
+        self.refresh()
+
+    @property
+    def in_ports(self): return self.ports["in"]
+
+    @property
+    def out_ports(self): return self.ports["out"]
+
+    def refresh(self):
+        """Re-enumerates the system ports. Returns True if the port list changed."""
+        with self._lock:
+            changed = False
+            for direction, probe in self._probe.items():
+                ports = probe.get_ports()
+                if ports == self.ports[direction]: continue
+                changed = True
+                self.ports[direction] = ports
+                self._index[direction] = {name: i for i, name in enumerate(ports)}
+            if changed:
+                # A handle is only trusted if its port still exists at the same index
+                for key in list(self._open):
+                    direction, name = key
+                    if self._index[direction].get(name) != self._open[key][1]:
+                        self._close_handle(key)
+            return changed
+
+    def find(self, direction, pattern):
+        """Full name of the first port whose name contains pattern, or None. Re-enumerates once on a miss."""
+        for attempt in range(2):
+            with self._lock:
+                if pattern in self._index[direction]: return pattern
+                name = next((p for p in self.ports[direction] if pattern in p), None)
+            if name is not None or attempt or not self.refresh(): return name
+        return None
+
+    def find_mpk(self, keywords_in=("Remote", "MIDIIN4"), keywords_out=("Remote", "MIDIOUT4")):
+        """(in_name, out_name) of the first MPK2 SysEx port pair found, re-enumerating once if needed."""
+        def match(direction, keywords):
+            return next((p for p in self.ports[direction] if any(m in p for m in MPK_MODELS) and any(k in p for k in keywords)), None)
+        for attempt in range(2):
+            with self._lock: found = match("in", keywords_in), match("out", keywords_out)
+            if all(found) or attempt or not self.refresh(): return found
+        return found
+
+    def find_mpk_play(self, exclude=("Remote", "MIDIIN", "MIDI", "Port B")):
+        """Input port carrying what is played on the keyboard (Windows "MPK249", macOS "MPK249 Port A"),
+        falling back to any MPK2 port that is not the SysEx one."""
+        with self._lock: ports = [p for p in self.ports["in"] if any(m in p for m in MPK_MODELS)]
+        remote = self.find_mpk()[0]
+        return next((p for p in ports if not any(k in p for k in exclude)), next((p for p in ports if p != remote), None))
+
+    def input(self, name):
+        return self._handle("in", name)
+
+    def output(self, name):
+        return self._handle("out", name)
+
+    def send(self, name, message):
+        """Sends on the cached output handle; on a port error re-enumerates, reopens and retries once.
+        Anything else (such as rtmidi's ValueError for a malformed message) is raised as is."""
+        try:
+            self.output(name).send_message(message)
+        except self._port_errors:
+            with self._lock: self._close_handle(("out", name))
+            self.refresh()
+            self.output(name).send_message(message)
+
+    def release(self, direction, name):
+        with self._lock: self._close_handle((direction, name))
+
+    def close(self):
+        with self._lock:
+            for key in list(self._open): self._close_handle(key)
+
+    def _handle(self, direction, name):
+        with self._lock:
+            entry = self._open.get((direction, name))
+            if entry is not None: return entry[0]
+            index = self._index[direction].get(name)
+            if index is None:
+                self.refresh()
+                index = self._index[direction].get(name)
+                if index is None: raise IOError(f"MIDI port '{name}' not found")
+            handle = self.backend.MidiIn() if direction == "in" else self.backend.MidiOut()
+            handle.open_port(index)
+            self._open[(direction, name)] = (handle, index)
+            return handle
+
+    def _close_handle(self, key):
+        entry = self._open.pop(key, None)
+        if entry is None: return
+        handle = entry[0]
+        try:
+            if key[0] == "in": handle.cancel_callback()
+            handle.close_port()
+        except Exception: pass
@@ -0,0 +1,77 @@
+# File: mpk2_patch.py
+# Differences between two presets, and .mpkpatch files that replay them on other dumps.
+#
+# .mpkpatch layout (little endian):
+#   b"MPKP" | version u8 | entry count u16 | count x (offset u16 | length u16 | new bytes)
+# Offsets are absolute in the .syx frame (F0 = 0). Only the new bytes are stored.
+import mmap
+import os
+import struct
+
+from mpk2_preset import LAYOUTS, PAD_OFFSET, PRESET_MIN_SIZE, daw_names, byte_runs, is_preset_dump
+
+PATCH_MAGIC = b"MPKP"
+PATCH_VERSION = 1
+_HEADER = struct.Struct("<4sBH")
+_ENTRY = struct.Struct("<HH")
+
+def diff_controls(a, b):
+    """[(kind, index, {field: (old, new)})] for every control whose bytes differ, plus ("header", 0, ...) for name/number."""
+    changes = []
+    header = {key: (old, new) for key, old, new in (("name", a.get_preset_name(), b.get_preset_name()),
+                                                    ("number", a.get_preset_number(), b.get_preset_number())) if old != new}
+    if header: changes.append(("header", 0, header))
+    view_a, view_b = memoryview(a.sysex_data), memoryview(b.sysex_data)
+    for kind, layout in LAYOUTS.items():
+        for block_a, block_b, index in zip(layout.views(view_a), layout.views(view_b), range(1, layout.count + 1)):
+            if block_a == block_b: continue
+            old, new = layout.decode(block_a), layout.decode(block_b)
+            fields = {key: (old.get(key), new.get(key)) for key in {**old, **new} if old.get(key) != new.get(key)}
+            # Bytes no decoder looks at can differ too: report them raw rather than drop the control
+            changes.append((kind, index, fields or {"raw": (bytes(block_a).hex(" "), bytes(block_b).hex(" "))}))
+    return changes
+
+def control_name(kind, index):
+    if kind == "header": return kind
+    return daw_names[index - 1] if kind == "daw" else f"{kind} {index}"
+
+def diff_bytes(a, b, header=False):
+    """byte_runs between two presets; with header=False only the control tables (from the pads on) are compared,
+    so the patch does not rename or renumber the presets it is applied to."""
+    start = 0 if header else PAD_OFFSET
+    size = min(len(a.sysex_data), len(b.sysex_data))
+    return [(start + offset, old, new) for offset, old, new in byte_runs(memoryview(a.sysex_data)[start:size], memoryview(b.sysex_data)[start:size])]
+
+def make_patch(a, b, header=False):
+    """[(offset, new bytes)] turning a into b."""
+    return [(offset, new) for offset, old, new in diff_bytes(a, b, header)]
+
+def write_patch(path, patch):
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(PATCH_MAGIC, PATCH_VERSION, len(patch)))
+        for offset, data in patch: f.write(_ENTRY.pack(offset, len(data))); f.write(data)
+
+def read_patch(path):
+    with open(path, "rb") as f: blob = f.read()
+    magic, version, count = _HEADER.unpack_from(blob)
+    if magic != PATCH_MAGIC: raise ValueError(f"{path} is not an .mpkpatch file")
+    if version != PATCH_VERSION: raise ValueError(f"Unsupported .mpkpatch version {version}")
+    patch = []; pos = _HEADER.size
+    for _ in range(count):
+        offset, length = _ENTRY.unpack_from(blob, pos); pos += _ENTRY.size
+        patch.append((offset, blob[pos:pos + length])); pos += length
+    return patch
+
+def apply_patch_data(patch, data):
+    """Applies a patch to a writable buffer (bytearray, mmap, preset.sysex_data) in place."""
+    for offset, new in patch: data[offset:offset + len(new)] = new
+
+def apply_patch_file(patch, filepath):
+    """Patches a .syx file in place through mmap: only the patched pages are touched, nothing is decoded.
+    Returns False (file unchanged) if it is not a preset dump large enough for the patch; a missing file raises OSError."""
+    with open(filepath, "r+b") as f:
+        if os.fstat(f.fileno()).st_size < PRESET_MIN_SIZE: return False # mmap refuses empty files
+        with mmap.mmap(f.fileno(), 0) as data:
+            if not is_preset_dump(data) or max((o + len(n) for o, n in patch), default=0) > len(data): return False
+            apply_patch_data(patch, data); data.flush()
+    return True
@@ -1,4 +1,12 @@
 # File: mpk2_preset.py
+import itertools
+import re
+from collections import deque
+from collections.abc import Mapping
+from contextlib import contextmanager
+from enum import Enum, IntEnum
+
+from mpk2_sysex import iter_frames, write_atomic
 
 # --- SEARCH TABLES ---
 KNOB_OFFSET = 0x2FD; KNOB_SIZE = 9; KNOB_COUNT = 24
@@ -8,6 +16,9 @@ PAD_SIZE = 11; PAD_COUNT = 64
 SWITCH_OFFSET = 0x465; SWITCH_COUNT = 24
 DAW_OFFSET = 0x59D; DAW_COUNT = 5
 CONTROL_SIZE = 13
+PRESET_COUNT = 30
+MODEL_IDS = {0x24: "MPK249", 0x25: "MPK261", 0x23: "MPK225"}
+PRESET_MIN_SIZE = DAW_OFFSET + DAW_COUNT * CONTROL_SIZE + 1 # up to the DAW buttons + F7
 
 channel_map = {"Common": 0, **{f"USBA{i}": i for i in range(1, 17)}, **{f"USBB{i}": 0x10 + i for i in range(1, 17)}}
 channel_map_rev = {v: k for k, v in channel_map.items()}
@@ -21,30 +32,371 @@ key2_map = { 0:"None", 1:"Control", 2:"Shift", 3:"Alt", 4:"Option", 5:"Control-S
 key2_map_rev = {v: k for k, v in key2_map.items()}
 daw_names = ["Enter", "Left", "Right", "Up", "Down"]
 
+# The same tables as enums (member name = the string above, value = the byte): Channel.USBA10, Note["C#3"], Color.Red
+Channel = IntEnum("Channel", channel_map, module=__name__)
+Note = IntEnum("Note", note_map, module=__name__)
+Color = IntEnum("Color", color_map_rev, module=__name__)
+Key = IntEnum("Key", key1_map_rev, module=__name__)
+Modifier = IntEnum("Modifier", key2_map_rev, module=__name__)
+_FIELD_ENUMS = {"channel": Channel, "note": Note, "off_color": Color, "on_color": Color, "key1": Key, "key2": Modifier}
+
+# --- CONTROL RECORDS ---
+class ControlRecord(Mapping):
+    """Decoded control: attributes hold the typed values (enums for channel/note/color/key), while the mapping
+    side (record["channel"], .get, .keys, **record, == dict) gives the plain strings the getters always returned.
+    Fields the control's type does not have read as None. Records may be shared (see MPK2Preset.CACHE_DECODED):
+    don't modify them."""
+    __slots__ = ("_fields",)
+
+    def __getitem__(self, key):
+        if key not in self._fields: raise KeyError(key)
+        value = getattr(self, key)
+        return value.name if isinstance(value, Enum) else value
+
+    def __getattr__(self, name):
+        if name in type(self).__slots__: return None
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __contains__(self, key): return key in self._fields
+    def __iter__(self): return iter(self._fields)
+    def __len__(self): return len(self._fields)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{name}={self[name]!r}' for name in self._fields)})"
+
+def _record_decoder(record, getters, fields, label=None):
+    """decode(block) -> record for one control type, generated as straight-line code (one slot store per
+    field, like namedtuple does), which is what makes decoding cheaper than building the old dicts."""
+    env = {"_new": object.__new__, "_record": record, "_fields": fields, "_label": label}
+    lines = ["def decode(block):", "    r = _new(_record); r._fields = _fields"]
+    for n, (name, idx, table) in enumerate(getters):
+        env[f"_t{n}"] = table; lines.append(f"    r.{name} = _t{n}[block[{idx}]]")
+    if label is not None: lines.append("    r.type = _label")
+    exec("\n".join(lines + ["    return r"]), env)
+    return env["decode"]
+
+# --- LAYOUT SCHEMA ---
+# Every control kind is described once: field name -> (byte index, encoder, decoder), plus an optional
+# type discriminator byte whose value selects extra type-specific fields. ControlLayout compiles the
+# schema into lookup tables so each field costs one dict hit, for MPK2Preset and the scripts alike.
+# Encoders take (value, current_byte) and return the new byte; decoders take the byte.
+def _enc_int(v, old): return int(v)
+def _enc_flag(on): return lambda v, old: 1 if str(v).upper() == on else 0
+def _enc_lookup(table, strict=False): return (lambda v, old: table[v]) if strict else (lambda v, old: table.get(v, old))
+def _enc_upper(table): return lambda v, old: table.get(str(v).upper(), old)
+def _dec_int(b): return b
+def _dec_flag(on, off): return lambda b: on if b == 1 else off
+def _dec_lookup(table, keep_raw=False): return (lambda b: table.get(b, b)) if keep_raw else table.get
+
+def is_preset_dump(frame):
+    """True for an Akai MPK2 preset dump: F0 47 00 <model> ..., long enough to hold every control."""
+    return len(frame) >= PRESET_MIN_SIZE and frame[0] == 0xF0 and frame[1] == 0x47 and frame[3] in MODEL_IDS
+
+def byte_runs(old, new, gap=4):
+    """[(offset, old bytes, new bytes)] covering every difference between two equal-length buffers.
+    Differences fewer than gap bytes apart share a run."""
+    runs = []; i = 0; n = len(old)
+    while i < n:
+        if old[i] == new[i]:
+            i += 32 if old[i:i + 32] == new[i:i + 32] else 1 # skip unchanged stretches a word at a time
+            continue
+        start = last = i
+        while i < n and i - last <= gap:
+            if old[i] != new[i]: last = i
+            i += 1
+        runs.append((start, bytes(old[start:last + 1]), bytes(new[start:last + 1])))
+    return runs
+
+class ControlLayout:
+    def __init__(self, offset, size, count, fields, type_index=None, type_names=None, typed_fields=None, fallback_type=None, record="Control"):
+        """fields/typed_fields entries are (name, byte index, encoder, decoder). With a type_index, unknown
+        type bytes decode as fallback_type if given, otherwise as "UNKNOWN_<n>" with no typed fields.
+        Controls decode to instances of self.record, a ControlRecord class named record."""
+        self.offset, self.size, self.count = offset, size, count
+        self.end = offset + size * count
+        self.fields = fields
+        self._setters = {name: (idx, enc) for name, idx, enc, dec in fields}
+        self.type_index, self.type_names, self.fallback_type = type_index, type_names or {}, fallback_type
+        self.type_codes = {name.upper(): raw for raw, name in self.type_names.items()}
+        typed_fields = typed_fields or {}
+        names = [name for name, idx, enc, dec in fields] + [name for f in typed_fields.values() for name, idx, enc, dec in f]
+        if type_index is not None: names.append("type")
+        self.names = tuple(dict.fromkeys(names)) # every field any type of this control has
+        self.record = type(record, (ControlRecord,), {"__slots__": self.names, "__module__": __name__})
+        # Decoders run once per byte value at import: decoding a field is then one tuple index, and each
+        # type byte maps to a decoder generated for that type's fields, so decoding is one call
+        self._getters = self._compile(fields)
+        self._plain_fields = tuple(name for name, idx, enc, dec in fields)
+        self._decode_plain = _record_decoder(self.record, self._getters, self._plain_fields)
+        if type_index is not None:
+            decoders = {raw: _record_decoder(self.record, self._getters + self._compile(typed_fields.get(raw, ())),
+                                             self._plain_fields + tuple(name for name, idx, enc, dec in typed_fields.get(raw, ())) + ("type",), label)
+                        for raw, label in self.type_names.items()}
+            unknown = decoders.get(fallback_type) or self._decode_unknown
+            self._by_type = tuple(decoders.get(raw, unknown) for raw in range(256))
+        self._typed_setters = {raw: {name: (idx, enc) for name, idx, enc, dec in f} for raw, f in typed_fields.items()}
+
+    def _compile(self, fields):
+        compiled = []
+        for name, idx, enc, dec in fields:
+            enum = _FIELD_ENUMS.get(name)
+            values = (dec(b) for b in range(256))
+            if enum: values = (enum.__members__.get(v, v) if isinstance(v, str) else v for v in values)
+            compiled.append((name, idx, tuple(values)))
+        return tuple(compiled)
+
+    def block_offset(self, index):
+        return self.offset + (index - 1) * self.size
+
+    def block(self, data, index):
+        """Zero-copy (and, over a bytearray, writable) view of one control block; index is 1-based."""
+        offset = self.block_offset(index)
+        return memoryview(data)[offset:offset + self.size]
+
+    def views(self, view):
+        return [view[self.offset + i * self.size:self.offset + (i + 1) * self.size] for i in range(self.count)]
+
+    def decode(self, block):
+        if self.type_index is None: return self._decode_plain(block)
+        return self._by_type[block[self.type_index]](block)
+
+    def _decode_unknown(self, block):
+        record = self._decode_plain(block)
+        record._fields = self._plain_fields + ("type",); record.type = f"UNKNOWN_{block[self.type_index]}"
+        return record
+
+    def encode(self, block, kwargs):
+        """Writes kwargs into block in place. All values are encoded first, so a bad value leaves block untouched.
+        Fields the control's current type does not have are skipped (check names first to catch typos)."""
+        writes = []
+        current_type = None
+        if self.type_index is not None:
+            current_type = block[self.type_index]
+            if "type" in kwargs:
+                current_type = self.type_codes.get(str(kwargs["type"]).upper(), current_type)
+                writes.append((self.type_index, current_type))
+        typed = self._typed_setters.get(current_type, {})
+        for k, v in kwargs.items():
+            setter = self._setters.get(k) or typed.get(k)
+            if setter is None: continue
+            idx, enc = setter
+            if isinstance(v, Enum): v = v.name # Channel.USBA2 works like "USBA2"
+            val = enc(v, block[idx])
+            if not 0 <= val <= 255: raise ValueError("byte must be in range(0, 256)")
+            writes.append((idx, val))
+        for idx, val in writes: block[idx] = val
+
+knob_type_map = {0x00: "MIDI_CC", 0x01: "AFTERTOUCH", 0x02: "INC_DEC1", 0x03: "INC_DEC2"}
+pad_type_map = {0: "Note", 1: "ProgramChange", 2: "ProgramBank"}
+control_type_map = {0: "CC", 1: "Note", 2: "ProgChange", 3: "ProgBank", 4: "Keystroke"}
+aftertouch_map = {0: "Off", 1: "Channel", 2: "Poly"}
+
+_MIDI_TO_DIN = lambda idx: ("midi_to_din", idx, _enc_flag("ON"), _dec_flag("On", "Off"))
+_MODE = lambda idx: ("mode", idx, _enc_flag("TOGGLE"), _dec_flag("Toggle", "Momentary"))
+_INT = lambda name, idx: (name, idx, _enc_int, _dec_int)
+
+KNOB_LAYOUT = ControlLayout(KNOB_OFFSET, KNOB_SIZE, KNOB_COUNT, [
+    ("type", 0, _enc_upper({v: k for k, v in knob_type_map.items()}), _dec_lookup(knob_type_map)),
+    ("channel", 1, _enc_lookup(channel_map), _dec_lookup(channel_map_rev)),
+    _INT("cc", 2), _INT("min", 3), _INT("max", 4), _MIDI_TO_DIN(5), _INT("msb", 6), _INT("lsb", 7), _INT("value", 8)], record="Knob")
+
+FADER_LAYOUT = ControlLayout(FADER_OFFSET, FADER_SIZE, FADER_COUNT, [
+    ("type", 0, _enc_flag("AFTERTOUCH"), _dec_flag("AFTERTOUCH", "MIDI_CC")),
+    ("channel", 1, _enc_lookup(channel_map), _dec_lookup(channel_map_rev)),
+    _INT("cc", 2), _INT("min", 3), _INT("max", 4), _MIDI_TO_DIN(5)], record="Fader")
+
+PAD_LAYOUT = ControlLayout(PAD_OFFSET, PAD_SIZE, PAD_COUNT, [
+    ("channel", 1, _enc_lookup(channel_map, strict=True), _dec_lookup(channel_map_rev, keep_raw=True)),
+    _MIDI_TO_DIN(3), _MODE(4),
+    ("aftertouch", 5, _enc_upper({v.upper(): k for k, v in aftertouch_map.items()}), _dec_lookup(aftertouch_map, keep_raw=True)),
+    ("off_color", 9, _enc_lookup(color_map_rev, strict=True), _dec_lookup(color_map, keep_raw=True)),
+    ("on_color", 10, _enc_lookup(color_map_rev, strict=True), _dec_lookup(color_map, keep_raw=True))],
+    type_index=0, type_names=pad_type_map, fallback_type=0, typed_fields={
+        0: [("note", 2, _enc_lookup(note_map, strict=True), _dec_lookup(note_map_rev, keep_raw=True))],
+        1: [_INT("program", 2)],
+        2: [_INT("program", 6), _INT("msb", 7), _INT("lsb", 8)]}, record="Pad")
+
+_CONTROL_FIELDS = [("channel", 1, _enc_lookup(channel_map), _dec_lookup(channel_map_rev, keep_raw=True)), _MODE(3)]
+_CONTROL_TYPED_FIELDS = {
+    0: [_MIDI_TO_DIN(7), _INT("cc", 2), ("invert", 5, _enc_flag("ON"), _dec_flag("On", "Off"))],
+    1: [_MIDI_TO_DIN(7), ("note", 8, _enc_lookup(note_map), _dec_lookup(note_map_rev, keep_raw=True)), _INT("velocity", 9)],
+    2: [_MIDI_TO_DIN(7), _INT("program", 2)],
+    3: [_MIDI_TO_DIN(7), _INT("program", 4), _INT("msb", 5), _INT("lsb", 6)],
+    4: [("key1", 11, _enc_lookup(key1_map_rev), _dec_lookup(key1_map, keep_raw=True)), ("key2", 12, _enc_lookup(key2_map_rev), _dec_lookup(key2_map, keep_raw=True))]}
+
+SWITCH_LAYOUT = ControlLayout(SWITCH_OFFSET, CONTROL_SIZE, SWITCH_COUNT, _CONTROL_FIELDS,
+                              type_index=0, type_names=control_type_map, typed_fields=_CONTROL_TYPED_FIELDS, record="Switch")
+DAW_LAYOUT = ControlLayout(DAW_OFFSET, CONTROL_SIZE, DAW_COUNT, _CONTROL_FIELDS,
+                           type_index=0, type_names=control_type_map, typed_fields=_CONTROL_TYPED_FIELDS, record="DawButton")
+Knob, Fader, Pad, Switch, DawButton = (KNOB_LAYOUT.record, FADER_LAYOUT.record, PAD_LAYOUT.record,
+                                       SWITCH_LAYOUT.record, DAW_LAYOUT.record)
+
+LAYOUTS = {"knob": KNOB_LAYOUT, "fader": FADER_LAYOUT, "pad": PAD_LAYOUT, "switch": SWITCH_LAYOUT, "daw": DAW_LAYOUT}
+
+BANK_SIZES = {"knob": 8, "fader": 8, "pad": 16, "switch": 8}  # controls per bank (pads A-D, the others A-C)
+
+# One counter for every preset: a (kind, index, generation) triple is never reused, even across loads,
+# so callers can cache anything derived from a control under that key.
+_generations = itertools.count(1)
+
 class MPK2Preset:
+    UNDO_LIMIT = 10000 # steps; each one stores only the bytes it changed
+    # Opt-in: getters return the same record until the control's generation changes (treat it as read-only).
+    # Only safe when every write goes through the setters or touch_range; patches and mpk2_arrays write around them.
+    CACHE_DECODED = False
+
     def __init__(self, sysex_filepath=None, data=None):
         self.sysex_data = None
+        self._bind_views()
         if sysex_filepath: self.load_from_file(sysex_filepath)
         elif data: self.load_from_data(data)
 
     def load_from_data(self, data):
         self.sysex_data = bytearray(data)
+        self._bind_views()
 
     def load_from_file(self, filepath):
         try:
-            with open(filepath, 'rb') as f: self.load_from_data(f.read())
-        except Exception: self.sysex_data = None
-            
+            with open(filepath, 'rb') as f: data = f.read()
+            self.load_from_data(next(iter_frames(data), data)) # first frame of multi-preset files
+        except Exception: self.sysex_data = None; self._bind_views()
+
+    def _bind_views(self):
+        # Zero-copy windows on sysex_data, one per control block, built once per load.
+        # Getters/setters read and write the buffer through these instead of slicing copies.
+        # NB: while the views exist sysex_data cannot change size (only same-length slice writes).
+        self._undo, self._redo, self._edit_depth = deque(maxlen=self.UNDO_LIMIT), [], 0
+        self._decoded = {} # (kind, index) -> (generation, decoded dict)
+        generation = self._generation = next(_generations)
+        self._generations = {kind: [generation] * layout.count for kind, layout in LAYOUTS.items()}
+        if not self.sysex_data:
+            self._knobs = self._faders = self._pads = self._switches = self._daws = []
+            return
+        view = memoryview(self.sysex_data)
+        self._knobs = KNOB_LAYOUT.views(view)
+        self._faders = FADER_LAYOUT.views(view)
+        self._pads = PAD_LAYOUT.views(view)
+        self._switches = SWITCH_LAYOUT.views(view)
+        self._daws = DAW_LAYOUT.views(view)
+
     def save_to_file(self, filepath):
         if not self.sysex_data: return
         try:
-            with open(filepath, 'wb') as f: f.write(self.sysex_data)
+            write_atomic(filepath, self.sysex_data)
         except Exception as e: print(f"Errore durante il salvataggio: {e}")
 
+    def file_name(self):
+        """Default file name for this preset, e.g. "MPK249_01_LiveLite.syx"."""
+        name = re.sub(r"[^A-Za-z0-9_-]+", "_", self.get_preset_name().strip()) or "Preset"
+        return f"{self.get_model()}_{self.get_preset_number() + 1:02d}_{name}.syx"
+
+    # --- CHANGE TRACKING ---
+    def control_generation(self, kind, index):
+        """Changes whenever the control (kind in LAYOUTS, 1-based index) is written through a setter or touch_range."""
+        return self._generations[kind][index - 1]
+
+    @property
+    def generation(self):
+        """Changes whenever any control changes (setters, touch_range, undo/redo) and on every load; never reused."""
+        return self._generation
+
+    def touch_range(self, start, end):
+        """Marks every control overlapping sysex_data[start:end] as changed (for writes that bypass the setters)."""
+        generation = self._generation = next(_generations)
+        for kind, layout in LAYOUTS.items():
+            if start >= layout.end or end <= layout.offset: continue
+            first = max(0, (start - layout.offset) // layout.size); last = min(layout.count, -(-(end - layout.offset) // layout.size))
+            self._generations[kind][first:last] = [generation] * (last - first)
+
+    def _touch(self, kind, index):
+        self._generations[kind][index - 1] = self._generation = next(_generations)
+
+    def _decode(self, kind, layout, views, index):
+        # Decoded once per generation; writes that bypass the setters must call touch_range (see mpk2_arrays.touch)
+        if not self.CACHE_DECODED: return layout.decode(views[index - 1])
+        generation = self._generations[kind][index - 1]
+        cached = self._decoded.get((kind, index))
+        if cached and cached[0] == generation: return cached[1]
+        decoded = layout.decode(views[index - 1])
+        self._decoded[kind, index] = (generation, decoded)
+        return decoded
+
+    # --- UNDO / REDO ---
+    @contextmanager
+    def edit(self, label=""):
+        """Records every write made inside the block as one undo step (nested edits join the outer one)."""
+        if self._edit_depth or not self.sysex_data:
+            self._edit_depth += 1
+            try: yield
+            finally: self._edit_depth -= 1
+            return
+        before = bytes(self.sysex_data); self._edit_depth = 1
+        try: yield
+        finally:
+            self._edit_depth = 0
+            runs = byte_runs(before, self.sysex_data) if len(before) == len(self.sysex_data) else None
+            if runs: self._undo.append((label, runs)); self._redo.clear()
+
+    def undo(self):
+        """Reverts the last edit step and returns its label, or None if there is nothing to undo."""
+        if not self._undo: return None
+        label, runs = self._undo.pop()
+        self._write_runs(runs, 1); self._redo.append((label, runs))
+        return label
+
+    def redo(self):
+        if not self._redo: return None
+        label, runs = self._redo.pop()
+        self._write_runs(runs, 2); self._undo.append((label, runs))
+        return label
+
+    @property
+    def undo_label(self): return self._undo[-1][0] if self._undo else None
+    @property
+    def redo_label(self): return self._redo[-1][0] if self._redo else None
+
+    def _write_runs(self, runs, side):
+        for run in runs:
+            offset, data = run[0], run[side]
+            self.sysex_data[offset:offset + len(data)] = data
+            self.touch_range(offset, offset + len(data))
+
+    # --- BANK OPERATIONS (raw bytes, no decode) ---
+    def bank_range(self, kind, bank):
+        """(start, end) of a bank in sysex_data; bank is a letter ("A".."D") or a 0-based index."""
+        layout, size = LAYOUTS[kind], BANK_SIZES[kind]
+        if isinstance(bank, str): bank = ord(bank.upper()) - ord("A")
+        if not 0 <= bank < layout.count // size: raise ValueError(f"No {kind} bank {bank}")
+        start = layout.offset + bank * size * layout.size
+        return start, start + size * layout.size
+
+    def copy_bank(self, kind, source_bank, dest_bank, source=None):
+        """Copies a whole bank byte for byte, from this preset or from source (another MPK2Preset)."""
+        if not self.sysex_data: return
+        src_start, src_end = (source or self).bank_range(kind, source_bank)
+        start, end = self.bank_range(kind, dest_bank)
+        self.sysex_data[start:end] = memoryview((source or self).sysex_data)[src_start:src_end]
+        self.touch_range(start, end)
+
+    def swap_banks(self, kind, bank_a, bank_b):
+        if not self.sysex_data: return
+        (a, a_end), (b, b_end) = self.bank_range(kind, bank_a), self.bank_range(kind, bank_b)
+        data = self.sysex_data
+        data[a:a_end], data[b:b_end] = data[b:b_end], data[a:a_end]
+        self.touch_range(min(a, b), max(a_end, b_end))
+
+    def permute_banks(self, kind, order):
+        """Rearranges banks: order lists the source bank for each bank, e.g. "DCBA" reverses the pad banks."""
+        if not self.sysex_data: return
+        ranges = [self.bank_range(kind, bank) for bank in order]
+        start, end = self.bank_range(kind, 0)[0], self.bank_range(kind, len(order) - 1)[1]
+        self.sysex_data[start:end] = b"".join(self.sysex_data[s:e] for s, e in ranges)
+        self.touch_range(start, end)
+
     # --- METADATA (Offset) ---
     def get_model(self):
         if not self.sysex_data or len(self.sysex_data) <= 3: return "N/A"
-        return {0x24:"MPK249", 0x25:"MPK261", 0x23:"MPK225"}.get(self.sysex_data[3], "Unknown")
+        return MODEL_IDS.get(self.sysex_data[3], "Unknown")
 
     def get_preset_number(self):
         if not self.sysex_data or len(self.sysex_data) <= 7: return -1
@@ -69,124 +421,56 @@ class MPK2Preset:
     # --- CONTROLS  ---
     def get_knob(self, index):
         if not self.sysex_data: return {}
-        offset = KNOB_OFFSET + (index - 1) * KNOB_SIZE
-        block = self.sysex_data[offset:offset+KNOB_SIZE]
-        type_map = {0x00: "MIDI_CC", 0x01: "AFTERTOUCH", 0x02: "INC_DEC1", 0x03: "INC_DEC2"}
-        return { "type": type_map.get(block[0]), "channel": channel_map_rev.get(block[1]), "cc": block[2], "min": block[3], "max": block[4], "midi_to_din": "On" if block[5] == 1 else "Off", "msb": block[6], "lsb": block[7], "value": block[8] }
+        return self._decode("knob", KNOB_LAYOUT, self._knobs, index)
 
     def set_knob(self, index, **kwargs):
         if not self.sysex_data: return
-        offset = KNOB_OFFSET + (index - 1) * KNOB_SIZE; block = self.sysex_data[offset:offset+KNOB_SIZE]
-        type_map = {"MIDI_CC": 0x00, "AFTERTOUCH": 0x01, "INC_DEC1": 0x02, "INC_DEC2": 0x03}
-        for k, v in kwargs.items():
-            if k == "type": block[0] = type_map.get(str(v).upper(), block[0])
-            elif k == "channel": block[1] = channel_map.get(v, block[1])
-            elif k == "cc": block[2] = int(v)
-            elif k == "min": block[3] = int(v)
-            elif k == "max": block[4] = int(v)
-            elif k == "midi_to_din": block[5] = 1 if str(v).upper() == "ON" else 0
-            elif k == "msb": block[6] = int(v)
-            elif k == "lsb": block[7] = int(v)
-            elif k == "value": block[8] = int(v)
-        self.sysex_data[offset:offset+KNOB_SIZE] = block
-        
+        KNOB_LAYOUT.encode(self._knobs[index - 1], kwargs)
+        self._touch("knob", index)
+
     def get_fader(self, index):
         if not self.sysex_data: return {}
-        offset = FADER_OFFSET + (index - 1) * FADER_SIZE
-        block = self.sysex_data[offset:offset+FADER_SIZE]
-        return { "type": "AFTERTOUCH" if block[0] == 0x01 else "MIDI_CC", "channel": channel_map_rev.get(block[1]), "cc": block[2], "min": block[3], "max": block[4], "midi_to_din": "On" if block[5] == 1 else "Off" }
+        return self._decode("fader", FADER_LAYOUT, self._faders, index)
 
     def set_fader(self, index, **kwargs):
         if not self.sysex_data: return
-        offset = FADER_OFFSET + (index - 1) * FADER_SIZE; block = self.sysex_data[offset:offset+FADER_SIZE]
-        for k, v in kwargs.items():
-            if k == "type": block[0] = 0x01 if str(v).upper() == "AFTERTOUCH" else 0x00
-            elif k == "channel": block[1] = channel_map.get(v, block[1])
-            elif k == "cc": block[2] = int(v)
-            elif k == "min": block[3] = int(v)
-            elif k == "max": block[4] = int(v)
-            elif k == "midi_to_din": block[5] = 1 if str(v).upper() == "ON" else 0
-        self.sysex_data[offset:offset+FADER_SIZE] = block
+        FADER_LAYOUT.encode(self._faders[index - 1], kwargs)
+        self._touch("fader", index)
 
     def get_pad(self, index):
         if not self.sysex_data: return {}
-        offset = PAD_OFFSET + (index - 1) * PAD_SIZE
-        block = self.sysex_data[offset:offset+PAD_SIZE]
-        type_raw = block[0]
-        d = {"channel": channel_map_rev.get(block[1]), "midi_to_din": "On" if block[3] == 1 else "Off", "mode": "Toggle" if block[4] == 1 else "Momentary", "aftertouch": {0:"Off", 1:"Channel", 2:"Poly"}.get(block[5]), "off_color": color_map.get(block[9]), "on_color": color_map.get(block[10])}
-        if type_raw == 1: d.update({"type": "ProgramChange", "program": block[2]})
-        elif type_raw == 2: d.update({"type": "ProgramBank", "program": block[6], "msb": block[7], "lsb": block[8]})
-        else: d.update({"type": "Note", "note": note_map_rev.get(block[2])})
-        return d
-        
+        return self._decode("pad", PAD_LAYOUT, self._pads, index)
+
     def set_pad(self, index, **kwargs):
         if not self.sysex_data: return
-        offset = PAD_OFFSET + (index - 1) * PAD_SIZE; block = self.sysex_data[offset:offset+PAD_SIZE]
-        type_map = {"NOTE": 0, "PROGRAMCHANGE": 1, "PROGRAMBANK": 2}
-        if "type" in kwargs: block[0] = type_map.get(str(kwargs["type"]).upper(), block[0])
-        for k, v in kwargs.items():
-            if k == "channel": block[1] = channel_map[v]
-            elif k == "midi_to_din": block[3] = 1 if str(v).upper() == "ON" else 0
-            elif k == "mode": block[4] = 1 if str(v).upper() == "TOGGLE" else 0
-            elif k == "aftertouch": block[5] = {"OFF":0, "CHANNEL":1, "POLY":2}.get(str(v).upper(), block[5])
-            elif k == "off_color": block[9] = color_map_rev[v]
-            elif k == "on_color": block[10] = color_map_rev[v]
-            if block[0] == 0 and k == "note": block[2] = note_map[v]
-            elif block[0] == 1 and k == "program": block[2] = int(v)
-            elif block[0] == 2:
-                if k == "program": block[6] = int(v)
-                elif k == "msb": block[7] = int(v)
-                elif k == "lsb": block[8] = int(v)
-        self.sysex_data[offset:offset+PAD_SIZE] = block
-        
+        PAD_LAYOUT.encode(self._pads[index - 1], kwargs)
+        self._touch("pad", index)
+
+    def _control_layout(self, base_offset):
+        return ("switch", SWITCH_LAYOUT, self._switches) if base_offset == SWITCH_OFFSET else ("daw", DAW_LAYOUT, self._daws)
+
     def _get_control(self, base_offset, index):
         if not self.sysex_data: return {}
-        offset = base_offset + (index - 1) * CONTROL_SIZE
-        block = self.sysex_data[offset:offset + CONTROL_SIZE]
-        d = {}; type_raw = block[0]
-        d['channel'] = channel_map_rev.get(block[1], block[1])
-        d['mode'] = "Toggle" if block[3] == 1 else "Momentary"
-        if type_raw in [0, 1, 2, 3]: d['midi_to_din'] = "On" if block[7] == 1 else "Off"
-
-        if type_raw == 0: d.update({"type": "CC", "cc": block[2], "invert": "On" if block[5] == 1 else "Off"})
-        elif type_raw == 1: d.update({"type": "Note", "note": note_map_rev.get(block[8], block[8]), "velocity": block[9]})
-        elif type_raw == 2: d.update({"type": "ProgChange", "program": block[2]})
-        elif type_raw == 3: d.update({"type": "ProgBank", "program": block[4], "msb": block[5], "lsb": block[6]})
-        elif type_raw == 4: d.update({"type": "Keystroke", "key1": key1_map.get(block[11]), "key2": key2_map.get(block[12])})
-        else: d['type'] = f"UNKNOWN_{type_raw}"
-        return d
+        return self._decode(*self._control_layout(base_offset), index)
 
     def _write_control(self, base_offset, index, **kwargs):
         if not self.sysex_data: return
-        offset = base_offset + (index - 1) * CONTROL_SIZE; block = self.sysex_data[offset:offset+CONTROL_SIZE]
-        type_map = {"NOTE": 1, "CC": 0, "PROGCHANGE": 2, "PROGBANK": 3, "KEYSTROKE": 4}
-        if "type" in kwargs:
-            new_type_val = type_map.get(str(kwargs["type"]).upper())
-            if new_type_val is not None: block[0] = new_type_val
-        current_type = block[0]
+        kind, layout, views = self._control_layout(base_offset)
+        layout.encode(views[index - 1], kwargs)
+        self._touch(kind, index)
+
+    # Every control of a kind at once, in index order (empty without a preset)
+    @property
+    def pads(self): return [self.get_pad(i) for i in range(1, len(self._pads) + 1)]
+    @property
+    def knobs(self): return [self.get_knob(i) for i in range(1, len(self._knobs) + 1)]
+    @property
+    def faders(self): return [self.get_fader(i) for i in range(1, len(self._faders) + 1)]
+    @property
+    def switches(self): return [self.get_switch(i) for i in range(1, len(self._switches) + 1)]
+    @property
+    def daw_buttons(self): return [self.get_daw(name) for name in daw_names[:len(self._daws)]]
 
-        for k, v in kwargs.items():
-            if k == "channel": block[1] = channel_map.get(v, block[1])
-            elif k == "mode": block[3] = 1 if str(v).upper() == "TOGGLE" else 0
-            if current_type in [0,1,2,3] and k == "midi_to_din": block[7] = 1 if str(v).upper() == "ON" else 0
-            
-            if current_type == 0:
-                if k == "cc": block[2] = int(v)
-                elif k == "invert": block[5] = 1 if str(v).upper() == "ON" else 0
-            elif current_type == 1:
-                if k == "note": block[8] = note_map.get(v, block[8])
-                elif k == "velocity": block[9] = int(v)
-            elif current_type == 2:
-                if k == "program": block[2] = int(v)
-            elif current_type == 3:
-                if k == "program": block[4] = int(v)
-                elif k == "msb": block[5] = int(v)
-                elif k == "lsb": block[6] = int(v)
-            elif current_type == 4:
-                if k == "key1": block[11] = key1_map_rev.get(v, block[11])
-                elif k == "key2": block[12] = key2_map_rev.get(v, block[12])
-        self.sysex_data[offset:offset+CONTROL_SIZE] = block
-        
     def get_switch(self, index): return self._get_control(SWITCH_OFFSET, index)
     def set_switch(self, index, **kwargs): self._write_control(SWITCH_OFFSET, index, **kwargs)
     def get_daw(self, name): return self._get_control(DAW_OFFSET, daw_names.index(name) + 1)
@@ -0,0 +1,201 @@
+# File: mpk2_simulator.py
+# Headless MPK2: plays gestures (fader sweeps, pad hits, knob turns, switch presses) through a preset and renders
+# the MIDI the hardware would send, honouring each control's type, channel, min/max, toggle and aftertouch modes.
+# The stream goes to a .mid file, a raw MIDI capture, or an (rtmidi) output or virtual port in real time or faster.
+#
+#   sim = ControllerSimulator(MPK2Preset("rig.syx"))
+#   sim.run_script("sweep fader 3 over 200 ms; hit pads 1-16 at 120 bpm; turn knob 5 +40 detents")
+#   write_midi_file("load_test.mid", sim.events)
+import re
+import struct
+import time
+
+from mpk2_preset import daw_names
+
+SMF_PPQ = 960 # ticks per quarter note in written .mid files, at 120 BPM (one tick ~0.52 ms)
+
+def _span(text):
+    """"1-16" / "3" / "1,4,7" -> list of 1-based indexes."""
+    indexes = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        indexes.extend(range(int(first), int(last or first) + 1))
+    return indexes
+
+def _ms(text): return float(text) / 1000
+
+# "sweep fader 3 [from 0 to 127] over 200 ms", "hit pads 1-16 at 120 bpm [velocity 100]", "turn knob 5 +40 [detents]
+# [over 300 ms]", "press switch 2 [hold 100 ms]", "press daw Left", "press pad 5 [velocity 90] [pressure 80]", "wait 50 ms"
+GESTURES = [
+    (re.compile(r"sweep fader (\d+)(?: from (\d+) to (\d+))?(?: over ([\d.]+) ?ms)?$"),
+     lambda sim, m: sim.sweep_fader(int(m[1]), int(m[2] or 0), int(m[3] or 127), _ms(m[4] or 200))),
+    (re.compile(r"hit pads? ([\d,-]+) at ([\d.]+) ?bpm(?: velocity (\d+))?$"),
+     lambda sim, m: sim.hit_pads(_span(m[1]), float(m[2]), int(m[3] or 100))),
+    (re.compile(r"turn knob (\d+) ([+-]\d+)(?: detents?)?(?: over ([\d.]+) ?ms)?$"),
+     lambda sim, m: sim.turn_knob(int(m[1]), int(m[2]), _ms(m[3] or abs(int(m[2])) * 5))),
+    (re.compile(r"press (switch|daw|pad) (\w+)(?: velocity (\d+))?(?: pressure (\d+))?(?: hold ([\d.]+) ?ms)?$"),
+     lambda sim, m: sim.press(m[1], m[2], _ms(m[5] or 100), int(m[3] or 100), m[4] and int(m[4]))),
+    (re.compile(r"wait ([\d.]+) ?ms$"), lambda sim, m: sim.wait(_ms(m[1]))),
+]
+
+class ControllerSimulator:
+    """Renders gestures into timestamped MIDI messages: events is [(seconds, bytes)], in time order per gesture.
+
+    Gestures run one after the other from self.time. Controls on the Common channel play on common_channel
+    (0-15); USBA and USBB channels both map to their MIDI channel (the port is not modelled)."""
+
+    def __init__(self, preset, common_channel=0):
+        self.preset = preset
+        self.common_channel = common_channel
+        self.events = []
+        self.time = 0.0
+        self.positions = {} # ("knob" | "fader", index) -> current value
+        self.latched = set() # toggle-mode pads/switches currently on
+
+    def _channel(self, control):
+        channel = int(control.channel or 0)
+        return self.common_channel if channel == 0 else (channel - 1) & 0x0F
+
+    def _emit(self, at, *message):
+        self.events.append((at, bytes(message)))
+
+    def wait(self, seconds):
+        self.time += seconds
+
+    def run_script(self, script):
+        """Runs gestures separated by newlines or ';' (see GESTURES); returns the number of messages added."""
+        before = len(self.events)
+        for line in re.split(r"[;\n]", script):
+            line = " ".join(line.lower().split())
+            if not line or line.startswith("#"): continue
+            for pattern, action in GESTURES:
+                m = pattern.match(line)
+                if m: action(self, m); break
+            else: raise ValueError(f"Unknown gesture: '{line}'")
+        return len(self.events) - before
+
+    # --- CONTINUOUS CONTROLS ---
+    def sweep_fader(self, index, start=0, end=127, duration=0.2):
+        """Moves a fader from start to end (0-127 travel); one message per value change, evenly spaced."""
+        fader = self.preset.get_fader(index); channel = self._channel(fader)
+        low, high = fader.min, fader.max
+        steps = abs(end - start) or 1; last = None
+        for step in range(steps + 1):
+            travel = start + (end - start) * step / steps
+            value = round(low + (high - low) * travel / 127)
+            if value == last: continue
+            last = value; at = self.time + duration * step / steps
+            if fader.type == "AFTERTOUCH": self._emit(at, 0xD0 | channel, value)
+            else: self._emit(at, 0xB0 | channel, fader.cc, value)
+        self.positions["fader", index] = last
+        self.time += duration
+
+    def turn_knob(self, index, detents, duration=0.2):
+        """Turns a knob by detents (negative: counter-clockwise). Absolute types send the new value, clamped
+        to min/max; INC_DEC1 sends +1/-1 as two's complement (1 / 127), INC_DEC2 as sign-magnitude (1 / 65)."""
+        knob = self.preset.get_knob(index); channel = self._channel(knob)
+        low, high = sorted((knob.min, knob.max))
+        value = self.positions.get(("knob", index), min(max(knob.value, low), high))
+        step = 1 if detents > 0 else -1
+        for n in range(abs(detents)):
+            at = self.time + duration * n / abs(detents)
+            if knob.type == "INC_DEC1": self._emit(at, 0xB0 | channel, knob.cc, step & 0x7F)
+            elif knob.type == "INC_DEC2": self._emit(at, 0xB0 | channel, knob.cc, 1 if step > 0 else 0x41)
+            else:
+                if not low <= value + step <= high: break # end of range: the hardware sends nothing more
+                value += step
+                if knob.type == "AFTERTOUCH": self._emit(at, 0xD0 | channel, value)
+                else: self._emit(at, 0xB0 | channel, knob.cc, value)
+        self.positions["knob", index] = value
+        self.time += duration
+
+    # --- PADS, SWITCHES, DAW BUTTONS ---
+    def _program(self, at, channel, control):
+        if control.msb is not None: self._emit(at, 0xB0 | channel, 0, control.msb); self._emit(at, 0xB0 | channel, 32, control.lsb)
+        self._emit(at, 0xC0 | channel, control.program)
+
+    def _hit_pad(self, index, velocity, hold, pressure=None):
+        pad = self.preset.get_pad(index); channel = self._channel(pad); start, end = self.time, self.time + hold
+        if pad.type != "Note": self._program(start, channel, pad); return
+        if pad.mode == "Toggle":
+            # First hit latches the note on, the next one sends the note off
+            if ("pad", index) in self.latched: self.latched.discard(("pad", index)); self._emit(start, 0x80 | channel, pad.note, 0); return
+            self.latched.add(("pad", index)); end = None
+        self._emit(start, 0x90 | channel, pad.note, velocity)
+        if pressure is not None and pad.aftertouch in ("Channel", "Poly"): # a raw byte the table lacks sends nothing
+            at = start + hold / 2
+            if pad.aftertouch == "Poly": self._emit(at, 0xA0 | channel, pad.note, pressure)
+            else: self._emit(at, 0xD0 | channel, pressure)
+        if end is not None: self._emit(end, 0x80 | channel, pad.note, 0)
+
+    def _press_control(self, control, key, hold):
+        channel = self._channel(control); start, end = self.time, self.time + hold
+        if control.type in ("ProgChange", "ProgBank"): self._program(start, channel, control); return
+        if control.type == "CC":
+            on, off = (0, 127) if control.invert == "On" else (127, 0)
+            message = lambda at, value: self._emit(at, 0xB0 | channel, control.cc, value)
+        elif control.type == "Note":
+            on, off = control.velocity, 0
+            message = lambda at, value: self._emit(at, (0x90 if value else 0x80) | channel, int(control.note), value)
+        else: return # Keystroke: computer keyboard events, no MIDI
+        if control.mode == "Toggle":
+            latched = key in self.latched
+            (self.latched.discard if latched else self.latched.add)(key)
+            message(start, off if latched else on)
+        else: message(start, on); message(end, off)
+
+    def press(self, kind, which, hold=0.1, velocity=100, pressure=None):
+        """One press of a pad, switch or DAW button (which: index, or a DAW button name)."""
+        if kind == "pad": self._hit_pad(int(which), velocity, hold, pressure)
+        else:
+            name = which.capitalize() if kind == "daw" and not str(which).isdigit() else None
+            index = daw_names.index(name) + 1 if name else int(which)
+            control = self.preset.get_daw(daw_names[index - 1]) if kind == "daw" else self.preset.get_switch(index)
+            self._press_control(control, (kind, index), hold)
+        self.time += hold
+
+    def hit_pads(self, indexes, bpm=120, velocity=100):
+        """Hits the pads one per beat; each note lasts half a beat."""
+        beat = 60 / bpm
+        for index in indexes:
+            self._hit_pad(index, velocity, beat / 2)
+            self.time += beat
+
+# --- OUTPUT ---
+def _varlen(value):
+    out = [value & 0x7F]; value >>= 7
+    while value: out.append((value & 0x7F) | 0x80); value >>= 7
+    return bytes(reversed(out))
+
+def write_midi_file(path, events, bpm=120):
+    """Standard MIDI File (format 0) with every event at its time, rounded to the tick."""
+    tick = 60 / bpm / SMF_PPQ
+    track = bytearray(b"\x00\xFF\x51\x03" + struct.pack(">I", round(60e6 / bpm))[1:]); last = 0
+    for at, message in sorted(events, key=lambda e: e[0]):
+        ticks = round(at / tick)
+        track += _varlen(ticks - last) + message; last = ticks
+    track += b"\x00\xFF\x2F\x00"
+    with open(path, "wb") as f:
+        f.write(b"MThd" + struct.pack(">IHHH", 6, 0, 1, SMF_PPQ) + b"MTrk" + struct.pack(">I", len(track)) + track)
+
+def write_raw(path, events):
+    """The messages back to back, as a wire capture (times dropped; mpk2_extract reads these too)."""
+    with open(path, "wb") as f: f.write(b"".join(message for _, message in sorted(events, key=lambda e: e[0])))
+
+def play(events, midi_out, speed=1.0):
+    """Sends events on an rtmidi-style output (send_message), speed times faster than real time (0: no waiting).
+    Returns (messages sent, seconds taken)."""
+    start = time.perf_counter(); sent = 0
+    for at, message in sorted(events, key=lambda e: e[0]):
+        if speed:
+            delay = at / speed - (time.perf_counter() - start)
+            if delay > 0: time.sleep(delay)
+        midi_out.send_message(message); sent += 1
+    return sent, time.perf_counter() - start
+
+def open_virtual_output(name="MPK249 Simulator", backend=None):
+    """A new virtual output port that DAWs see as a MIDI input (macOS/Linux)."""
+    if backend is None: import rtmidi as backend
+    midi_out = backend.MidiOut()
+    midi_out.open_virtual_port(name)
+    return midi_out
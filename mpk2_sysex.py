@@ -0,0 +1,142 @@
+# File: mpk2_sysex.py
+# SysEx framing shared by the MIDI engines, the GUI, the library and the scripts.
+# Frames always include F0 and F7, so block offsets are the same everywhere (PAD_OFFSET = 0x3D, ...).
+import mmap
+import os
+import re
+import tempfile
+
+SYSEX_START = 0xF0
+SYSEX_END = 0xF7
+
+# --- FILES ---
+def frame_spans(data):
+    """(start, end) of every complete F0..F7 frame in data (bytes, bytearray, mmap); all searching is done by find().
+    Bytes between frames are skipped, and a frame cut short by a new F0 is dropped."""
+    start = data.find(b"\xF0")
+    while start >= 0:
+        end = data.find(b"\xF7", start)
+        if end < 0: return
+        restart = data.rfind(b"\xF0", start + 1, end)
+        if restart >= 0: start = restart; continue
+        yield start, end + 1
+        start = data.find(b"\xF0", end + 1)
+
+def iter_frames(data):
+    """Zero-copy memoryview of every frame in data."""
+    view = memoryview(data)
+    for start, end in frame_spans(data): yield view[start:end]
+
+class SyxFile:
+    """A .syx file mapped into memory; frames are zero-copy memoryviews into the mapping.
+
+        with SyxFile("capture.syx") as syx:
+            for frame in syx: ...
+
+    Copy (bytes(frame)) whatever must outlive the with block: the mapping cannot close while views on it exist."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.spans = list(frame_spans(self.data))
+        self._view = memoryview(self.data)
+
+    def __len__(self): return len(self.spans)
+    def __getitem__(self, i): start, end = self.spans[i]; return self._view[start:end]
+    def __iter__(self): return (self._view[start:end] for start, end in self.spans)
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def close(self):
+        self._view.release()
+        if isinstance(self.data, mmap.mmap): self.data.close()
+        self._file.close()
+
+def read_syx(path):
+    """Every frame of a .syx file, as bytes."""
+    with SyxFile(path) as syx: return [bytes(frame) for frame in syx]
+
+def write_atomic(path, data):
+    """Writes data to a temp file next to path, then renames it over path: readers see the old or the new file, never half."""
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".syx", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f: f.write(data)
+        os.chmod(tmp, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644) # mkstemp makes it 0600
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp); raise
+
+def write_syx(path, frames):
+    """Writes frames (each F0..F7) back to back, atomically."""
+    write_atomic(path, b"".join(frames))
+
+# --- STREAMS ---
+
+# Inside a SysEx, realtime bytes (F8-FF) may be interleaved and are dropped; any other status byte ends it unfinished
+_REALTIME = bytes(range(0xF8, 0x100))
+_STATUS = re.compile(rb"[\x80-\xF7]")
+
+class SysexStream:
+    """Incremental F0..F7 splitter for data that arrives in arbitrary chunks (MIDI callbacks, files, pipes).
+
+    feed() returns the frames completed by that chunk; bytes outside a frame are skipped. A frame may
+    span any number of chunks and is assembled in a preallocated buffer that only grows when a frame
+    outgrows it, so a bulk transfer of many dumps allocates one bytes object per frame.
+
+    raw=True is for wire captures: realtime bytes inside a frame are removed and a frame interrupted by
+    another status byte is dropped. A frame longer than max_length is dropped too, so a lost F7 cannot
+    make the buffer grow without bound."""
+
+    def __init__(self, capacity=4096, raw=False, max_length=None):
+        self._buffer = bytearray(capacity)
+        self._length = 0
+        self._assembling = False
+        self.raw = raw
+        self.max_length = max_length
+        self.dropped = 0
+
+    def reset(self):
+        self._length = 0
+        self._assembling = False
+
+    def feed(self, chunk):
+        if not hasattr(chunk, "find"): chunk = bytes(chunk) # rtmidi lists, memoryviews
+        frames = []
+        start, size = 0, len(chunk)
+        while start < size:
+            if not self._assembling:
+                start = chunk.find(SYSEX_START, start)
+                if start < 0: break
+                self._assembling = True
+                self._length = 0
+            end = chunk.find(SYSEX_END, start)
+            complete = end >= 0
+            end = end + 1 if complete else size
+            if self.raw:
+                # Status bytes between the frame's F0 and F7 (one regex search, no Python loop over the bytes)
+                status = _STATUS.search(chunk, start + 1 if self._length == 0 else start, end - 1 if complete else end)
+                if status:
+                    self._drop(); start = status.start(); continue
+            if not self._append(chunk, start, end):
+                self._drop(); start = end; continue
+            if complete:
+                self._assembling = False
+                frames.append(bytes(self._buffer[:self._length]))
+            start = end
+        return frames
+
+    def _drop(self):
+        self._assembling = False
+        self.dropped += 1
+
+    def _append(self, chunk, start, end):
+        piece = chunk[start:end]
+        if self.raw: piece = bytes(piece).translate(None, _REALTIME)
+        n = len(piece)
+        if self.max_length and self._length + n > self.max_length: return False
+        if self._length + n > len(self._buffer):
+            self._buffer.extend(bytes(max(len(self._buffer), n)))
+        self._buffer[self._length:self._length + n] = piece
+        self._length += n
+        return True
@@ -0,0 +1,266 @@
+# File: mpk2_virtual.py
+# A stand-in MPK249 for exercising the MIDI I/O path without the keyboard: 30 preset slots that answer dump
+# requests and store preset writes, with the latency and bandwidth of a real link. It runs in process
+# (VirtualMPK.backend is an rtmidi-style module for MidiPorts) or behind rtmidi virtual ports (Linux/macOS).
+#
+#   device = VirtualMPK(latency=0.005, bandwidth=DIN_BANDWIDTH)
+#   ports = MidiPorts(backend=device.backend)
+#   presets = PresetFetcher(ports, *ports.find_mpk()).start().wait()
+import collections
+import functools
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from mpk2_preset import MPK2Preset, MODEL_IDS, PRESET_COUNT, is_preset_dump
+from mpk2_sysex import SysexStream, read_syx, write_syx
+
+DUMP_SIZE = 0x600 # bytes of the dumps a blank slot holds
+DIN_BANDWIDTH = 3125 # bytes/sec of a 5-pin MIDI cable (31250 baud, 10 bits a byte)
+
+def blank_dump(model=0x24, number=0):
+    """A dump with the Akai header, the name "PRESETnn" and zeroed control tables."""
+    data = bytearray(DUMP_SIZE)
+    data[0:8] = bytes([0xF0, 0x47, 0x00, model, 0x30, 0x00, 0x00, number])
+    data[8:16] = f"PRESET{number + 1:02d}".encode()
+    data[-1] = 0xF7
+    return data
+
+# --- IN-PROCESS PORTS ---
+class _VirtualPort:
+    """What the in-process MidiIn/MidiOut share: the port list of the device and open/close."""
+
+    def __init__(self, device):
+        self.device = device
+        self.index = None
+
+    def open_port(self, index=0, name=None):
+        if not 0 <= index < len(self.get_ports()): raise IOError(f"Invalid port number {index}")
+        self.index = index
+        self._opened()
+
+    def _opened(self): pass
+
+    def close_port(self):
+        self.index = None
+
+    def is_port_open(self):
+        return self.index is not None
+
+    def get_port_count(self):
+        return len(self.get_ports())
+
+class VirtualMidiIn(_VirtualPort):
+    """rtmidi.MidiIn look-alike: messages the device sends on the port go to the callback (device thread)
+    or, without one, to a queue read by get_message(). SysEx is ignored until ignore_types(sysex=False)."""
+
+    def __init__(self, device):
+        super().__init__(device)
+        self._callback = self._data = None
+        self._queue = collections.deque()
+        self._ignore_sysex = True
+        self._last = None
+
+    def get_ports(self):
+        return list(self.device.in_ports) if self.device.connected else []
+
+    def _opened(self):
+        self.device._listeners.add(self)
+
+    def close_port(self):
+        self.device._listeners.discard(self); super().close_port()
+
+    def set_callback(self, func, data=None):
+        self._callback, self._data = func, data
+
+    def cancel_callback(self):
+        self._callback = self._data = None
+
+    def ignore_types(self, sysex=True, timing=True, active_sense=True):
+        self._ignore_sysex = sysex
+
+    def get_message(self):
+        return self._queue.popleft() if self._queue else None
+
+    def _receive(self, port, message):
+        if self.index != port or (self._ignore_sysex and message[0] == 0xF0): return
+        now = time.monotonic(); delta = now - self._last if self._last else 0.0; self._last = now
+        event = (list(message), delta) # rtmidi hands out lists
+        if self._callback: self._callback(event, self._data)
+        else: self._queue.append(event)
+
+class VirtualMidiOut(_VirtualPort):
+    """rtmidi.MidiOut look-alike: send_message() goes to the device (raises while it is unplugged).
+    Messages are checked like rtmidi does, so partial SysEx is refused here too."""
+
+    def get_ports(self):
+        return list(self.device.out_ports) if self.device.connected else []
+
+    def send_message(self, message):
+        if not message: raise ValueError("'message' must not be empty.")
+        if len(message) > 3 and message[0] != 0xF0: raise ValueError("'message' longer than 3 bytes but does not start with 0xF0.")
+        if self.index is None or not self.device.connected: raise IOError("MIDI port is not open")
+        self.device.receive(message)
+
+class _PlayPort:
+    """Output-like object (send_message) for what is played on the keys and pads, e.g. mpk2_simulator.play(events, device.keyboard)."""
+
+    def __init__(self, device): self.device = device
+    def send_message(self, message): self.device.send(bytes(message), port=self.device.PLAY_PORT)
+
+# --- DEVICE ---
+class VirtualMPK:
+    """Emulated MPK2 (MPK249 by default): PRESET_COUNT slots, one SysEx engine, the Windows port names.
+
+    Whatever the host sends on any port is reassembled into SysEx frames. A dump request
+    (F0 47 00 <model> 31 00 01 <n> F7) is answered on the SysEx port ("MIDIIN4 (<name>)") with slot n,
+    its byte 7 set to n; a preset dump of the same model is stored in the slot of its byte 7. Each
+    frame takes len / bandwidth seconds on the wire in each direction (bandwidth None: no limit),
+    and the device takes latency seconds before acting on it. loss is the fraction of replies
+    dropped on purpose (for retry tests). Everything runs on one device thread, like a real
+    driver's callback thread; wait_idle() blocks until it has nothing left to do."""
+    PLAY_PORT, SYSEX_PORT = 0, 2
+
+    def __init__(self, model=0x24, presets=(), latency=0.0, bandwidth=None, loss=0.0, seed=None):
+        self.model = model
+        self.name = MODEL_IDS[model]
+        self.in_ports = [self.name, f"MIDIIN2 ({self.name})", f"MIDIIN4 ({self.name})"]
+        self.out_ports = [self.name, f"MIDIOUT2 ({self.name})", f"MIDIOUT4 ({self.name})"]
+        self.slots = [blank_dump(model, n) for n in range(PRESET_COUNT)]
+        self.latency, self.bandwidth, self.loss = latency, bandwidth, loss
+        self.connected = True
+        self.backend = collections.namedtuple("Backend", "MidiIn MidiOut")(
+            functools.partial(VirtualMidiIn, self), functools.partial(VirtualMidiOut, self))
+        self.keyboard = _PlayPort(self)
+        self.requests = self.writes = self.ignored = self.lost = self.bytes_in = self.bytes_out = 0
+        self._listeners = set()
+        self._virtual = None # (MidiIn, [MidiOut per in port]) in virtual port mode
+        self._random = random.Random(seed)
+        self._stream = SysexStream(raw=True, max_length=2 * DUMP_SIZE)
+        self._cond = threading.Condition()
+        self._queue = [] # (due, seq, func, args)
+        self._seq = itertools.count()
+        self._busy = self._closed = False
+        self._in_free = self._out_free = 0.0 # when each direction of the link is next idle
+        for preset in presets: self.store(preset)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    # --- SLOTS ---
+    def store(self, data):
+        """Puts a dump (bytes or MPK2Preset) in the slot of its byte 7; returns the slot number, or None if it is not one of ours."""
+        if isinstance(data, MPK2Preset): data = data.sysex_data
+        if not data or not is_preset_dump(data) or data[3] != self.model or data[7] >= PRESET_COUNT: return None
+        self.slots[data[7]] = bytearray(data)
+        return data[7]
+
+    def load(self, path):
+        """Stores every dump of a .syx file (one preset or a whole "All" dump); returns the slots filled."""
+        return [n for n in map(self.store, read_syx(path)) if n is not None]
+
+    def save(self, path):
+        write_syx(path, [bytes(slot) for slot in self.slots])
+
+    def preset(self, number):
+        return MPK2Preset(data=bytes(self.slots[number]))
+
+    # --- LINK ---
+    def _transfer(self, size):
+        return size / self.bandwidth if self.bandwidth else 0.0
+
+    def _schedule(self, due, func, *args):
+        heapq.heappush(self._queue, (due, next(self._seq), func, args))
+        self._cond.notify_all()
+
+    def receive(self, message):
+        """Entry point for everything the host sends: handled once it is through the link, plus latency."""
+        data = bytes(message)
+        with self._cond:
+            self.bytes_in += len(data)
+            self._in_free = max(time.monotonic(), self._in_free) + self._transfer(len(data))
+            self._schedule(self._in_free + self.latency, self._on_chunk, data)
+
+    def send(self, message, port=SYSEX_PORT):
+        """Sends message to the host on one of in_ports, after the previous replies and its own transfer time."""
+        with self._cond:
+            self.bytes_out += len(message)
+            self._out_free = max(time.monotonic(), self._out_free) + self._transfer(len(message))
+            self._schedule(self._out_free, self._deliver, port, message)
+
+    def _deliver(self, port, message):
+        if self._virtual: self._virtual[1][port].send_message(list(message))
+        for listener in list(self._listeners): listener._receive(port, message)
+
+    def _on_chunk(self, data):
+        for frame in self._stream.feed(data): self.handle(frame)
+
+    def handle(self, frame):
+        """Acts on one complete SysEx frame from the host (device thread)."""
+        if len(frame) == 9 and frame[:3] == b"\xF0\x47\x00" and frame[3] == self.model and frame[4:7] == b"\x31\x00\x01":
+            number = frame[7]
+            if number >= PRESET_COUNT: self.ignored += 1; return
+            self.requests += 1
+            if self.loss and self._random.random() < self.loss: self.lost += 1; return
+            reply = bytearray(self.slots[number]); reply[7] = number
+            self.send(bytes(reply))
+        elif self.store(frame) is not None: self.writes += 1
+        else: self.ignored += 1
+
+    # --- DEVICE THREAD ---
+    def _run(self):
+        with self._cond:
+            while not self._closed:
+                if not self._queue: self._cond.wait(); continue
+                delay = self._queue[0][0] - time.monotonic()
+                if delay > 0: self._cond.wait(delay); continue
+                _, _, func, args = heapq.heappop(self._queue)
+                self._busy = True
+                self._cond.release()
+                try: func(*args)
+                finally:
+                    self._cond.acquire()
+                    self._busy = False; self._cond.notify_all()
+
+    def wait_idle(self, timeout=None):
+        """Blocks until every message sent so far has been handled and delivered; False on timeout."""
+        with self._cond: return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def unplug(self):
+        """Empties the port lists and fails sends, like pulling the USB cable (MidiPorts hot-plug tests)."""
+        self.connected = False
+        for listener in list(self._listeners): listener.close_port()
+
+    def plug(self):
+        self.connected = True
+
+    def stats(self):
+        return {"requests": self.requests, "writes": self.writes, "ignored": self.ignored, "lost": self.lost,
+                "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+    # --- VIRTUAL PORTS ---
+    def open_virtual_ports(self, backend=None):
+        """Publishes the device as rtmidi virtual ports named like the hardware ones, for other programs
+        (the GUIs, a DAW) to connect to: the host writes to "MIDIOUT4 (...)" and reads "MIDIIN4 (...)"."""
+        if backend is None: import rtmidi as backend
+        midi_in = backend.MidiIn()
+        midi_in.ignore_types(sysex=False, timing=True, active_sense=True)
+        midi_in.set_callback(lambda event, data: self.receive(event[0]))
+        midi_in.open_virtual_port(self.out_ports[self.SYSEX_PORT])
+        outs = []
+        for name in self.in_ports:
+            midi_out = backend.MidiOut(); midi_out.open_virtual_port(name); outs.append(midi_out)
+        self._virtual = (midi_in, outs)
+
+    def close(self):
+        with self._cond:
+            self._closed = True; self._cond.notify_all()
+        self._thread.join()
+        if self._virtual:
+            midi_in, outs = self._virtual; self._virtual = None
+            midi_in.cancel_callback()
+            for port in [midi_in, *outs]: port.close_port()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Applies edit specs (see mpk2_edits.py) to many .syx files at once, spread over worker processes.
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_preset import MPK2Preset, is_preset_dump, write_atomic
+from mpk2_edits import parse_edits, apply_edits, parse_selection
+from mpk2_conflicts import fix_cc_collisions, parse_cc_ranges, cc_collisions, describe
+from mpk2_patch import control_name
+
+def _root(pattern):
+    """Folder a path or glob pattern is relative to: everything before its first wildcard."""
+    root = os.path.dirname(pattern)
+    while any(c in root for c in "*?["): root = os.path.dirname(root)
+    return root
+
+def collect(paths):
+    """Sorted [(path, name)] of the .syx files to edit; name is the path relative to the folder or glob it was
+    found through (a plain file: its base name), so copies under --output keep the input tree."""
+    files = {}
+    for path in paths:
+        if os.path.isdir(path):
+            found = [(os.path.join(root, n), path) for root, _, names in os.walk(path) for n in names if n.lower().endswith(".syx")]
+        else:
+            found = [(match, _root(path)) for match in glob.glob(path, recursive=True) or [path]]
+        for match, root in found: files.setdefault(os.path.normpath(match), os.path.relpath(match, root or "."))
+    return sorted(files.items())
+
+def edit_file(job):
+    """Worker: (path, edits, CC fix options or None, output path or None)
+    -> (path, error message or None, changed, CC collisions --fix-cc could not resolve)."""
+    path, edits, fix_cc, out = job
+    try:
+        with open(path, "rb") as f: data = f.read()
+        if not is_preset_dump(data): return path, "not a preset dump", False, []
+        preset = MPK2Preset(data=data)
+        apply_edits(preset, edits)
+        unresolved = []
+        if fix_cc is not None:
+            fix_cc_collisions(preset, *fix_cc) # after the edits, which may add collisions
+            unresolved = [f"{describe(key)}: {', '.join(control_name(kind, i) for kind, i in controls)}" for key, controls in cc_collisions(preset.sysex_data)]
+        changed = preset.sysex_data != data
+        if out is not None and changed:
+            os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+            write_atomic(out, preset.sysex_data)
+        return path, None, changed, unresolved
+    except Exception as e:
+        return path, str(e), False, []
+
+def main():
+    parser = argparse.ArgumentParser(description="MPK2 batch editor: apply edits to many presets")
+    parser.add_argument("paths", nargs="+", help="Folders, .syx files or glob patterns (e.g. 'rigs/**/*.syx')")
+    parser.add_argument("--set", dest="specs", action="append", default=[], metavar="SPEC",
+                        help="Edit spec, repeatable: 'pads bank A channel=USBA10', 'knobs 1-8 min=0 max=100'")
+    parser.add_argument("--fix-cc", action="store_true", help="Move knobs/faders/switches off duplicate CCs (per channel)")
+    parser.add_argument("--pin", action="append", default=[], metavar="SELECTION",
+                        help="With --fix-cc: controls that keep their CC, repeatable: 'knobs 1-8', 'switches 3'")
+    parser.add_argument("--reserve", default="", metavar="CCS", help="With --fix-cc: CCs not to use, e.g. '0-7,120-127'")
+    parser.add_argument("--output", help="Write edited copies into this folder instead of overwriting the files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: one per CPU)")
+    parser.add_argument("--dry-run", action="store_true", help="Check the edits without writing anything")
+    args = parser.parse_args()
+
+    if not args.specs and not args.fix_cc: parser.error("nothing to do: give --set and/or --fix-cc")
+    try: # fail on a bad spec before starting any worker
+        edits = parse_edits(args.specs)
+        pinned = {(kind, i) for spec in args.pin for kind, indexes in [parse_selection(spec)] for i in indexes}
+        fix_cc = (pinned, parse_cc_ranges(args.reserve)) if args.fix_cc else None
+    except ValueError as e: parser.error(str(e))
+    files = collect(args.paths)
+    if args.output:
+        names = {}
+        for path, name in files: names.setdefault(os.path.normcase(name), []).append(path)
+        clashes = [paths for paths in names.values() if len(paths) > 1]
+        if clashes: parser.error("these files would be written to the same place under --output: " + "; ".join(" ".join(p) for p in clashes))
+    jobs = [(path, edits, fix_cc, None if args.dry_run else os.path.join(args.output, name) if args.output else path)
+            for path, name in files]
+
+    start = time.perf_counter(); failed = changed = left = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Big chunks: one file is ~100us of work, far less than the cost of a round trip to a worker
+        for path, error, edited, unresolved in pool.map(edit_file, jobs, chunksize=max(1, len(jobs) // (args.workers * 4) or 1)):
+            if error: failed += 1; print(f"Skipped {path}: {error}")
+            changed += edited
+            if unresolved: left += 1; print(f"Unresolved in {path}: " + "; ".join(unresolved))
+    print(f"{changed}/{len(files)} preset(s) {'would change' if args.dry_run else 'edited'}, {len(files) - failed - changed} unchanged, "
+          f"{failed} skipped in {time.perf_counter() - start:.2f}s")
+    if left: print(f"{left} preset(s) still have duplicate CCs between controls --fix-cc may not move (pinned, or kinds it does not change)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Micro-benchmarks for the MPK2Preset access layer and, with "io", the MIDI I/O path against a virtual keyboard (no keyboard needed).
+import argparse
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_preset import (MPK2Preset, KNOB_OFFSET, KNOB_SIZE, KNOB_COUNT, FADER_OFFSET, FADER_SIZE, FADER_COUNT,
+                         PAD_OFFSET, PAD_SIZE, PAD_COUNT, SWITCH_OFFSET, SWITCH_COUNT, CONTROL_SIZE,
+                         channel_map_rev, note_map_rev, color_map, key1_map, key2_map)
+
+def synthetic_preset(model=0x24, number=0):
+    """Builds a plausible MPK249 dump (header + zeroed control tables) for benchmarking."""
+    data = bytearray(0x600)
+    data[0:8] = bytes([0xF0, 0x47, 0x00, model, 0x30, 0x00, 0x00, number])
+    data[8:16] = b"BENCH   "
+    data[-1] = 0xF7
+    return MPK2Preset(data=data)
+
+# --- BASELINE GETTERS ---
+# The getters as they were before the memoryview/layout/record work: a slice copy per block and a fresh dict.
+def baseline_pad(data, index):
+    offset = PAD_OFFSET + (index - 1) * PAD_SIZE
+    block = data[offset:offset+PAD_SIZE]
+    type_raw = block[0]
+    d = {"channel": channel_map_rev.get(block[1]), "midi_to_din": "On" if block[3] == 1 else "Off", "mode": "Toggle" if block[4] == 1 else "Momentary", "aftertouch": {0:"Off", 1:"Channel", 2:"Poly"}.get(block[5]), "off_color": color_map.get(block[9]), "on_color": color_map.get(block[10])}
+    if type_raw == 1: d.update({"type": "ProgramChange", "program": block[2]})
+    elif type_raw == 2: d.update({"type": "ProgramBank", "program": block[6], "msb": block[7], "lsb": block[8]})
+    else: d.update({"type": "Note", "note": note_map_rev.get(block[2])})
+    return d
+
+def baseline_knob(data, index):
+    offset = KNOB_OFFSET + (index - 1) * KNOB_SIZE
+    block = data[offset:offset+KNOB_SIZE]
+    type_map = {0x00: "MIDI_CC", 0x01: "AFTERTOUCH", 0x02: "INC_DEC1", 0x03: "INC_DEC2"}
+    return { "type": type_map.get(block[0]), "channel": channel_map_rev.get(block[1]), "cc": block[2], "min": block[3], "max": block[4], "midi_to_din": "On" if block[5] == 1 else "Off", "msb": block[6], "lsb": block[7], "value": block[8] }
+
+def baseline_fader(data, index):
+    offset = FADER_OFFSET + (index - 1) * FADER_SIZE
+    block = data[offset:offset+FADER_SIZE]
+    return { "type": "AFTERTOUCH" if block[0] == 0x01 else "MIDI_CC", "channel": channel_map_rev.get(block[1]), "cc": block[2], "min": block[3], "max": block[4], "midi_to_din": "On" if block[5] == 1 else "Off" }
+
+def baseline_switch(data, index):
+    offset = SWITCH_OFFSET + (index - 1) * CONTROL_SIZE
+    block = data[offset:offset + CONTROL_SIZE]
+    d = {}; type_raw = block[0]
+    d['channel'] = channel_map_rev.get(block[1], block[1])
+    d['mode'] = "Toggle" if block[3] == 1 else "Momentary"
+    if type_raw in [0, 1, 2, 3]: d['midi_to_din'] = "On" if block[7] == 1 else "Off"
+    if type_raw == 0: d.update({"type": "CC", "cc": block[2], "invert": "On" if block[5] == 1 else "Off"})
+    elif type_raw == 1: d.update({"type": "Note", "note": note_map_rev.get(block[8], block[8]), "velocity": block[9]})
+    elif type_raw == 2: d.update({"type": "ProgChange", "program": block[2]})
+    elif type_raw == 3: d.update({"type": "ProgBank", "program": block[4], "msb": block[5], "lsb": block[6]})
+    elif type_raw == 4: d.update({"type": "Keystroke", "key1": key1_map.get(block[11]), "key2": key2_map.get(block[12])})
+    else: d['type'] = f"UNKNOWN_{type_raw}"
+    return d
+
+# A "refresh" is what the GUI does after a bulk edit: 64 pads + 24 knobs + 24 faders + 24 switches.
+def refresh_baseline(preset):
+    data = preset.sysex_data
+    return ([baseline_pad(data, i) for i in range(1, PAD_COUNT + 1)] + [baseline_knob(data, i) for i in range(1, KNOB_COUNT + 1)] +
+            [baseline_fader(data, i) for i in range(1, FADER_COUNT + 1)] + [baseline_switch(data, i) for i in range(1, SWITCH_COUNT + 1)])
+
+def refresh_getters(preset):
+    return ([preset.get_pad(i) for i in range(1, PAD_COUNT + 1)] + [preset.get_knob(i) for i in range(1, KNOB_COUNT + 1)] +
+            [preset.get_fader(i) for i in range(1, FADER_COUNT + 1)] + [preset.get_switch(i) for i in range(1, SWITCH_COUNT + 1)])
+
+def count_allocations(func, preset):
+    """Number of objects still alive after func() that it allocated (results are kept alive on purpose)."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func(preset)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    flt = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    count = sum(stat.count_diff for stat in after.filter_traces(flt).compare_to(before.filter_traces(flt), "filename"))
+    return count - 1, len(result)  # minus the result list itself
+
+def bench_access(args):
+    # Same refresh three ways: the baseline getters, the getters decoding every control (MPK2Preset default),
+    # and the getters with CACHE_DECODED on and nothing edited since the last refresh (as in the GUIs).
+    # The last row's gain needs the opt-in cache, which is only safe when bypass writes call touch_range.
+    print(f"{'method':<18}{'allocs/refresh':>16}{'controls':>10}{'us/refresh':>12}")
+    for name, func, cache in [("baseline get_*", refresh_baseline, False), ("get_*", refresh_getters, False),
+                              ("get_* (cached)", refresh_getters, True)]:
+        preset = synthetic_preset(); preset.CACHE_DECODED = cache
+        func(preset) # warms the cache when it is on
+        allocs, controls = count_allocations(func, preset)
+        us = min(timeit.repeat(lambda: func(preset), number=args.number, repeat=5)) / args.number * 1e6
+        print(f"{name:<18}{allocs:>16d}{controls:>10d}{us:>12.1f}")
+
+def bench_io(args):
+    # Imported here: the access benchmarks need neither rtmidi nor the virtual device
+    from mpk2_midi import MidiPorts, PresetFetcher, SysexReceiver, SysexSender, dump_request
+    from mpk2_virtual import VirtualMPK
+    with VirtualMPK(latency=args.latency / 1000, bandwidth=args.bandwidth) as device:
+        ports = MidiPorts(backend=device.backend); in_name, out_name = ports.find_mpk()
+        times = []
+        for n in range(args.rounds): # what "Get from Keyboard" does
+            receiver = SysexReceiver(ports.input(in_name)).start(); start = time.perf_counter()
+            ports.send(out_name, dump_request(n % 30))
+            if receiver.wait(5) is None: raise TimeoutError("No reply from the virtual keyboard")
+            times.append(time.perf_counter() - start); receiver.stop()
+        print(f"{'round trip':<16}{min(times) * 1000:>9.2f} ms min {sum(times) / len(times) * 1000:>9.2f} ms avg ({args.rounds} requests)")
+        start = time.perf_counter()
+        presets = PresetFetcher(ports, in_name, out_name, window=args.window).start().wait()
+        seconds = time.perf_counter() - start; size = sum(len(p.sysex_data) for p in presets.values())
+        print(f"{'fetch all':<16}{seconds * 1000:>9.1f} ms for {len(presets)} presets, {size / seconds / 1024:.1f} KB/s (window {args.window})")
+        sender = SysexSender(ports, out_name, max_rate=args.max_rate); start = time.perf_counter()
+        sender.send_all(p.sysex_data for _, p in sorted(presets.items()))
+        device.wait_idle(); seconds = time.perf_counter() - start
+        print(f"{'write all':<16}{seconds * 1000:>9.1f} ms for {device.writes} presets, {sender.bytes / seconds / 1024:.1f} KB/s until stored")
+
+def main():
+    parser = argparse.ArgumentParser(description="MPK2 preset access and MIDI I/O benchmarks")
+    parser.add_argument("--number", type=int, default=2000, help="Iterations per timing run")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("access", help="Preset access layer (default)")
+    io = commands.add_parser("io", help="Get/fetch/send through MidiPorts against an in-process virtual keyboard")
+    io.add_argument("--latency", type=float, default=0.0, help="Device latency in ms")
+    io.add_argument("--bandwidth", type=float, help="Link speed in bytes/sec (3125 for a MIDI cable; default unlimited)")
+    io.add_argument("--window", type=int, default=4, help="Dump requests in flight while fetching")
+    io.add_argument("--max-rate", type=float, help="Pace the preset writes to this many bytes/sec")
+    io.add_argument("--rounds", type=int, default=100, help="Single-preset round trips to time")
+    args = parser.parse_args()
+    (bench_io if args.command == "io" else bench_access)(args)
+
+if __name__ == "__main__":
+    main()
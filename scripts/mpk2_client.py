@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Thin client for mpk2_daemon.py: presets stay decoded and MIDI ports stay open in the daemon between calls.
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_daemon import DaemonClient, DEFAULT_SOCKET
+
+def key_values(words):
+    values = {}
+    for word in words:
+        key, _, value = word.partition("=")
+        values[key] = int(value) if value.isdigit() else value
+    return values
+
+def main():
+    parser = argparse.ArgumentParser(description="MPK2 daemon client")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"Daemon socket (default: {DEFAULT_SOCKET})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("ping"); sub.add_parser("ports"); sub.add_parser("shutdown")
+    p = sub.add_parser("info", help="Model, number and name of a preset file"); p.add_argument("file")
+    p = sub.add_parser("get", help="Decoded control(s)"); p.add_argument("file"); p.add_argument("kind", choices=["pad", "knob", "fader", "switch", "daw"]); p.add_argument("index", nargs="?")
+    p = sub.add_parser("set", help="Set one control: set FILE knob 3 cc=74 max=100")
+    p.add_argument("file"); p.add_argument("kind", choices=["pad", "knob", "fader", "switch", "daw"]); p.add_argument("index"); p.add_argument("values", nargs="+")
+    p.add_argument("--save", action="store_true", help="Write the file afterwards")
+    p = sub.add_parser("edit", help="Apply edit specs (see mpk2_batch.py)"); p.add_argument("file")
+    p.add_argument("--set", dest="specs", action="append", required=True, metavar="SPEC"); p.add_argument("--save", action="store_true")
+    p = sub.add_parser("save", help="Write the daemon's copy of a preset"); p.add_argument("file"); p.add_argument("-o", "--output")
+    p = sub.add_parser("send", help="Send a preset to the keyboard"); p.add_argument("file"); p.add_argument("--port")
+    p = sub.add_parser("fetch", help="Get preset N (1-30) from the keyboard"); p.add_argument("number", type=int); p.add_argument("-o", "--output")
+    args = parser.parse_args()
+
+    client = DaemonClient(args.socket)
+    try:
+        if args.command in ("ping", "ports", "shutdown"): result = client.call(args.command)
+        elif args.command == "info": result = client.call("load", path=args.file)
+        elif args.command == "get": result = client.call("get", path=args.file, kind=args.kind, index=args.index)
+        elif args.command == "set": result = client.call("set", path=args.file, kind=args.kind, index=args.index, values=key_values(args.values))
+        elif args.command == "edit": result = client.call("edit", path=args.file, specs=args.specs)
+        elif args.command == "save": result = client.call("save", path=args.file, output=args.output)
+        elif args.command == "send": result = client.call("send", path=args.file, port=args.port)
+        elif args.command == "fetch": result = client.call("fetch", number=args.number - 1, path=args.output)
+        if getattr(args, "save", False): client.call("save", path=args.file)
+    except RuntimeError as e:
+        sys.exit(f"Error: {e}")
+    finally:
+        client.close()
+    print(json.dumps(result, indent=1) if isinstance(result, (dict, list)) else result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Lists duplicate CC/note assignments in presets, or which controls send a given message (see mpk2_conflicts.py).
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_conflicts import index_files, index_library, describe
+from mpk2_library import walk_syx
+from mpk2_patch import control_name
+
+def main():
+    parser = argparse.ArgumentParser(description="MPK2 CC/note collisions and reverse lookup")
+    parser.add_argument("inputs", nargs="*", help=".syx files or folders")
+    parser.add_argument("--db", help="Use the presets of this preset library instead (see mpk2_search.py)")
+    parser.add_argument("--channel", help="Reverse lookup: channel (Common, USBA1-16, USBB1-16)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--cc", type=int, help="Reverse lookup: CC number")
+    group.add_argument("--note", help="Reverse lookup: note name (C3) or number")
+    group.add_argument("--program", type=int, help="Reverse lookup: program number")
+    parser.add_argument("--programs", action="store_true", help="Report duplicate program changes too")
+    args = parser.parse_args()
+    if not args.inputs and not args.db: parser.error("give .syx files/folders or --db")
+
+    if args.db:
+        from mpk2_library import PresetLibrary
+        library = PresetLibrary(args.db); index = index_library(library); library.close()
+    else:
+        paths = [p for i in args.inputs for p in ([e.path for e in walk_syx(i)] if os.path.isdir(i) else [i])]
+        index = index_files(paths)
+
+    note = int(args.note) if args.note and args.note.isdigit() else args.note
+    query = [(m, v) for m, v in (("cc", args.cc), ("note", note), ("program", args.program)) if v is not None]
+    if query:
+        if not args.channel: parser.error("a reverse lookup needs --channel")
+        entries = index.lookup(args.channel, *query[0])
+        for source, kind, idx in entries: print(f"{control_name(kind, idx):12s} {source}")
+        print(f"{len(entries)} control(s)")
+        return
+
+    collisions = index.collisions(("cc", "note", "program") if args.programs else ("cc", "note"))
+    for key, source, controls in collisions:
+        print(f"{describe(key)}: {', '.join(control_name(kind, idx) for kind, idx in controls)}  {source}")
+    print(f"{len(collisions)} collision(s)")
+    sys.exit(1 if collisions else 0)
+
+if __name__ == "__main__":
+    main()
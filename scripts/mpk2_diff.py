@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Compares two presets, saves the difference as an .mpkpatch and applies it to many .syx files (see mpk2_patch.py).
+import argparse
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_preset import MPK2Preset
+from mpk2_patch import diff_controls, diff_bytes, control_name, make_patch, write_patch, read_patch, apply_patch_file
+
+def main():
+    parser = argparse.ArgumentParser(description="MPK2 preset diff / patch tool")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("diff", help="Show what changes from OLD to NEW")
+    p.add_argument("old"); p.add_argument("new")
+    p.add_argument("--debug", action="store_true", help="Also list the changed byte runs")
+    p = sub.add_parser("make", help="Save the OLD -> NEW difference as a patch file")
+    p.add_argument("old"); p.add_argument("new"); p.add_argument("patch", help="Output .mpkpatch file")
+    p.add_argument("--header", action="store_true", help="Include name and preset number changes")
+    p = sub.add_parser("apply", help="Apply a patch file to .syx files in place")
+    p.add_argument("patch"); p.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "diff":
+        old, new = MPK2Preset(args.old), MPK2Preset(args.new)
+        changes = diff_controls(old, new)
+        for kind, index, fields in changes:
+            print(f"{control_name(kind, index):10s} " + ", ".join(f"{k}: {o} -> {n}" for k, (o, n) in fields.items()))
+        if args.debug:
+            for offset, o, n in diff_bytes(old, new, header=True): print(f"  0x{offset:03X}: {o.hex(' ')} -> {n.hex(' ')}")
+        print(f"{len(changes)} control(s) differ")
+
+    elif args.command == "make":
+        patch = make_patch(MPK2Preset(args.old), MPK2Preset(args.new), header=args.header)
+        write_patch(args.patch, patch)
+        print(f"{len(patch)} change(s), {sum(len(n) for _, n in patch)} bytes -> {args.patch}")
+
+    elif args.command == "apply":
+        try: patch = read_patch(args.patch)
+        except (OSError, ValueError, struct.error) as e: parser.error(f"cannot read patch {args.patch}: {e}")
+        done = 0
+        for path in args.files:
+            try:
+                if apply_patch_file(patch, path): done += 1
+                else: print(f"Skipped {path}: not a preset dump")
+            except OSError as e: print(f"Skipped {path}: {e.strerror or e}")
+        print(f"Patched {done}/{len(args.files)} file(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Finds the MPK2 preset dumps in MIDI capture logs or .mid files (see mpk2_extract.py).
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_extract import extract_presets, extract_to_directory
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract MPK2 preset dumps from MIDI captures and .mid files")
+    parser.add_argument("captures", nargs="+", help="Raw MIDI capture logs or Standard MIDI Files")
+    parser.add_argument("--output", help="Save each dump as a .syx file in this folder (otherwise just list them)")
+    parser.add_argument("--db", help="Also index the saved files into this preset library (needs --output)")
+    args = parser.parse_args()
+    if args.db and not args.output: parser.error("--db needs --output")
+
+    library = None
+    if args.db:
+        from mpk2_library import PresetLibrary
+        library = PresetLibrary(args.db)
+    for capture in args.captures:
+        start = time.perf_counter()
+        if args.output:
+            found = len(extract_to_directory(capture, args.output, library))
+        else:
+            found = 0
+            for found, preset in enumerate(extract_presets(capture), 1):
+                print(f"  {preset.get_model()} #{preset.get_preset_number() + 1:02d} {preset.get_preset_name()}")
+        print(f"{capture}: {found} preset dump(s) in {time.perf_counter() - start:.2f}s")
+    if library: library.close()
+
+if __name__ == "__main__":
+    main()
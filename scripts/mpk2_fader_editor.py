@@ -1,53 +1,32 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import argparse
+import os
+import sys
 
-# --- Constants for Faders ---
-FADER_OFFSET = 0x3D5   # HYPOTHESIS: Starts immediately after the 24 knobs.
-FADER_SIZE = 6         # CORRECTED: Each fader's data is 6 bytes long.
-FADER_COUNT = 24       # 3 banks of 8 faders
+# Offsets and byte layout are shared with the GUI (mpk2_preset.py in the parent folder)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_preset import FADER_LAYOUT, FADER_COUNT
+from mpk2_sysex import read_syx, write_syx
 
 def load_sysex(path):
-    with open(path, "rb") as f:
-        return bytearray(f.read())
+    return bytearray(read_syx(path)[0]) # first preset of the file, F0..F7 included
 
 def save_sysex(path, data):
-    with open(path, "wb") as f:
-        f.write(data)
+    write_syx(path, [data])
 
 def parse_fader(data, index):
-    """Parses a 6-byte fader block based on the new, correct model."""
-    offset = FADER_OFFSET + index * FADER_SIZE
-    block = data[offset:offset+FADER_SIZE]
-
-    # Hypothesized mapping for the 6 bytes
-    type_raw = block[0]
-    fader_type = "AFTERTOUCH" if type_raw == 0x01 else "MIDI_CC"
-
-    return {
-        "index": index + 1,
-        "type": fader_type,
-        "channel": block[1],
-        "cc": block[2],
-        "min": block[3],
-        "max": block[4],
-        "midi_to_din": "On" if block[5] == 1 else "Off",
-        "raw_bytes": ' '.join(f'{b:02X}' for b in block)
-    }
+    """Parses a 6-byte fader block (index is 0-based)."""
+    block = FADER_LAYOUT.block(data, index + 1)
+    return {"index": index + 1, **FADER_LAYOUT.decode(block), "raw_bytes": ' '.join(f'{b:02X}' for b in block)}
 
 def write_fader(data, index, fader_type, cc, channel, minv, maxv, midi_to_din_str):
-    """Writes a 6-byte fader block."""
-    offset = FADER_OFFSET + index * FADER_SIZE
-    block = bytearray(data[offset:offset+FADER_SIZE])
-    
-    block[0] = 0x01 if fader_type.upper() == "AFTERTOUCH" else 0x00
-    block[1] = channel
-    block[2] = cc
-    block[3] = minv
-    block[4] = maxv
-    block[5] = 1 if midi_to_din_str.upper() == "ON" else 0
-
-    data[offset:offset+FADER_SIZE] = block
+    """Writes a 6-byte fader block (channel is the raw channel byte)."""
+    if not 0 <= channel <= 255: raise ValueError(f"channel byte out of range: {channel}")
+    block = FADER_LAYOUT.block(data, index + 1)
+    FADER_LAYOUT.encode(block, {
+        "type": fader_type, "cc": cc, "min": minv, "max": maxv, "midi_to_din": midi_to_din_str})
+    block[1] = channel # raw byte, as given (also values the channel names do not cover)
     return data
 
 def main():
@@ -67,7 +46,7 @@ def main():
         for i in range(FADER_COUNT):
             fader_data = parse_fader(data, i)
             raw_bytes = fader_data.pop('raw_bytes')
-            print(f"Fader {fader_data['index']:2d} | Type={fader_data['type']:10s} CC={fader_data['cc']:3d} Ch={fader_data['channel']:2d} "
+            print(f"Fader {fader_data['index']:2d} | Type={fader_data['type']:10s} CC={fader_data['cc']:3d} Ch={str(fader_data['channel']):6s} "
                   f"Min={fader_data['min']:3d} Max={fader_data['max']:3d} Din={fader_data['midi_to_din']:3s}", end='')
             if args.debug:
                 print(f" | Raw: [ {raw_bytes} ]")
@@ -1,90 +1,39 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import argparse
+import os
+import sys
 
-# Constants
-KNOB_OFFSET = 0x2FD
-KNOB_SIZE = 9
-KNOB_COUNT = 24
+# Offsets and byte layout are shared with the GUI (mpk2_preset.py in the parent folder)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_preset import KNOB_LAYOUT, KNOB_COUNT
+from mpk2_sysex import read_syx, write_syx
 
 def parse_knob(data, index):
-    """Reads and interprets the 9 bytes of a single knob with mapping."""
-    offset = KNOB_OFFSET + index * KNOB_SIZE
-    block = data[offset:offset+KNOB_SIZE]
-
-    # Final, complete byte mapping
-    type_raw = block[0]
-    channel = block[1]
-    cc = block[2]
-    minv = block[3]
-    maxv = block[4]
-    midi_to_din = "On" if block[5] == 1 else "Off"
-    msb = block[6]
-    lsb = block[7]
-    value = block[8]
-
-    if type_raw == 0x00:
-        knob_type = "MIDI_CC"
-    elif type_raw == 0x01:
-        knob_type = "AFTERTOUCH"
-    elif type_raw == 0x02:
-        knob_type = "INC_DEC1"
-    elif type_raw == 0x03:
-        knob_type = "INC_DEC2"
-    else:
-        knob_type = f"UNKNOWN_0x{type_raw:02X}"
-
-    return {
-        "index": index + 1,
-        "type": knob_type,
-        "cc": cc,
-        "channel": channel,
-        "min": minv,
-        "max": maxv,
-        "midi_to_din": midi_to_din,
-        "msb": msb,
-        "lsb": lsb,
-        "value": value,
-        "raw_bytes": ' '.join(f'{b:02X}' for b in block)
-    }
+    """Reads and interprets the 9 bytes of a single knob (index is 0-based)."""
+    block = KNOB_LAYOUT.block(data, index + 1)
+    d = {"index": index + 1, **KNOB_LAYOUT.decode(block), "raw_bytes": ' '.join(f'{b:02X}' for b in block)}
+    if d["type"] is None: d["type"] = f"UNKNOWN_0x{block[0]:02X}"
+    return d
 
 def write_knob(data, index, knob_type, cc, channel, minv, maxv, msb=0, lsb=0, midi_to_din_str="Off", value=0):
-    """Writes a knob's data into the sysex byte array with the final mapping."""
-    offset = KNOB_OFFSET + index * KNOB_SIZE
-    block = bytearray(data[offset:offset+KNOB_SIZE])
-
-    # Map all parameters to their correct byte positions
-    block[1] = channel
-    block[2] = cc
-    block[3] = minv
-    block[4] = maxv
-    block[5] = 1 if midi_to_din_str.upper() == "ON" else 0
-    block[6] = msb
-    block[7] = lsb
-    block[8] = value
-
-    if knob_type == "MIDI_CC":
-        block[0] = 0x00
+    """Writes a knob's data into the sysex byte array (channel is the raw channel byte)."""
+    if knob_type in ("MIDI_CC", "AFTERTOUCH"):
         # For non-INC/DEC types, MSB/LSB/Value are typically 0
-        block[6], block[7], block[8] = 0, 0, 0
-    elif knob_type == "AFTERTOUCH":
-        block[0] = 0x01
-        block[6], block[7], block[8] = 0, 0, 0
-    elif knob_type == "INC_DEC1":
-        block[0] = 0x02
-    elif knob_type == "INC_DEC2":
-        block[0] = 0x03
-
-    data[offset:offset+KNOB_SIZE] = block
+        msb, lsb, value = 0, 0, 0
+    if not 0 <= channel <= 255: raise ValueError(f"channel byte out of range: {channel}")
+    block = KNOB_LAYOUT.block(data, index + 1)
+    KNOB_LAYOUT.encode(block, {
+        "type": knob_type, "cc": cc, "min": minv, "max": maxv,
+        "midi_to_din": midi_to_din_str, "msb": msb, "lsb": lsb, "value": value})
+    block[1] = channel # raw byte, as given (also values the channel names do not cover)
     return data
 
 def load_sysex(path):
-    with open(path, "rb") as f:
-        return bytearray(f.read())
+    return bytearray(read_syx(path)[0]) # first preset of the file, F0..F7 included
 
 def save_sysex(path, data):
-    with open(path, "wb") as f:
-        f.write(data)
+    write_syx(path, [data])
 
 def main():
     parser = argparse.ArgumentParser(description="MPK2 Knob Editor")
@@ -102,7 +51,7 @@ def main():
 
     def print_knob_details(knob_data):
         raw_bytes = knob_data.pop('raw_bytes')
-        print(f"Knob {knob_data['index']:2d} | Type={knob_data['type']:10s} CC={knob_data['cc']:3d} Ch={knob_data['channel']:2d} "
+        print(f"Knob {knob_data['index']:2d} | Type={knob_data['type']:10s} CC={knob_data['cc']:3d} Ch={str(knob_data['channel']):6s} "
               f"Min={knob_data['min']:3d} Max={knob_data['max']:3d} MSB={knob_data['msb']:3d} LSB={knob_data['lsb']:3d} "
               f"Din={knob_data['midi_to_din']:3s} Val={knob_data['value']:3d}", end='')
         if args.debug:
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Three-way merge of presets, or of whole folders of presets matched by file name (see mpk2_merge.py).
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_merge import merge_files
+from mpk2_patch import control_name
+
+def main():
+    parser = argparse.ArgumentParser(description="MPK2 three-way preset merge")
+    parser.add_argument("base", help="Common ancestor (.syx file or folder)")
+    parser.add_argument("ours", help="Our version (.syx file or folder)")
+    parser.add_argument("theirs", help="Their version (.syx file or folder)")
+    parser.add_argument("-o", "--output", required=True, help="Merged .syx file (or folder)")
+    parser.add_argument("--prefer", choices=["ours", "theirs"], default="ours", help="Side kept on conflicts (default: ours)")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.base):
+        os.makedirs(args.output, exist_ok=True)
+        names = sorted(n for n in os.listdir(args.base) if n.lower().endswith(".syx")
+                       and os.path.exists(os.path.join(args.ours, n)) and os.path.exists(os.path.join(args.theirs, n)))
+        jobs = [tuple(os.path.join(d, n) for d in (args.base, args.ours, args.theirs, args.output)) for n in names]
+    else:
+        jobs = [(args.base, args.ours, args.theirs, args.output)]
+
+    total = 0
+    for base, ours, theirs, out in jobs:
+        conflicts = merge_files(base, ours, theirs, out, prefer=args.prefer)
+        total += len(conflicts)
+        for kind, index in conflicts:
+            where = f"byte 0x{index:03X}" if kind == "byte" else control_name(kind, index)
+            print(f"CONFLICT {os.path.basename(out)}: {where} (kept {args.prefer})")
+    print(f"Merged {len(jobs)} preset(s), {total} conflict(s)")
+    sys.exit(1 if total else 0)
+
+if __name__ == "__main__":
+    main()
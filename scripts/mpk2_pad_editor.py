@@ -1,90 +1,26 @@
 #!/usr/bin/env python3
 import argparse
-import mido
+import os
+import sys
 
-# --- Constants ---
-PAD_OFFSET = 0x3C
-PAD_SIZE = 11
-PAD_COUNT = 64
-
-# --- Lookup tables (unchanged) ---
-channel_map = {"Common": 0}
-channel_map.update({f"USBA{i}": i for i in range(1, 17)})
-channel_map.update({f"USBB{i}": 0x10 + i for i in range(1, 17)})
-channel_map_rev = {v: k for k, v in channel_map.items()}
-
-note_map = {}
-for octave in range(-1, 10):
-    for i, name in enumerate(["C","C#","D","D#","E","F","F#","G","G#","A","A#","B"]):
-        note = 12 * (octave + 1) + i
-        note_map[f"{name}{octave}"] = note
-note_map_rev = {v: k for k, v in note_map.items()}
-
-color_map = {
-    0x00:"Off", 0x01:"Red", 0x02:"Orange", 0x03:"Amber", 0x04:"Yellow", 0x05:"Green",
-    0x06:"Green_Blue", 0x07:"Aqua", 0x08:"Light_Blue", 0x09:"Blue", 0x0A:"Purple",
-    0x0B:"Pink", 0x0C:"Hot_Pink", 0x0D:"Pastel_Purple", 0x0E:"Pastel_Green",
-    0x0F:"Pastel_Pink", 0x10:"Grey"
-}
-color_map_rev = {v: k for k, v in color_map.items()}
+# Offsets and byte layout are shared with the GUI (mpk2_preset.py in the parent folder).
+# Blocks are addressed in the full F0..F7 frame, so PAD_OFFSET is the same 0x3D everywhere.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_preset import PAD_LAYOUT, PAD_COUNT, channel_map, note_map, color_map, pad_type_map
+from mpk2_sysex import read_syx, write_syx
 
 # --- Pad helpers ---
 def get_pad_block(data, pad_index):
-    base = PAD_OFFSET + (pad_index - 1) * PAD_SIZE
-    return list(data[base:base + PAD_SIZE])
-
-def set_pad_block(data, pad_index, block):
-    base = PAD_OFFSET + (pad_index - 1) * PAD_SIZE
-    data[base:base + PAD_SIZE] = block
+    return PAD_LAYOUT.block(data, pad_index)
 
 def parse_pad(block):
-    d = {}
-    pad_type = block[0]
-
-    # Parse all values based on the final correct mapping
-    d['channel'] = channel_map_rev.get(block[1], block[1])
-    d['midi_to_din'] = "On" if block[3] == 1 else "Off"
-    d['mode'] = "Toggle" if block[4] == 1 else "Momentary"
-    d['aftertouch'] = {0:"Off", 1:"Channel", 2:"Poly"}.get(block[5], block[5])
-    d['off_color'] = color_map.get(block[9], block[9])
-    d['on_color'] = color_map.get(block[10], block[10])
-
-    if pad_type == 0x01: # Program Change
-        d['type'] = "ProgramChange"
-        d['program'] = block[2]
-    elif pad_type == 0x02: # Program Bank
-        d['type'] = "ProgramBank"
-        d['program'] = block[6]
-        d['msb'] = block[7]
-        d['lsb'] = block[8]
-    else: # Note
-        d['type'] = "Note"
-        d['note'] = note_map_rev.get(block[2], block[2])
-        
-    d['raw_bytes'] = ' '.join(f'{b:02X}' for b in block)
-    return d
+    return {**PAD_LAYOUT.decode(block), 'raw_bytes': ' '.join(f'{b:02X}' for b in block)}
 
 def edit_pad(block, args):
-    if args.type:
-        block[0] = {"Note": 0x00, "ProgramChange": 0x01, "ProgramBank": 0x02}[args.type]
-
-    if args.channel: block[1] = channel_map[args.channel]
-    if args.midi_to_din: block[3] = 1 if args.midi_to_din == "On" else 0
-    if args.mode: block[4] = 1 if args.mode == "Toggle" else 0
-    if args.aftertouch: block[5] = {"Off":0, "Channel":1, "Poly":2}[args.aftertouch]
-    if args.off_color: block[9] = color_map_rev[args.off_color]
-    if args.on_color: block[10] = color_map_rev[args.on_color]
-
-    current_type = block[0]
-    if current_type == 0x00 and args.note:
-        block[2] = note_map[args.note]
-    elif current_type == 0x01 and args.program is not None:
-        block[2] = args.program
-    elif current_type == 0x02:
-        if args.program is not None: block[6] = args.program
-        if args.msb is not None: block[7] = args.msb
-        if args.lsb is not None: block[8] = args.lsb
-        
+    fields = {"type": args.type, "channel": args.channel, "midi_to_din": args.midi_to_din, "mode": args.mode,
+              "aftertouch": args.aftertouch, "off_color": args.off_color, "on_color": args.on_color,
+              "note": args.note, "program": args.program, "msb": args.msb, "lsb": args.lsb}
+    PAD_LAYOUT.encode(block, {k: v for k, v in fields.items() if v is not None})
     return block
 
 def main():
@@ -96,7 +32,7 @@ def main():
     parser.add_argument("--set-pad", type=int, help="Modify pad index (1-64)")
     parser.add_argument("--debug", action="store_true", help="Show raw byte values for pads")
     
-    parser.add_argument("--type", choices=["Note", "ProgramChange", "ProgramBank"], help="Set the pad's function")
+    parser.add_argument("--type", choices=pad_type_map.values(), help="Set the pad's function")
     parser.add_argument("--channel", choices=channel_map.keys(), help="Set MIDI channel")
     parser.add_argument("--note", choices=note_map.keys(), help="Set Note (for Type=Note)")
     parser.add_argument("--mode", choices=["Momentary", "Toggle"], help="Set pad mode")
@@ -111,8 +47,7 @@ def main():
     args = parser.parse_args()
 
     try:
-        msgs = mido.read_syx_file(args.import_file)
-        payload = list(msgs[0].data)
+        payload = bytearray(read_syx(args.import_file)[0])
     except (FileNotFoundError, IndexError):
         print(f"Error: Could not read SysEx file from {args.import_file}")
         return
@@ -133,14 +68,12 @@ def main():
         print_pad_details(args.get_pad, parse_pad(get_pad_block(payload, args.get_pad)))
 
     if args.set_pad:
-        block = get_pad_block(payload, args.set_pad)
-        modified_block = edit_pad(block, args)
-        set_pad_block(payload, args.set_pad, modified_block)
+        modified_block = edit_pad(get_pad_block(payload, args.set_pad), args)
         print("Modified Pad -> ", end='')
         print_pad_details(args.set_pad, parse_pad(modified_block))
 
     if args.export_file:
-        mido.write_syx_file(args.export_file, [mido.Message('sysex', data=payload)])
+        write_syx(args.export_file, [payload])
         print(f"Exported to {args.export_file}")
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Indexes folders of .syx presets and searches them (see mpk2_library.py).
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_library import PresetLibrary, CONTROL_COLUMNS, FILE_COLUMNS
+
+def main():
+    parser = argparse.ArgumentParser(description="MPK2 preset library: index and search .syx files")
+    parser.add_argument("--db", default="mpk2_library.db", help="Index file (default: mpk2_library.db)")
+    parser.add_argument("--scan", nargs="+", metavar="FOLDER", help="Index (or re-index) these folders")
+    parser.add_argument("--where", nargs="+", metavar="KEY=VALUE", default=[],
+                        help=f"Filters, e.g. kind=pad note=C2 channel=USBA10. Keys: {', '.join(CONTROL_COLUMNS + FILE_COLUMNS)}")
+    parser.add_argument("--presets", action="store_true", help="List matching presets instead of matching controls")
+    parser.add_argument("--duplicates", action="store_true", help="List files with identical content")
+    args = parser.parse_args()
+
+    lib = PresetLibrary(args.db)
+    for folder in args.scan or []:
+        start = time.perf_counter(); stats = lib.rescan(folder)
+        print(f"{folder}: {stats['added']} added, {stats['updated']} updated, {stats['removed']} removed, "
+              f"{stats['unchanged']} unchanged ({time.perf_counter() - start:.2f}s)")
+
+    if args.where or args.presets:
+        filters = dict(w.split("=", 1) for w in args.where)
+        for key in ("idx", "cc", "program", "number"):
+            if key in filters: filters[key] = int(filters[key])
+        start = time.perf_counter()
+        rows = lib.presets(**filters) if args.presets else lib.find(**filters)
+        elapsed = (time.perf_counter() - start) * 1000
+        for row in rows:
+            if args.presets: print(f"{row[1]} #{row[2] + 1:02d} {row[3]:8s}  {row[0]}" if row[1] else f"(not a preset)  {row[0]}")
+            else: print(f"{row[3]:6s} {row[4]:2d}  #{row[2] + 1:02d} {row[1]:8s}  {row[0]}")
+        print(f"{len(rows)} match(es) in {elapsed:.1f} ms")
+
+    if args.duplicates:
+        for paths in lib.duplicates(): print("\n  ".join(["Same content:"] + paths))
+    lib.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Plays gestures through a preset without the keyboard and writes or sends the MIDI it would produce (see mpk2_simulator.py).
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_preset import MPK2Preset
+from mpk2_simulator import ControllerSimulator, write_midi_file, write_raw, play, open_virtual_output
+
+def main():
+    parser = argparse.ArgumentParser(description="MPK2 controller simulator: render gestures into MIDI")
+    parser.add_argument("preset", help="Preset .syx file the simulated keyboard is using")
+    parser.add_argument("gestures", nargs="*", help="Gestures, e.g. 'sweep fader 3 over 200 ms' 'hit pads 1-16 at 120 bpm'")
+    parser.add_argument("--script", help="File with one gesture per line")
+    parser.add_argument("--repeat", type=int, default=1, help="Play the gestures this many times")
+    parser.add_argument("--common-channel", type=int, default=1, help="MIDI channel (1-16) of controls set to Common")
+    parser.add_argument("--output", help="Write a .mid file (or a raw MIDI capture for any other extension)")
+    parser.add_argument("--port", help="Send to this existing MIDI output port")
+    parser.add_argument("--virtual", nargs="?", const="MPK249 Simulator", help="Send to a new virtual port (macOS/Linux)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed for ports: 1 real time, 0 as fast as possible")
+    args = parser.parse_args()
+
+    preset = MPK2Preset(args.preset)
+    if not preset.sysex_data: parser.error(f"cannot read {args.preset}")
+    script = "\n".join(args.gestures)
+    if args.script:
+        with open(args.script) as f: script += "\n" + f.read()
+    if not script.strip(): parser.error("no gestures given")
+
+    sim = ControllerSimulator(preset, common_channel=args.common_channel - 1)
+    start = time.perf_counter()
+    try:
+        for _ in range(args.repeat): sim.run_script(script)
+    except ValueError as e: parser.error(str(e))
+    print(f"{len(sim.events)} messages over {sim.time:.2f}s rendered in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if args.output:
+        (write_midi_file if args.output.lower().endswith((".mid", ".midi")) else write_raw)(args.output, sim.events)
+        print(f"Written to {args.output}")
+    if args.port or args.virtual:
+        if args.virtual: midi_out = open_virtual_output(args.virtual); time.sleep(0.5) # let the DAW see the new port
+        else:
+            from mpk2_midi import MidiPorts
+            ports = MidiPorts(); name = ports.find("out", args.port)
+            if name is None: parser.error(f"output port '{args.port}' not found")
+            midi_out = ports.output(name)
+        sent, seconds = play(sim.events, midi_out, args.speed)
+        print(f"Sent {sent} messages in {seconds:.2f}s ({sent / max(seconds, 1e-9):.0f} msg/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Runs an emulated MPK2 behind rtmidi virtual ports, so the GUIs and scripts can get/send presets without the keyboard (see mpk2_virtual.py).
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mpk2_preset import MODEL_IDS
+from mpk2_virtual import VirtualMPK, DIN_BANDWIDTH
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtual MPK2 device on rtmidi virtual ports (Linux/macOS)")
+    parser.add_argument("presets", nargs="*", help=".syx files to load into the slots (each dump goes to the slot of its preset number)")
+    parser.add_argument("--model", choices=sorted(MODEL_IDS.values()), default="MPK249", help="Model to emulate")
+    parser.add_argument("--latency", type=float, default=0.0, help="Milliseconds before the device acts on a message")
+    parser.add_argument("--bandwidth", type=float, help="Link speed in bytes/sec (default: unlimited)")
+    parser.add_argument("--din", action="store_true", help=f"Limit the link to MIDI cable speed ({DIN_BANDWIDTH} bytes/sec)")
+    parser.add_argument("--save", help="On exit, write all slots to this .syx file")
+    args = parser.parse_args()
+
+    model = next(m for m, name in MODEL_IDS.items() if name == args.model)
+    device = VirtualMPK(model, latency=args.latency / 1000, bandwidth=DIN_BANDWIDTH if args.din else args.bandwidth)
+    for path in args.presets: print(f"{path}: slots {', '.join(str(n + 1) for n in device.load(path)) or 'none'}")
+    device.open_virtual_ports()
+    print(f"{device.name} ready on {', '.join(device.in_ports)} / {device.out_ports[device.SYSEX_PORT]}. Ctrl-C to stop.")
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt: pass
+    finally:
+        device.close()
+        print(", ".join(f"{k} {v}" for k, v in device.stats().items()))
+        if args.save: device.save(args.save); print(f"Slots written to {args.save}")
+
+if __name__ == "__main__":
+    main()
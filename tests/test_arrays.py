@@ -0,0 +1,38 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+import mpk2_arrays
+from mpk2_preset import MPK2Preset, PAD_LAYOUT
+from mpk2_virtual import blank_dump
+
+def preset_with_pads(**types):
+    preset = MPK2Preset(data=blank_dump())
+    for index, pad_type in types.items(): preset.sysex_data[PAD_LAYOUT.block_offset(int(index[1:]))] = pad_type
+    for i in range(1, 65): preset.sysex_data[PAD_LAYOUT.block_offset(i) + 2] = 60
+    return preset
+
+def test_transpose_moves_every_pad_decoded_as_note():
+    preset = preset_with_pads(p2=1, p3=2, p4=7) # pad 4 has an unknown type byte: it decodes as Note
+    pads = mpk2_arrays.pads(preset)
+    assert mpk2_arrays.transpose_notes(pads, 12) == 62
+    assert preset.get_pad(4)["type"] == "Note" and preset.get_pad(4)["note"] == "C5"
+    assert preset.get_pad(2)["program"] == 60 and pads["number"][2] == 60
+
+def test_transpose_clamps():
+    pads = mpk2_arrays.pads(preset_with_pads())
+    mpk2_arrays.transpose_notes(pads, 100)
+    assert set(pads["number"]) == {127}
+
+def test_bank_views_share_memory():
+    preset = MPK2Preset(data=blank_dump())
+    mpk2_arrays.bank(mpk2_arrays.knobs(preset), "B")["cc"] = 30
+    assert [preset.get_knob(i)["cc"] for i in (8, 9, 16, 17)] == [0, 30, 30, 0]
+
+def test_unstack_touches_the_presets(monkeypatch):
+    monkeypatch.setattr(MPK2Preset, "CACHE_DECODED", True)
+    presets = [MPK2Preset(data=blank_dump(number=n)) for n in range(3)]
+    for preset in presets: preset.get_fader(1)
+    stacked = mpk2_arrays.stack(presets, "faders")
+    stacked["cc"][:, 0] = [10, 11, 12]
+    mpk2_arrays.unstack(stacked, presets, "faders")
+    assert [preset.get_fader(1)["cc"] for preset in presets] == [10, 11, 12]
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from mpk2_conflicts import cc_collisions
+from mpk2_edits import parse_edits
+from mpk2_preset import MPK2Preset, daw_names
+from mpk2_virtual import blank_dump
+
+BATCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "mpk2_batch.py")
+
+def batch(*args):
+    return subprocess.run([sys.executable, BATCH, "--workers", "1", *args], capture_output=True, text=True)
+
+def write_preset(path, number=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f: f.write(blank_dump(number=number))
+
+def knob_min(path):
+    return MPK2Preset(path).get_knob(1)["min"]
+
+# --- edit specs ---
+def test_unknown_field_is_rejected():
+    with pytest.raises(ValueError, match="minn"): parse_edits("knobs 1-8 minn=5")
+
+def test_typed_fields_are_accepted():
+    assert parse_edits("switches 1 type=Note note=C3") == [("switch", [1], {"type": "Note", "note": "C3"})]
+
+def test_batch_refuses_bad_spec_before_editing(tmp_path):
+    write_preset(str(tmp_path / "a.syx"))
+    result = batch(str(tmp_path), "--set", "knobs 1-8 minn=5")
+    assert result.returncode == 2 and "minn" in result.stderr
+
+# --- output paths ---
+def test_output_keeps_folder_layout(tmp_path):
+    for rig in ("rig1", "rig2"): write_preset(str(tmp_path / "in" / rig / "lead.syx"))
+    result = batch(str(tmp_path / "in"), "--set", "knobs 1 min=5", "--output", str(tmp_path / "out"))
+    assert result.returncode == 0, result.stderr
+    assert "2/2 preset(s) edited" in result.stdout
+    assert [knob_min(str(tmp_path / "out" / rig / "lead.syx")) for rig in ("rig1", "rig2")] == [5, 5]
+    assert knob_min(str(tmp_path / "in" / "rig1" / "lead.syx")) == 0
+
+def test_output_refuses_same_name_from_two_inputs(tmp_path):
+    for rig in ("rig1", "rig2"): write_preset(str(tmp_path / rig / "lead.syx"))
+    result = batch(str(tmp_path / "rig1" / "lead.syx"), str(tmp_path / "rig2" / "lead.syx"),
+                   "--set", "knobs 1 min=5", "--output", str(tmp_path / "out"))
+    assert result.returncode == 2 and "same place" in result.stderr
+    assert not os.path.exists(tmp_path / "out")
+
+def test_unchanged_files_are_reported(tmp_path):
+    write_preset(str(tmp_path / "a.syx"))
+    result = batch(str(tmp_path), "--set", "knobs 1 min=0")
+    assert "0/1 preset(s) edited, 1 unchanged" in result.stdout
+
+# --- --fix-cc ---
+def colliding_preset(path):
+    preset = MPK2Preset(data=blank_dump())
+    for i in (1, 2, 3): preset.set_knob(i, type="MIDI_CC", channel="USBA1", cc=20)
+    for i, name in enumerate(daw_names): preset.set_daw(name, type="CC", channel="USBA2", cc=90 + i)
+    preset.save_to_file(path)
+
+def test_fix_cc_moves_unpinned_controls(tmp_path):
+    colliding_preset(str(tmp_path / "a.syx"))
+    result = batch(str(tmp_path), "--fix-cc")
+    assert "Unresolved" not in result.stdout
+    preset = MPK2Preset(str(tmp_path / "a.syx"))
+    assert len({preset.get_knob(i)["cc"] for i in (1, 2, 3)}) == 3 and not cc_collisions(preset.sysex_data)
+
+def test_fix_cc_reports_pinned_collisions(tmp_path):
+    colliding_preset(str(tmp_path / "a.syx"))
+    result = batch(str(tmp_path), "--fix-cc", "--pin", "knobs 1-2")
+    assert "Unresolved in" in result.stdout and "CC 20 on USBA1: knob 1, knob 2" in result.stdout
+    preset = MPK2Preset(str(tmp_path / "a.syx"))
+    assert [key for key, controls in cc_collisions(preset.sysex_data)] == [(1, "cc", 20)]
+    assert preset.get_knob(3)["cc"] != 20
@@ -0,0 +1,55 @@
+import pytest
+
+from mpk2_conflicts import ControlIndex, describe, index_files, live_index, parse_cc_ranges, solve_cc
+from mpk2_preset import MPK2Preset, PAD_LAYOUT
+from mpk2_virtual import blank_dump
+
+def rig():
+    preset = MPK2Preset(data=blank_dump())
+    preset.set_knob(5, type="MIDI_CC", channel="USBA3", cc=74)
+    preset.set_switch(12, type="CC", channel="USBA3", cc=74)
+    preset.set_fader(1, type="AFTERTOUCH", channel="USBA3", cc=74) # aftertouch sends no CC number
+    preset.set_pad(1, channel="USBA10", note="C2"); preset.set_pad(2, channel="USBA10", note="C2")
+    preset.set_pad(3, type="ProgramChange", channel="USBB1", program=7)
+    return preset
+
+# --- ControlIndex ---
+def test_lookup_by_names_or_bytes():
+    index = ControlIndex(); index.add_preset(rig())
+    assert index.lookup("USBA3", "cc", 74) == index.lookup(3, "cc", 74) == [(None, "knob", 5), (None, "switch", 12)]
+    assert index.lookup("USBA10", "note", "C2") == index.lookup("USBA10", "note", 36) == [(None, "pad", 1), (None, "pad", 2)]
+    assert index.lookup("USBB1", "program", 7) == [(None, "pad", 3)] and index.lookup("USBA3", "cc", 75) == []
+
+def test_unknown_pad_type_counts_as_note():
+    preset = MPK2Preset(data=blank_dump()); preset.set_pad(4, channel="USBA2", note="D1")
+    preset.sysex_data[PAD_LAYOUT.block_offset(4)] = 9
+    index = ControlIndex(); index.add_preset(preset)
+    assert index.lookup("USBA2", "note", "D1") == [(None, "pad", 4)]
+
+def test_collisions_stay_within_one_preset(tmp_path):
+    a = rig(); a.save_to_file(str(tmp_path / "a.syx"))
+    b = MPK2Preset(data=blank_dump()); b.set_knob(1, channel="USBA3", cc=74); b.save_to_file(str(tmp_path / "b.syx"))
+    index = index_files([str(tmp_path / "a.syx"), str(tmp_path / "b.syx")])
+    found = [(describe(key), source.rsplit("/", 1)[1], controls) for key, source, controls in index.collisions()]
+    assert ("CC 74 on USBA3", "a.syx", [("knob", 5), ("switch", 12)]) in found
+    assert ("note C2 on USBA10", "a.syx", [("pad", 1), ("pad", 2)]) in found
+    assert not any(source == "b.syx" and text == "CC 74 on USBA3" for text, source, _ in found) # one knob there
+    assert len(index.lookup("USBA3", "cc", 74)) == 3
+
+def test_live_index_splits_usb_ports():
+    data = rig().sysex_data
+    assert live_index(data, "A")[0xB0, 2, 74] == [("knob", 5), ("switch", 12)]
+    assert (0xC0, 0, 7) not in live_index(data, "A") and live_index(data, "B")[0xC0, 0, 7] == [("pad", 3)]
+    assert live_index(data, "A", common_channel=9)[0xB0, 9, 0] # blank knobs are on Common, CC 0
+
+# --- CC solver ---
+def test_solve_cc_moves_the_fewest_controls():
+    preset = rig()
+    preset.set_knob(6, channel="USBA3", cc=75)
+    moves = solve_cc(preset.sysex_data, pinned={("switch", 12)}, reserved=parse_cc_ranges("73")) # blank controls share CC 0
+    assert [move for move in moves if move[2] != 0] == [("knob", 5, 74, 72)] # 73 reserved, 75 taken: 72 and 76 tie
+    assert len(moves) == len({(kind, index) for kind, index, old, new in moves})
+
+def test_parse_cc_ranges_checks_bounds():
+    assert parse_cc_ranges("0-2,127") == {0, 1, 2, 127}
+    with pytest.raises(ValueError): parse_cc_ranges("120-130")
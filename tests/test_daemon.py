@@ -0,0 +1,59 @@
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+import mpk2_daemon
+from mpk2_daemon import DaemonClient, PresetDaemon
+from mpk2_virtual import blank_dump
+
+@pytest.fixture
+def preset_file(tmp_path):
+    path = tmp_path / "a.syx"; path.write_bytes(blank_dump())
+    return str(path)
+
+# --- rpc_set ---
+def test_set_writes_known_fields(preset_file):
+    daemon = PresetDaemon()
+    assert daemon.call("set", {"path": preset_file, "kind": "knob", "index": 2, "values": {"cc": 74}})["cc"] == 74
+    assert daemon.call("load", {"path": preset_file})["dirty"]
+
+def test_set_rejects_unknown_fields(preset_file):
+    daemon = PresetDaemon()
+    with pytest.raises(ValueError, match="minn"):
+        daemon.call("set", {"path": preset_file, "kind": "knob", "index": 2, "values": {"minn": 5, "cc": 74}})
+    assert daemon.call("get", {"path": preset_file, "kind": "knob", "index": 2})["cc"] == 0
+    assert not daemon.call("load", {"path": preset_file})["dirty"]
+
+# --- rpc_save / socket ---
+def test_save_only_writes_syx_files(preset_file, tmp_path):
+    daemon = PresetDaemon()
+    for output in (tmp_path / "notes.txt", tmp_path / "profile"):
+        with pytest.raises(ValueError, match=".syx"): daemon.call("save", {"path": preset_file, "output": str(output)})
+        assert not output.exists()
+    (tmp_path / "link.syx").symlink_to(tmp_path / "notes.txt")
+    with pytest.raises(ValueError, match="symlink"): daemon.call("save", {"path": preset_file, "output": str(tmp_path / "link.syx")})
+    assert daemon.call("save", {"path": preset_file, "output": str(tmp_path / "copy.syx")}) == str(tmp_path / "copy.syx")
+
+def test_socket_is_private(tmp_path):
+    socket_path = str(tmp_path / "d.sock"); daemon = PresetDaemon()
+    thread = threading.Thread(target=daemon.serve, args=(socket_path,)); thread.start()
+    for _ in range(500):
+        if os.path.exists(socket_path): break
+        time.sleep(0.01)
+    client = DaemonClient(socket_path)
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        assert client.call("ping") == "pong"
+        with pytest.raises(RuntimeError, match="Unknown method"): client.call("nope")
+    finally:
+        client.call("shutdown"); client.close(); thread.join(5)
+    assert not os.path.exists(socket_path)
+
+def test_private_dir_refuses_shared_folders(tmp_path):
+    mpk2_daemon._private_dir(str(tmp_path / "own"))
+    assert stat.S_IMODE(os.stat(tmp_path / "own").st_mode) == 0o700
+    os.chmod(tmp_path / "own", 0o777)
+    with pytest.raises(PermissionError): mpk2_daemon._private_dir(str(tmp_path / "own"))
@@ -0,0 +1,52 @@
+import io
+import struct
+
+from mpk2_extract import MAX_FRAME, extract_presets, extract_to_directory, iter_raw_frames, iter_smf_frames
+from mpk2_sysex import SysexStream
+from mpk2_virtual import blank_dump
+
+DUMP = bytes(blank_dump(number=5))
+
+def varlen(value):
+    out = [value & 0x7F]; value >>= 7
+    while value: out.append((value & 0x7F) | 0x80); value >>= 7
+    return bytes(reversed(out))
+
+def smf(*events):
+    """Format 0 file with one track; events are raw bytes, each after a zero delta time."""
+    track = b"".join(b"\x00" + event for event in events) + b"\x00\xFF\x2F\x00"
+    return io.BytesIO(b"MThd" + struct.pack(">IHHH", 6, 0, 1, 960) + b"MTrk" + struct.pack(">I", len(track)) + track)
+
+def sysex(status, data): return bytes([status]) + varlen(len(data)) + data
+
+# --- Standard MIDI Files ---
+def test_smf_joins_split_sysex():
+    f = smf(b"\xFF\x51\x03\x07\xA1\x20", b"\x90\x3C\x40", b"\x3E\x40", # tempo, note on, running status
+            sysex(0xF0, DUMP[1:600]), b"\xC0\x05", sysex(0xF7, DUMP[600:1200]), sysex(0xF7, DUMP[1200:]),
+            sysex(0xF0, DUMP[1:]))
+    assert list(iter_smf_frames(f)) == [DUMP, DUMP]
+
+def test_smf_ignores_escapes_and_oversized_sysex():
+    f = smf(sysex(0xF7, b"\xF8\xFA"), sysex(0xF0, bytes(MAX_FRAME)), sysex(0xF7, b"\xF7"), sysex(0xF0, DUMP[1:]))
+    assert list(iter_smf_frames(f)) == [DUMP]
+
+# --- raw captures ---
+def test_raw_capture_drops_realtime_and_interrupted_frames():
+    capture = (b"\xF8" + DUMP[:300] + b"\xF8\xFE" + DUMP[300:] + # clock bytes inside the dump are removed
+               DUMP[:100] + b"\x90\x3C\x40" + DUMP)                 # a note interrupts a dump: it is dropped
+    stream = SysexStream(raw=True)
+    assert [frame for i in range(0, len(capture), 97) for frame in stream.feed(capture[i:i + 97])] == [DUMP, DUMP]
+    assert stream.dropped == 1
+    assert list(iter_raw_frames(io.BytesIO(capture), chunk_size=13)) == [DUMP, DUMP]
+
+def test_raw_capture_gives_up_on_a_lost_f7():
+    stream, short = SysexStream(max_length=100), b"\xF0\x01\xF7"
+    assert stream.feed(DUMP[:-1] + short) == [] and stream.dropped == 1 # the frame ran into the next one's F7
+    assert stream.feed(short) == [short]
+
+def test_extract_to_directory_numbers_dumps(tmp_path):
+    other = bytearray(blank_dump(number=2)); other[8:16] = b"OTHER   "
+    (tmp_path / "cap.bin").write_bytes(DUMP + b"\xF0\x7E\x7F\x06\x01\xF7" + bytes(other) + DUMP)
+    assert [p.get_preset_number() for p in extract_presets(str(tmp_path / "cap.bin"))] == [5, 2, 5]
+    paths = extract_to_directory(str(tmp_path / "cap.bin"), str(tmp_path / "out"))
+    assert [p.rsplit("/", 1)[1][:5] for p in paths] == ["00001", "00002", "00003"] and "OTHER" in paths[1]
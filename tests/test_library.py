@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from mpk2_library import PresetLibrary
+from mpk2_preset import MPK2Preset
+from mpk2_virtual import blank_dump
+
+@pytest.fixture
+def library(tmp_path):
+    library = PresetLibrary(str(tmp_path / "lib.db"))
+    yield library
+    library.close()
+
+def write(path, number=0, **pad1):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    preset = MPK2Preset(data=blank_dump(number=number))
+    if pad1: preset.set_pad(1, **pad1)
+    preset.save_to_file(str(path))
+
+def test_rescan_reads_only_new_and_changed_files(library, tmp_path):
+    root = tmp_path / "presets"
+    write(root / "a.syx", note="C2", channel="USBA10"); write(root / "rig" / "b.syx", number=1)
+    (root / "notes.syx").write_bytes(b"not a dump")
+    assert library.rescan(str(root)) == {"added": 3, "updated": 0, "removed": 0, "unchanged": 0}
+    assert library.rescan(str(root)) == {"added": 0, "updated": 0, "removed": 0, "unchanged": 3}
+    write(root / "rig" / "b.syx", number=1, note="C2", channel="USBA10")
+    st = os.stat(root / "rig" / "b.syx"); os.utime(root / "rig" / "b.syx", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    os.remove(root / "notes.syx")
+    assert library.rescan(str(root)) == {"added": 0, "updated": 1, "removed": 1, "unchanged": 1}
+    assert [(os.path.basename(path), kind, idx) for path, name, number, kind, idx in library.find(kind="pad", note="C2", channel="USBA10")] \
+        == [("a.syx", "pad", 1), ("b.syx", "pad", 1)]
+
+def test_rescan_leaves_other_roots_alone(library, tmp_path):
+    write(tmp_path / "one" / "a.syx"); write(tmp_path / "one2" / "a.syx")
+    library.rescan(str(tmp_path / "one")); library.rescan(str(tmp_path / "one2"))
+    os.remove(tmp_path / "one" / "a.syx")
+    assert library.rescan(str(tmp_path / "one"))["removed"] == 1
+    assert [os.path.basename(os.path.dirname(p)) for p, *_ in library.presets()] == ["one2"]
+
+def test_duplicates_and_file_filters(library, tmp_path):
+    write(tmp_path / "a.syx", number=4); write(tmp_path / "copy.syx", number=4); write(tmp_path / "b.syx", number=5)
+    library.rescan(str(tmp_path))
+    assert [sorted(map(os.path.basename, group)) for group in library.duplicates()] == [["a.syx", "copy.syx"]]
+    assert [os.path.basename(p) for p, *_ in library.presets(number=5)] == ["b.syx"]
+    with pytest.raises(KeyError): library.find(colour="Red")
@@ -0,0 +1,41 @@
+import pytest
+
+from mpk2_merge import merge, merge_data, merge_files
+from mpk2_preset import MPK2Preset, PRESET_MIN_SIZE
+from mpk2_virtual import blank_dump
+
+def three(ours_edit, theirs_edit):
+    base = MPK2Preset(data=blank_dump()); ours = MPK2Preset(data=blank_dump()); theirs = MPK2Preset(data=blank_dump())
+    ours_edit(ours); theirs_edit(theirs)
+    return base, ours, theirs
+
+def test_one_sided_changes_are_combined():
+    base, ours, theirs = three(lambda p: p.set_knob(1, cc=20), lambda p: (p.set_knob(2, cc=30), p.set_preset_name("THEIRS")))
+    merged, conflicts = merge(base, ours, theirs)
+    assert conflicts == [] and [merged.get_knob(i)["cc"] for i in (1, 2)] == [20, 30] and merged.get_preset_name() == "THEIRS"
+
+def test_same_change_on_both_sides_is_not_a_conflict():
+    base, ours, theirs = three(lambda p: p.set_pad(5, note="C3"), lambda p: p.set_pad(5, note="C3"))
+    assert merge(base, ours, theirs)[1] == []
+
+@pytest.mark.parametrize("prefer, cc", [("ours", 20), ("theirs", 40)])
+def test_conflicts_resolve_to_the_preferred_side(prefer, cc):
+    base, ours, theirs = three(lambda p: (p.set_knob(1, cc=20), p.set_knob(3, cc=5)), lambda p: p.set_knob(1, cc=40))
+    merged, conflicts = merge(base, ours, theirs, prefer=prefer)
+    assert conflicts == [("knob", 1)] and merged.get_knob(1)["cc"] == cc and merged.get_knob(3)["cc"] == 5
+
+def test_bytes_outside_the_blocks_merge_one_by_one():
+    base, ours, theirs = bytearray(blank_dump()), bytearray(blank_dump()), bytearray(blank_dump())
+    ours[4] = 1; theirs[5] = 2; ours[6] = 3; theirs[6] = 4 # header bytes before the name
+    merged, conflicts = merge_data(base, ours, theirs)
+    assert (merged[4], merged[5], merged[6]) == (1, 2, 3) and conflicts == [("byte", 6)]
+
+def test_different_lengths_are_refused():
+    with pytest.raises(ValueError): merge_data(blank_dump(), blank_dump(), blank_dump()[:PRESET_MIN_SIZE])
+
+def test_merge_files_writes_the_result(tmp_path):
+    base, ours, theirs = three(lambda p: p.set_fader(1, cc=9), lambda p: p.set_fader(1, cc=10))
+    for name, preset in (("base", base), ("ours", ours), ("theirs", theirs)): preset.save_to_file(str(tmp_path / f"{name}.syx"))
+    paths = [str(tmp_path / f"{name}.syx") for name in ("base", "ours", "theirs")]
+    assert merge_files(*paths, str(tmp_path / "out.syx"), prefer="theirs") == [("fader", 1)]
+    assert MPK2Preset(str(tmp_path / "out.syx")).get_fader(1)["cc"] == 10
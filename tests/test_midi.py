@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from mpk2_midi import MidiPorts, PresetFetcher, SysexSender, dump_request
+from mpk2_preset import PRESET_COUNT
+from mpk2_virtual import VirtualMPK
+
+@pytest.fixture
+def device():
+    with VirtualMPK() as device: yield device
+
+@pytest.fixture
+def ports(device):
+    ports = MidiPorts(backend=device.backend)
+    yield ports
+    ports.close()
+
+# --- PresetFetcher ---
+def test_fetcher_gets_every_slot(device, ports):
+    presets = PresetFetcher(ports, *ports.find_mpk()).start().wait(5)
+    assert sorted(presets) == list(range(PRESET_COUNT))
+    assert all(bytes(presets[n].sysex_data) == bytes(device.slots[n]) for n in presets)
+
+def test_fetcher_reports_every_result_before_done(ports, monkeypatch):
+    # A slow completion used to let _run finish first: the future got cancelled and on_result never fired
+    finish = PresetFetcher._finish
+    monkeypatch.setattr(PresetFetcher, "_finish", lambda self, *a: (time.sleep(0.002), finish(self, *a)))
+    results, done = [], []
+    fetcher = PresetFetcher(ports, *ports.find_mpk(), on_result=lambda n, p, e: results.append((n, e)),
+                            on_done=lambda presets: done.append(sorted(presets))).start()
+    fetcher.wait(10)
+    assert sorted(results) == [(n, None) for n in range(PRESET_COUNT)]
+    assert done == [list(range(PRESET_COUNT))]
+    assert not any(f.cancelled() for f in fetcher.futures.values())
+
+def test_fetcher_retries_lost_replies():
+    with VirtualMPK(loss=0.3, seed=1) as device:
+        ports = MidiPorts(backend=device.backend)
+        presets = PresetFetcher(ports, *ports.find_mpk(), timeout=0.05, retries=10).start().wait(10)
+        assert len(presets) == PRESET_COUNT and device.lost
+
+def test_fetcher_times_out_unanswered_numbers(ports):
+    fetcher = PresetFetcher(ports, *ports.find_mpk(), timeout=0.02, retries=1).start([0, PRESET_COUNT])
+    presets = fetcher.wait(5)
+    assert list(presets) == [0]
+    with pytest.raises(TimeoutError): fetcher.futures[PRESET_COUNT].result(0)
+
+# --- SysexSender / MidiPorts.send ---
+def test_sender_writes_whole_frames(device, ports):
+    data = bytearray(device.slots[4]); data[8:16] = b"WRITTEN!"
+    sender = SysexSender(ports, ports.find_mpk()[1])
+    sender.send(memoryview(data))
+    assert device.wait_idle(5)
+    assert device.writes == 1 and bytes(device.slots[4]) == bytes(data)
+    assert sender.stats()["messages"] == 1 and sender.bytes == len(data)
+
+def test_sender_paces_to_max_rate(device, ports):
+    sender = SysexSender(ports, ports.find_mpk()[1], max_rate=len(device.slots[0]) * 20) # 50 ms a dump
+    seconds = sender.send_all([bytes(device.slots[n]) for n in range(3)])
+    assert seconds >= 0.14 and sender.rate <= sender.max_rate * 1.01
+
+def test_send_does_not_retry_malformed_messages(device, ports):
+    out_name = ports.find_mpk()[1]
+    handle = ports.output(out_name)
+    with pytest.raises(ValueError): ports.send(out_name, bytes(device.slots[0][100:200])) # a mid-frame slice
+    assert ports.output(out_name) is handle and handle.is_port_open() # not mistaken for a hot-plug
+
+def test_send_reopens_after_replug(device, ports):
+    out_name = ports.find_mpk()[1]
+    ports.send(out_name, dump_request(0))
+    device.unplug(); device.plug()
+    handle = ports.output(out_name); handle.close_port() # what a vanished port leaves behind
+    ports.send(out_name, dump_request(1))
+    assert device.wait_idle(5) and device.requests == 2
@@ -0,0 +1,42 @@
+import threading
+
+from mpk2_conflicts import live_index
+from mpk2_midi import ControlMonitor, MidiPorts
+from mpk2_preset import MPK2Preset
+from mpk2_simulator import ControllerSimulator, play
+from mpk2_virtual import VirtualMPK, blank_dump
+
+def rig():
+    preset = MPK2Preset(data=blank_dump())
+    preset.set_pad(1, channel="USBA1", note="C2"); preset.set_knob(3, type="MIDI_CC", channel="USBA2", cc=21, min=0, max=127)
+    preset.set_fader(1, type="MIDI_CC", channel="USBA2", cc=7, min=0, max=127)
+    return preset
+
+def monitor(device, preset):
+    ports = MidiPorts(backend=device.backend); activity = threading.Event()
+    return ControlMonitor(ports.input(ports.find_mpk_play()), live_index(preset.sysex_data), activity.set).start(), activity
+
+def test_monitor_reports_played_controls_once_per_drain():
+    preset = rig()
+    with VirtualMPK() as device:
+        mon, activity = monitor(device, preset)
+        sim = ControllerSimulator(preset); sim.run_script("hit pads 1 at 600 bpm; sweep fader 1 over 10 ms; turn knob 3 +5")
+        play(sim.events, device.keyboard, speed=0)
+        assert device.wait_idle(5) and activity.wait(5)
+        assert mon.drain() == {("pad", 1), ("fader", 1), ("knob", 3)} and mon.messages == len(sim.events)
+        assert mon.drain() == set()
+        mon.stop()
+
+def test_replacing_the_index_follows_the_preset():
+    preset = rig()
+    with VirtualMPK() as device:
+        mon, activity = monitor(device, preset)
+        generation = preset.generation
+        preset.set_knob(3, cc=22)
+        assert preset.generation != generation # what the GUIs check before rebuilding the index
+        device.keyboard.send_message([0xB1, 22, 64]); device.wait_idle(5)
+        assert mon.drain() == set() # stale index: CC 22 is not known yet
+        mon.index = live_index(preset.sysex_data)
+        device.keyboard.send_message([0xB1, 22, 64]); device.keyboard.send_message([0x90, 36, 0]) # velocity 0: a note off
+        assert device.wait_idle(5) and activity.wait(5) and mon.drain() == {("knob", 3)}
+        mon.stop()
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+from mpk2_patch import apply_patch_data, apply_patch_file, diff_controls, make_patch, read_patch, write_patch
+from mpk2_preset import MPK2Preset
+from mpk2_virtual import blank_dump
+
+DIFF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "mpk2_diff.py")
+
+def presets():
+    a = MPK2Preset(data=blank_dump())
+    b = MPK2Preset(data=blank_dump(number=4)); b.set_knob(1, cc=74); b.set_pad(16, note="C3")
+    return a, b
+
+def test_diff_lists_changed_controls_only():
+    a, b = presets()
+    assert [(kind, index) for kind, index, _ in diff_controls(a, b)] == [("header", 0), ("knob", 1), ("pad", 16)]
+    assert dict(diff_controls(a, b)[1][2]) == {"cc": (0, 74)}
+
+def test_patch_skips_the_header_unless_asked():
+    a, b = presets()
+    apply_patch_data(make_patch(a, b), a.sysex_data)
+    assert a.get_knob(1)["cc"] == 74 and a.get_pad(16)["note"] == "C3" and a.get_preset_number() == 0
+
+def test_patch_file_round_trip(tmp_path):
+    a, b = presets()
+    patch = make_patch(a, b)
+    write_patch(str(tmp_path / "p.mpkpatch"), patch)
+    assert read_patch(str(tmp_path / "p.mpkpatch")) == patch
+    a.save_to_file(str(tmp_path / "a.syx"))
+    assert apply_patch_file(patch, str(tmp_path / "a.syx"))
+    patched = MPK2Preset(str(tmp_path / "a.syx"))
+    assert patched.get_knob(1)["cc"] == 74 and patched.get_pad(16)["note"] == "C3"
+
+def test_patch_file_leaves_other_files_alone(tmp_path):
+    a, b = presets()
+    path = tmp_path / "notes.syx"; path.write_bytes(b"\xF0\x7E\x00\x06\x01\xF7" + bytes(2000))
+    assert not apply_patch_file(make_patch(a, b), str(path))
+    assert path.read_bytes()[:6] == b"\xF0\x7E\x00\x06\x01\xF7"
+
+def test_patch_file_skips_empty_files(tmp_path):
+    a, b = presets()
+    path = tmp_path / "empty.syx"; path.write_bytes(b"")
+    assert not apply_patch_file(make_patch(a, b), str(path)) and path.read_bytes() == b""
+
+def test_apply_cli_reports_missing_and_empty_files(tmp_path):
+    a, b = presets()
+    write_patch(str(tmp_path / "p.mpkpatch"), make_patch(a, b))
+    a.save_to_file(str(tmp_path / "a.syx")); (tmp_path / "empty.syx").write_bytes(b"")
+    result = subprocess.run([sys.executable, DIFF, "apply", str(tmp_path / "p.mpkpatch"), str(tmp_path / "a.syx"),
+                             str(tmp_path / "empty.syx"), str(tmp_path / "missing.syx")], capture_output=True, text=True)
+    assert result.returncode == 0 and "Traceback" not in result.stderr
+    assert "Skipped" in result.stdout and "missing.syx: No such file" in result.stdout
+    assert "Patched 1/3 file(s)" in result.stdout
+
+def test_apply_cli_reports_a_bad_patch(tmp_path):
+    (tmp_path / "a.syx").write_bytes(blank_dump())
+    result = subprocess.run([sys.executable, DIFF, "apply", str(tmp_path / "none.mpkpatch"), str(tmp_path / "a.syx")],
+                            capture_output=True, text=True)
+    assert result.returncode == 2 and "cannot read patch" in result.stderr and "Traceback" not in result.stderr
@@ -0,0 +1,132 @@
+import pytest
+
+from mpk2_patch import apply_patch_data, make_patch
+from mpk2_preset import MPK2Preset, LAYOUTS, PAD_LAYOUT
+from mpk2_virtual import blank_dump
+
+def edited(**knob):
+    preset = MPK2Preset(data=blank_dump()); preset.set_knob(1, **knob)
+    return preset
+
+@pytest.fixture
+def cached(monkeypatch):
+    monkeypatch.setattr(MPK2Preset, "CACHE_DECODED", True)
+
+# --- decoded control cache ---
+def test_cache_is_off_by_default():
+    assert MPK2Preset.CACHE_DECODED is False
+
+def test_patched_bytes_are_read_back():
+    preset = MPK2Preset(data=blank_dump())
+    assert preset.get_knob(1)["cc"] == 0
+    apply_patch_data(make_patch(preset, edited(cc=74)), preset.sysex_data)
+    assert preset.get_knob(1)["cc"] == 74
+
+def test_array_writes_are_read_back():
+    mpk2_arrays = pytest.importorskip("mpk2_arrays")
+    preset = MPK2Preset(data=blank_dump())
+    preset.get_knob(1)
+    mpk2_arrays.knobs(preset)["cc"][:8] = 20 # no touch()
+    assert [preset.get_knob(i)["cc"] for i in (1, 8, 9)] == [20, 20, 0]
+
+def test_cached_array_writes_need_touch(cached):
+    mpk2_arrays = pytest.importorskip("mpk2_arrays")
+    preset = MPK2Preset(data=blank_dump())
+    preset.get_knob(1)
+    mpk2_arrays.knobs(preset)["cc"][:8] = 20
+    assert preset.get_knob(1)["cc"] == 0 # the documented limit of the opt-in cache
+    mpk2_arrays.touch(preset, "knobs")
+    assert preset.get_knob(1)["cc"] == 20
+
+def test_cache_follows_setters_and_touch_range(cached):
+    preset = MPK2Preset(data=blank_dump())
+    first = preset.get_knob(1)
+    assert preset.get_knob(1) is first
+    preset.set_knob(1, cc=10)
+    assert preset.get_knob(1)["cc"] == 10
+    layout = LAYOUTS["knob"]
+    preset.sysex_data[layout.offset + 2] = 11 # byte 2 of knob 1 is its CC
+    preset.touch_range(layout.offset, layout.offset + layout.size)
+    assert preset.get_knob(1)["cc"] == 11 and preset.get_knob(2) is preset.get_knob(2)
+
+def test_undo_refreshes_cached_controls(cached):
+    preset = MPK2Preset(data=blank_dump())
+    with preset.edit("cc"): preset.set_knob(1, cc=30)
+    assert preset.get_knob(1)["cc"] == 30
+    preset.undo()
+    assert preset.get_knob(1)["cc"] == 0
+
+# --- preset generation ---
+def test_generation_changes_only_on_writes():
+    preset = MPK2Preset(data=blank_dump())
+    seen = [preset.generation]
+    preset.get_knob(1); preset.get_pad(3)
+    assert preset.generation == seen[-1]
+    for write in (lambda: preset.set_pad(3, note="C3"), lambda: preset.touch_range(0, 1 << 12),
+                  lambda: preset.load_from_data(blank_dump())):
+        write()
+        assert preset.generation not in seen
+        seen.append(preset.generation)
+    assert MPK2Preset(data=blank_dump()).generation not in seen
+
+# --- bank operations ---
+def numbered():
+    """Preset whose pad n plays note n and whose knob n sends CC n, so every block can be told apart."""
+    preset = MPK2Preset(data=blank_dump())
+    for i in range(1, 65): preset.sysex_data[PAD_LAYOUT.block_offset(i) + 2] = i
+    for i in range(1, 25): preset.sysex_data[LAYOUTS["knob"].block_offset(i) + 2] = i
+    return preset
+
+def pad_notes(preset): return [preset.sysex_data[PAD_LAYOUT.block_offset(i) + 2] for i in range(1, 65)]
+
+def test_copy_bank_is_byte_exact_across_presets():
+    source, dest = numbered(), MPK2Preset(data=blank_dump())
+    source.sysex_data[PAD_LAYOUT.block_offset(33)] = 7 # unknown type byte: kept as is
+    dest.copy_bank("pad", "C", "A", source=source)
+    assert dest.sysex_data[PAD_LAYOUT.offset:PAD_LAYOUT.offset + 16 * 11] == source.sysex_data[PAD_LAYOUT.block_offset(33):PAD_LAYOUT.block_offset(49)]
+    assert pad_notes(dest)[16:] == [0] * 48
+
+def test_swap_and_permute_banks():
+    preset = numbered()
+    preset.swap_banks("knob", "A", "C")
+    assert [preset.get_knob(i)["cc"] for i in (1, 9, 17)] == [17, 9, 1]
+    preset.permute_banks("pad", "DCBA")
+    assert pad_notes(preset) == list(range(49, 65)) + list(range(33, 49)) + list(range(17, 33)) + list(range(1, 17))
+    with pytest.raises(ValueError): preset.copy_bank("knob", "D", "A")
+
+def test_bank_operations_undo_and_redo(cached):
+    preset = numbered(); original = bytes(preset.sysex_data)
+    preset.get_pad(1)
+    with preset.edit("Reverse pads"): preset.permute_banks("pad", "DCBA")
+    with preset.edit("Clone knobs"): preset.copy_bank("knob", "A", "B")
+    assert preset.get_pad(1)["note"] == "C#3" and preset.get_knob(9)["cc"] == 1
+    assert preset.undo() == "Clone knobs" and preset.undo() == "Reverse pads"
+    assert bytes(preset.sysex_data) == original and preset.get_pad(1)["note"] == "C#-1"
+    assert preset.redo() == "Reverse pads" and preset.get_pad(1)["note"] == "C#3"
+    assert preset.redo_label == "Clone knobs"
+
+# --- per-control generations (what the GUIs compare before redrawing a label) ---
+def generations(preset):
+    return {(kind, i): preset.control_generation(kind, i) for kind, layout in LAYOUTS.items() for i in range(1, layout.count + 1)}
+
+def changed(before, preset):
+    return {key for key, generation in generations(preset).items() if before[key] != generation}
+
+def test_setters_bump_only_their_control():
+    preset = MPK2Preset(data=blank_dump()); before = generations(preset)
+    preset.set_knob(2, cc=5); preset.set_daw("Left", cc=9); preset.get_pad(1)
+    assert changed(before, preset) == {("knob", 2), ("daw", 2)} # Left is the second DAW button
+
+def test_touch_range_bumps_overlapping_controls():
+    preset = MPK2Preset(data=blank_dump()); before = generations(preset)
+    start = PAD_LAYOUT.block_offset(2) + 10 # last byte of pad 2 ...
+    preset.touch_range(start, start + 2)    # ... and first byte of pad 3
+    assert changed(before, preset) == {("pad", 2), ("pad", 3)}
+
+def test_undo_and_load_bump_generations():
+    preset = MPK2Preset(data=blank_dump())
+    with preset.edit(): preset.set_fader(4, cc=3)
+    before = generations(preset); preset.undo()
+    assert changed(before, preset) == {("fader", 4)}
+    before = generations(preset); preset.load_from_data(blank_dump())
+    assert changed(before, preset) == set(before)
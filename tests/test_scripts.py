@@ -0,0 +1,43 @@
+import importlib.util
+import os
+
+import pytest
+
+from mpk2_preset import LAYOUTS
+from mpk2_virtual import blank_dump
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+
+def script(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS, name + ".py"))
+    module = importlib.util.module_from_spec(spec); spec.loader.exec_module(module)
+    return module
+
+# --- knob/fader editors ---
+@pytest.mark.parametrize("channel", [0, 5, 0x15, 0x7F])
+def test_knob_and_fader_editors_write_the_raw_channel_byte(channel):
+    data = bytearray(blank_dump())
+    script("mpk2_knob_editor").write_knob(data, 0, "MIDI_CC", 74, channel, 0, 127)
+    script("mpk2_fader_editor").write_fader(data, 2, "MIDI_CC", 7, channel, 0, 127, "Off")
+    knob, fader = LAYOUTS["knob"], LAYOUTS["fader"]
+    assert data[knob.offset + 1] == channel and data[knob.offset + 2] == 74
+    assert data[fader.block_offset(3) + 1] == channel and data[fader.block_offset(3) + 2] == 7
+
+def test_knob_editor_rejects_channel_out_of_range():
+    data = bytearray(blank_dump())
+    with pytest.raises(ValueError): script("mpk2_knob_editor").write_knob(data, 0, "MIDI_CC", 74, 300, 0, 127)
+    assert data == blank_dump()
+
+# --- raw bytes the tables don't name ---
+def test_pad_editor_shows_unnamed_bytes_raw():
+    data = bytearray(blank_dump()); block = LAYOUTS["pad"].block(data, 1)
+    block[1], block[5], block[9], block[10] = 0x40, 9, 0x55, 0x55
+    pad = script("mpk2_pad_editor").parse_pad(block)
+    assert (pad["channel"], pad["aftertouch"], pad["off_color"], pad["on_color"]) == (0x40, 9, 0x55, 0x55)
+
+def test_switch_editor_shows_unnamed_keys_raw():
+    data = bytearray(blank_dump()); layout = LAYOUTS["switch"]; block = layout.block(data, 1)
+    block[0], block[11], block[12] = 4, 0xEE, 0xEE # Keystroke
+    editor = script("mpk2_switch_daw_editor")
+    control = editor.parse_control(layout, data, 0)
+    assert control["type"] == "Keystroke" and (control["key1"], control["key2"]) == ("Raw:238", "Raw:238")
@@ -0,0 +1,68 @@
+import pytest
+
+from mpk2_preset import MPK2Preset, PAD_LAYOUT
+from mpk2_simulator import ControllerSimulator
+from mpk2_virtual import blank_dump
+
+def simulator(**pad1):
+    preset = MPK2Preset(data=blank_dump()); preset.set_pad(1, note="C4", channel="USBA2", **pad1)
+    return ControllerSimulator(preset), preset
+
+# --- pads ---
+@pytest.mark.parametrize("mode, expected", [("Off", []), ("Channel", [b"\xD1\x50"]), ("Poly", [b"\xA1\x3C\x50"])])
+def test_pad_pressure_follows_aftertouch_mode(mode, expected):
+    sim, _ = simulator(aftertouch=mode)
+    sim.run_script("press pad 1 velocity 90 pressure 80")
+    assert [m for _, m in sim.events] == [b"\x91\x3C\x5A", *expected, b"\x81\x3C\x00"]
+
+def test_unknown_aftertouch_byte_sends_no_pressure():
+    sim, preset = simulator()
+    preset.sysex_data[PAD_LAYOUT.block_offset(1) + 5] = 9
+    sim.press("pad", 1, pressure=80)
+    assert [m[0] & 0xF0 for _, m in sim.events] == [0x90, 0x80]
+
+# --- gestures ---
+def test_fader_sweep_spans_min_to_max():
+    preset = MPK2Preset(data=blank_dump()); preset.set_fader(2, type="MIDI_CC", channel="USBA1", cc=7, min=10, max=20)
+    sim = ControllerSimulator(preset)
+    sim.run_script("sweep fader 2 over 100 ms")
+    values = [m[2] for _, m in sim.events]
+    assert values == list(range(10, 21)) and {m[:2] for _, m in sim.events} == {b"\xB0\x07"}
+    assert 0.09 < sim.events[-1][0] <= 0.1 and sim.time == pytest.approx(0.1) # max is reached just before the end of travel
+
+@pytest.mark.parametrize("knob_type, expected", [("MIDI_CC", [65, 66, 67, 66]), ("INC_DEC1", [1, 1, 1, 127]), ("INC_DEC2", [1, 1, 1, 65])])
+def test_knob_turns_by_type(knob_type, expected):
+    preset = MPK2Preset(data=blank_dump()); preset.set_knob(5, type=knob_type, channel="USBA1", cc=30, min=0, max=127, value=64)
+    sim = ControllerSimulator(preset)
+    sim.run_script("turn knob 5 +3; turn knob 5 -1 detent")
+    assert [m[2] for _, m in sim.events] == expected
+
+def test_knob_stops_at_the_end_of_its_range():
+    preset = MPK2Preset(data=blank_dump()); preset.set_knob(1, type="MIDI_CC", channel="USBA1", cc=30, min=0, max=100, value=98)
+    sim = ControllerSimulator(preset)
+    assert sim.run_script("turn knob 1 +10") == 2
+
+def test_toggle_pads_and_switches_latch():
+    preset = MPK2Preset(data=blank_dump())
+    preset.set_pad(2, note="C4", channel="USBA1", mode="Toggle")
+    preset.set_switch(1, type="CC", channel="USBA1", cc=80, mode="Toggle")
+    sim = ControllerSimulator(preset)
+    sim.run_script("press pad 2; press pad 2; press switch 1; press switch 1")
+    assert [m for _, m in sim.events] == [b"\x90\x3C\x64", b"\x80\x3C\x00", b"\xB0\x50\x7F", b"\xB0\x50\x00"]
+
+def test_program_daw_buttons_and_common_channel():
+    preset = MPK2Preset(data=blank_dump())
+    preset.set_daw("Left", type="ProgBank", channel="Common", program=3, msb=1, lsb=2)
+    sim = ControllerSimulator(preset, common_channel=4)
+    sim.run_script("press daw left; wait 50 ms")
+    assert [m for _, m in sim.events] == [b"\xB4\x00\x01", b"\xB4\x20\x02", b"\xC4\x03"] and sim.time == pytest.approx(0.15)
+
+def test_hit_pads_one_per_beat():
+    sim, _ = simulator()
+    sim.run_script("hit pads 1,1 at 120 bpm velocity 70")
+    assert [(round(at, 3), m) for at, m in sim.events] == [(0.0, b"\x91\x3C\x46"), (0.25, b"\x81\x3C\x00"),
+                                                          (0.5, b"\x91\x3C\x46"), (0.75, b"\x81\x3C\x00")]
+
+def test_unknown_gesture_is_refused():
+    sim, _ = simulator()
+    with pytest.raises(ValueError, match="wiggle"): sim.run_script("# warm up\nwiggle fader 1")
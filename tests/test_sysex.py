@@ -0,0 +1,70 @@
+import os
+import stat
+
+import pytest
+
+from mpk2_midi import SysexReceiver
+from mpk2_sysex import SysexStream, SyxFile, frame_spans, read_syx, write_atomic, write_syx
+from mpk2_virtual import blank_dump
+
+DUMP = bytes(blank_dump(number=3))
+
+def chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+# --- SysexStream ---
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 256, len(DUMP), 4096])
+def test_frames_survive_any_chunk_boundary(size):
+    stream = SysexStream(capacity=16) # grows past its first buffer
+    data = b"\x90\x3C\x40" + DUMP + b"\xF8\xFE" + DUMP[:20] + b"\xF7" + DUMP
+    frames = [frame for chunk in chunks(data, size) for frame in stream.feed(chunk)]
+    assert frames == [DUMP, DUMP[:20] + b"\xF7", DUMP]
+
+def test_feed_takes_rtmidi_lists_and_memoryviews():
+    stream = SysexStream()
+    assert stream.feed(list(DUMP[:100])) == [] and stream.feed(memoryview(DUMP)[100:]) == [DUMP]
+
+def test_reset_drops_a_partial_frame():
+    stream = SysexStream()
+    stream.feed(DUMP[:50]); stream.reset()
+    assert stream.feed(DUMP[50:]) == [] and stream.feed(DUMP) == [DUMP]
+
+# --- SysexReceiver ---
+class ChunkedInput:
+    """rtmidi MidiIn stand-in that hands the callback pieces of a long SysEx, as CoreMIDI does."""
+    def ignore_types(self, **kwargs): pass
+    def set_callback(self, callback): self.callback = callback
+    def cancel_callback(self): self.callback = None
+    def play(self, data, size):
+        for chunk in chunks(data, size): self.callback((list(chunk), 0.0))
+
+def test_receiver_assembles_chunked_callbacks():
+    midi_in, frames = ChunkedInput(), []
+    receiver = SysexReceiver(midi_in, on_frame=frames.append, min_length=100, max_frames=2).start()
+    midi_in.play(b"\xF0\x7E\x7F\x06\x01\xF7" + DUMP + DUMP + DUMP, 256) # identity reply is too short to count
+    assert receiver.wait(1) == DUMP and receiver.done and frames == [DUMP, DUMP] and receiver.count == 2
+    receiver.stop()
+    assert midi_in.callback is None
+
+# --- .syx files ---
+def test_frame_spans_skip_junk_and_cut_frames():
+    data = b"junk" + DUMP + b"\xF0\x47\x00" + DUMP + b"\xF0\x01\x02" # a frame cut by a new F0, an unfinished tail
+    start = 4 + len(DUMP) + 3
+    assert list(frame_spans(data)) == [(4, 4 + len(DUMP)), (start, start + len(DUMP))]
+
+def test_syx_file_maps_every_frame(tmp_path):
+    other = bytes(blank_dump(number=9))
+    write_syx(str(tmp_path / "bank.syx"), [DUMP, other])
+    with SyxFile(str(tmp_path / "bank.syx")) as syx:
+        assert len(syx) == 2 and isinstance(syx[0], memoryview) and bytes(syx[1]) == other
+    assert read_syx(str(tmp_path / "bank.syx")) == [DUMP, other]
+
+def test_empty_syx_file_has_no_frames(tmp_path):
+    (tmp_path / "empty.syx").write_bytes(b"")
+    assert read_syx(str(tmp_path / "empty.syx")) == []
+
+def test_write_atomic_keeps_the_file_mode(tmp_path):
+    path = tmp_path / "a.syx"; path.write_bytes(b"old"); os.chmod(path, 0o640)
+    write_atomic(str(path), DUMP)
+    assert path.read_bytes() == DUMP and stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert os.listdir(tmp_path) == ["a.syx"]
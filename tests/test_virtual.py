@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from mpk2_midi import MidiPorts, PresetFetcher, SysexReceiver, dump_request
+from mpk2_preset import PRESET_COUNT
+from mpk2_virtual import VirtualMPK, blank_dump
+
+def test_ports_look_like_the_hardware():
+    with VirtualMPK() as device:
+        ports = MidiPorts(backend=device.backend)
+        assert ports.find_mpk() == ("MIDIIN4 (MPK249)", "MIDIOUT4 (MPK249)")
+        assert ports.find_mpk_play() == "MPK249"
+
+def test_dump_request_is_answered_with_the_slot():
+    with VirtualMPK() as device:
+        ports = MidiPorts(backend=device.backend); in_name, out_name = ports.find_mpk()
+        receiver = SysexReceiver(ports.input(in_name)).start()
+        ports.send(out_name, dump_request(7))
+        frame = receiver.wait(5); receiver.stop()
+        assert frame == bytes(device.slots[7]) and frame[7] == 7 and device.requests == 1
+
+def test_sysex_is_ignored_until_asked_for():
+    with VirtualMPK() as device:
+        midi_in = device.backend.MidiIn(); midi_in.open_port(device.SYSEX_PORT)
+        device.receive(dump_request(0)); device.wait_idle(5)
+        assert midi_in.get_message() is None
+        midi_in.ignore_types(sysex=False)
+        device.receive(dump_request(0)); device.wait_idle(5)
+        assert bytes(midi_in.get_message()[0]) == bytes(device.slots[0])
+
+def test_only_dumps_of_its_model_are_stored():
+    with VirtualMPK() as device:
+        mpk261 = blank_dump(model=0x25, number=1); mpk261[8:16] = b"OTHER   "
+        for frame in (mpk261, dump_request(40), b"\xF0\x7E\x7F\x06\x01\xF7"): device.receive(frame)
+        device.wait_idle(5)
+        assert device.writes == 0 and device.ignored == 3 and bytes(device.slots[1]) == bytes(blank_dump(number=1))
+
+def test_load_and_save_slots(tmp_path):
+    dump = blank_dump(number=12); dump[8:16] = b"LOADED  "
+    (tmp_path / "in.syx").write_bytes(dump)
+    with VirtualMPK() as device:
+        assert device.load(str(tmp_path / "in.syx")) == [12]
+        device.save(str(tmp_path / "all.syx"))
+    with VirtualMPK() as device:
+        assert device.load(str(tmp_path / "all.syx")) == list(range(PRESET_COUNT))
+        assert device.preset(12).get_preset_name().strip() == "LOADED"
+
+def test_bandwidth_and_latency_delay_replies():
+    size = len(blank_dump())
+    with VirtualMPK(latency=0.02, bandwidth=size * 10) as device: # a dump takes 0.1 s on the wire
+        ports = MidiPorts(backend=device.backend)
+        start = time.perf_counter()
+        presets = PresetFetcher(ports, *ports.find_mpk()).start(range(3)).wait(5)
+        assert len(presets) == 3 and time.perf_counter() - start >= 0.3
+
+def test_unplug_empties_the_port_lists():
+    with VirtualMPK() as device:
+        ports = MidiPorts(backend=device.backend); out_name = ports.find_mpk()[1]
+        device.unplug()
+        assert ports.refresh() and ports.find_mpk() == (None, None)
+        with pytest.raises(IOError): ports.send(out_name, dump_request(0))
+        device.plug()
+        assert ports.find_mpk()[1] == out_name